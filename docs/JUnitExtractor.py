@@ -0,0 +1,172 @@
+import os
+import xml.etree.ElementTree as ET
+import pandas as pd
+
+from actions import ArqManipulation
+from durations import empty_durations
+from fingerprint import fingerprint_failures
+from LogExtractor import PytestArtifactLogExtractor
+from tokenizer import strip_ansi
+
+# Outcome child elements of a <testcase>, a testcase without any of them passed
+OUTCOMES = {'failure': 'FAILED', 'error': 'ERROR', 'skipped': 'SKIPPED'}
+# Same label as the pytest-durations 'test call duration top' table of the console logs
+DURATION_TYPE = ' call duration '
+
+
+class JUnitArtifactExtractor(PytestArtifactLogExtractor):
+    """
+    Extracts the test status, timing and failure tables from a JUnit XML artifact, as PytestArtifactLogExtractor does
+    from console logs.
+
+    The file is streamed with iterparse and every testcase is dropped from the tree once read,
+    so memory stays flat whatever the number of testcases.
+    """
+
+    def read_data(self):
+        # Nothing is read upfront, the file is streamed by __parse_testcases__
+        return None
+
+    def extract_dfs(self):
+        """
+        Parses the XML file into this artifact's own status, duration and failure tables, without touching the stores.
+        The result is cached, so calling it again after log_to_df does not re-parse the file.
+
+        :return: A tuple with the status, duration and failure DataFrames of this artifact.
+        """
+        if self.run_dfs is not None:
+            return self.run_dfs
+
+        databaseId = self.__database_id__()
+
+        testcases = self.__parse_testcases__()
+
+        status_df = testcases[['name', 'status', 'category', 'arguments']].set_index('name')
+
+        # One row per test name, with the columns of the pytest-durations tables
+        timed = testcases.dropna(subset=['seconds'])
+        categories_df = timed.groupby('name', sort=False)['seconds'].agg(num='size', avg='mean', min='min', total='sum').round(3)
+        categories_df['durationType'] = DURATION_TYPE
+
+        failed = testcases[testcases['status'].isin(['FAILED', 'ERROR'])]
+        failures_df = failed[['name', 'status', 'category', 'error', 'error_details', 'arguments']].set_index('name') \
+            .dropna(subset=['status', 'category', 'error', 'error_details'])
+
+        # Labeling the dfs
+        status_df.index.name = 'pytest_tests_status'
+        categories_df.index.name = 'pytest_run_times'
+        failures_df.index.name = 'pytest_failures_errors'
+
+        status_df['databaseId'] = databaseId
+        categories_df['databaseId'] = databaseId
+        failures_df['databaseId'] = databaseId
+
+        failures_df['fingerprint'] = fingerprint_failures(failures_df['error'], failures_df['error_details'])['fingerprint'].to_numpy()
+
+        self.testcases = testcases
+        self.run_dfs = (status_df, categories_df, failures_df)
+        return self.run_dfs
+
+    def extract_test_durations(self):
+        """
+        Reads the per-test timings of the testcases. JUnit carries a single time per testcase,
+        stored as its 'call' phase.
+
+        :return: A DataFrame with databaseId, category, name, arguments, phase and seconds columns.
+        """
+        if self.test_durations is not None:
+            return self.test_durations
+
+        self.extract_dfs()
+        timed = self.testcases.dropna(subset=['seconds'])
+        if timed.empty:
+            durations_df = empty_durations(['category', 'name', 'arguments', 'phase', 'seconds'])
+        else:
+            durations_df = timed[['category', 'name', 'arguments']].assign(phase='call', seconds=timed['seconds'].astype('float32'))
+        durations_df.insert(0, 'databaseId', self.__database_id__())
+
+        self.test_durations = durations_df.reset_index(drop=True)
+        return self.test_durations
+
+    def __database_id__(self) -> int:
+        """
+        Reads the run of the artifact from a 'test.region.<databaseId>' file name, as for the console logs.
+        JUnit reports are usually named 'junit.xml', the run then comes from the '<folder>/<databaseId>/'
+        folder ActionsArtifacts downloads it to.
+        """
+        databaseId = self.__extract_self_path_info__().get('databaseId').get(0)
+        if databaseId and databaseId.isdigit():
+            return int(databaseId)
+
+        folders = os.path.normpath(self.path).split(os.sep)[:-1]
+        return next((int(folder) for folder in reversed(folders) if folder.isdigit()), 000000)
+
+    def __parse_testcases__(self) -> pd.DataFrame:
+        """
+        Streams the <testcase> elements of the file.
+
+        :return: A DataFrame with one row per testcase: name, status, category, arguments, seconds, error and error_details.
+        """
+        rows = []
+        parents = []
+
+        with ArqManipulation.open_binary(self.path) as file:
+            for event, element in ET.iterparse(file, events=('start', 'end')):
+                if event == 'start':
+                    parents.append(element)
+                    continue
+
+                parents.pop()
+                if element.tag != 'testcase':
+                    continue
+
+                rows.append(self.__testcase_row__(element))
+                # Dropping the read testcases from their suite keeps the tree from growing
+                if parents:
+                    del parents[-1][:]
+
+        return pd.DataFrame(rows, columns=['name', 'status', 'category', 'arguments', 'seconds', 'error', 'error_details'])
+
+    def __testcase_row__(self, element) -> tuple:
+        category, test_classes = self.__split_classname__(element.get('classname', ''), element.get('file'))
+        name, _, arguments = element.get('name', '').partition('[')
+        # Console logs name class tests 'TestClass::test_name'
+        name = '::'.join(test_classes + [name])
+
+        seconds = element.get('time')
+        status, error, details = 'PASSED', None, None
+        for child in element:
+            if child.tag in OUTCOMES:
+                status = OUTCOMES[child.tag]
+                error, details = self.__split_message__(child)
+                break
+
+        return (name.replace(' ', ''), status, category, arguments or None, float(seconds) if seconds else None, error, details)
+
+    @staticmethod
+    def __split_classname__(classname: str, file: str = None) -> tuple:
+        """
+        Turns a pytest JUnit classname ('tests.test_api.TestGet') into the console category ('tests/test_api.py')
+        and its test classes (['TestGet']).
+        """
+        parts = classname.split('.') if classname else []
+        # Test classes are capitalized, modules and packages are not
+        first_class = next((i for i, p in enumerate(parts) if p[:1].isupper()), len(parts))
+        module, classes = parts[:first_class], parts[first_class:]
+
+        category = file or ('/'.join(module) + '.py' if module else '')
+        return category, classes
+
+    @staticmethod
+    def __split_message__(child) -> tuple:
+        """
+        Splits a failure element into the error class and its details, as in the short test summary.
+        """
+        error = child.get('type')
+        message = strip_ansi(child.get('message') or child.text or '')
+        if error and message.startswith(error + ':'):
+            message = message[len(error) + 1:]
+        elif not error:
+            error, _, message = message.partition(':')
+
+        return error or None, message
@@ -1,4 +1,7 @@
-from actions import ArqManipulation
+from actions import ArqManipulation, KeyedTable, PRIMARY_KEYS, ROW_GROUP_ROWS
+from fingerprint import fingerprint_failures
+from durations import parse_pytest_durations
+from tokenizer import strip_ansi_bytes
 import pandas as pd
 import re
 from numpy.lib.stride_tricks import sliding_window_view as swv
@@ -10,6 +13,28 @@ paths = {
     'failures':'./bin/pytest.failures.log.parquet',
     }
 
+class PytestResultStores:
+    """
+    The status, duration and failure stores, keyed by PRIMARY_KEYS so ingesting an artifact again replaces its rows.
+    Shared by every artifact of an ingest, and saved once at its end.
+    """
+
+    def __init__(self):
+        self.status = KeyedTable(paths.get('status'), PRIMARY_KEYS.get('status'), ROW_GROUP_ROWS)
+        self.categories = KeyedTable(paths.get('categories'), PRIMARY_KEYS.get('categories'), ROW_GROUP_ROWS)
+        self.failures = KeyedTable(paths.get('failures'), PRIMARY_KEYS.get('failures'), ROW_GROUP_ROWS)
+
+    def upsert(self, status_df: pd.DataFrame, categories_df: pd.DataFrame, failures_df: pd.DataFrame):
+        self.status.upsert(status_df)
+        self.categories.upsert(categories_df)
+        self.failures.upsert(failures_df)
+
+    def save(self):
+        self.status.save()
+        self.categories.save()
+        self.failures.save()
+
+
 class PytestArtifactLogExtractor:
     """f
     A class to extract and process test status and timing information from a pytest artifact log.
@@ -21,7 +46,18 @@ class PytestArtifactLogExtractor:
         :param path: Path to the pytest artifact log file.
         """
         self.path = path
-        self.data = self.__read_file__()
+        self.data = self.read_data()
+        self.run_dfs = None
+        self.test_durations = None
+
+    def read_data(self):
+        """
+        Loads what the parsing needs upfront, when the extractor is created. Extractors of other artifact formats
+        override it, e.g. to stream the file while parsing instead.
+
+        :return: The log content, kept as self.data.
+        """
+        return self.__read_file__()
 
     def __read_file__(self):
         """
@@ -29,26 +65,25 @@ class PytestArtifactLogExtractor:
 
         :return: String containing the file content.
         """
-        with open(self.path, "r") as file: 
+        # Escape sequences are stripped on the raw bytes, before the single decode
+        with ArqManipulation.open_binary(self.path) as file:
             data = file.read()
 
-        return ArqManipulation.clean_ansi_escape(data)
+        return strip_ansi_bytes(data).decode('utf-8', errors='replace')
 
-    def log_to_df(self):
+    def extract_dfs(self):
         """
-        Parses the log file to extract test results and performance metrics.
+        Parses the log file into this artifact's own status, duration and failure tables, without touching the stores.
+        The result is cached, so calling it again after log_to_df does not re-parse the file.
 
-        :return: A DataFrame combining test statuses with time metrics.
+        :return: A tuple with the status, duration and failure DataFrames of this artifact.
         """
+        if self.run_dfs is not None:
+            return self.run_dfs
 
         # Retrieving databaseID out of path
         databaseId = self.__extract_self_path_info__().get('databaseId').get(0)
         databaseId = int(databaseId) if databaseId else 000000
-    
-        # Checking if artifacts is not already stored
-        df_status_parquet = ArqManipulation.read_parquet_file(parquet_file_name=paths.get('status'))   
-        df_categories_parquet = ArqManipulation.read_parquet_file(parquet_file_name=paths.get('categories'))   
-        df_failures_parquet = ArqManipulation.read_parquet_file(parquet_file_name=paths.get('failures'))   
 
         # Creating dataframes test status and categories
         tests, categories, failures = self.__extract_all_categories__()
@@ -65,21 +100,56 @@ class PytestArtifactLogExtractor:
         status_df['databaseId'] = databaseId
         categories_df['databaseId'] = databaseId
         failures_df['databaseId'] = databaseId
- 
 
-        # Since there is data on the parquets, concatenating both
-        concated_dfs = (pd.concat([df_status_parquet, status_df], axis=0).drop_duplicates(),
-                        pd.concat([df_categories_parquet, categories_df], axis=0).drop_duplicates(), 
-                        pd.concat([df_failures_parquet, failures_df], axis=0).drop_duplicates()
-                        )   
-         
+        # Signature of the failure message, with its variable tokens masked
+        failures_df['fingerprint'] = fingerprint_failures(failures_df['error'], failures_df['error_details'])['fingerprint'].to_numpy()
+
+        self.run_dfs = (status_df, categories_df, failures_df)
+        return self.run_dfs
+
+    def extract_test_durations(self):
+        """
+        Parses the exact per-test setup/call/teardown timings, when the run used pytest '--durations=0'.
+        The result is cached like extract_dfs.
+
+        :return: A DataFrame with databaseId, category, name, arguments, phase and seconds columns, empty without a durations section.
+        """
+        if self.test_durations is not None:
+            return self.test_durations
+
+        databaseId = self.__extract_self_path_info__().get('databaseId').get(0)
+        durations_df = parse_pytest_durations(self.data)
+        durations_df.insert(0, 'databaseId', int(databaseId) if databaseId else 000000)
+
+        self.test_durations = durations_df
+        return self.test_durations
 
-        # Save the concatenated DataFrames back to Parquet files
-        ArqManipulation.save_df_to_parquet(df=concated_dfs[0], parquet_file_name=paths.get('status'))
-        ArqManipulation.save_df_to_parquet(df=concated_dfs[1], parquet_file_name=paths.get('categories'))
-        ArqManipulation.save_df_to_parquet(df=concated_dfs[2], parquet_file_name=paths.get('failures'))
+    def artifact_name(self) -> str:
+        """
+        Identifies the artifact inside its run, as 'test.region'.
 
-        return concated_dfs
+        :return: The artifact name.
+        """
+        info = self.__extract_self_path_info__()
+        return '.'.join(str(v) for v in (info.get('test').get(0), info.get('region').get(0)) if v is not None)
+
+    def log_to_df(self, stores=None):
+        """
+        Parses the log file to extract test results and performance metrics, and upserts them into the stores.
+
+        :param stores: Shared PytestResultStores, saved by the caller. When absent the stores are read and saved here.
+        :return: A tuple with this artifact's status, duration and failure DataFrames, as upserted.
+        """
+        owned = stores is None
+        stores = stores or PytestResultStores()
+        run_dfs = self.extract_dfs()
+        # The stores merge their pending rows once, when saved or read, not per artifact
+        stores.upsert(*run_dfs)
+
+        if owned:
+            stores.save()
+
+        return run_dfs
 
     def __get_list_by_name__(self, data: list, name: str):
         """
@@ -186,7 +256,7 @@ class PytestArtifactLogExtractor:
         """
         # Some test wont have errors, but there still need a dataframe
         if not data:
-            return [[None]*5]
+            return [[None]*6]
 
 
         keywords = ['PASSED','FAILED','ERROR']
@@ -198,18 +268,24 @@ class PytestArtifactLogExtractor:
                 # Splitting the Keyword NameTest from category and argument
                 match = re.split(r'::', match, 1)
                 tmp = re.split('\s', match[0], maxsplit=1)
-                # Splitting the category from arguments
-                tmp1 = re.split(r'\[', match[1], maxsplit=1)
-                tmp2 = re.split(r'\] - ', tmp1[1], maxsplit=1)
-                
+                # Splitting the category from arguments, kept as in the status table ('2]')
+                name, _, rest = match[1].partition('[')
+                if rest:
+                    arguments, _, message = rest.partition('] - ')
+                    arguments += ']'
+                else:
+                    name, _, message = name.partition(' - ')
+                    arguments = None
+
                 # Splitting error name from its description
-                tmp.append(tmp1[0])
-                tmp += re.split(r':| ', tmp2[1], maxsplit=1)
+                tmp.append(name)
+                tmp += re.split(r':| ', message, maxsplit=1)
 
                 # Allow degenerated data to fit in the dataframe
                 while(len(tmp) < 5):
                     tmp.append(None)
 
+                tmp.append(arguments)
                 failures.append(tmp)
 
         return failures
@@ -259,7 +335,9 @@ class PytestArtifactLogExtractor:
         return dfs
 
     def __create_failure_df__(self, data):
-        return pd.DataFrame(data, columns=['status', 'category', 'name', 'error', 'error_details']).set_index('name').dropna()
+        df = pd.DataFrame(data, columns=['status', 'category', 'name', 'error', 'error_details', 'arguments'])
+        # Tests without parameters have no arguments
+        return df.set_index('name').dropna(subset=['status', 'category', 'error', 'error_details'])
 
     def __extract_self_path_info__(self):
         """
@@ -267,8 +345,8 @@ class PytestArtifactLogExtractor:
 
         :return: A DataFrame containing 'test' and 'databaseId' information.
         """
-        # Extract filename without extension
-        stripped = self.path.split('/')[-1].split('.')
+        # Extract filename without extension (compressed logs keep their original name)
+        stripped = ArqManipulation.strip_compression_suffix(self.path).split('/')[-1].split('.')
         stripped.pop()  # Remove the file extension
 
         # Ensure there are exactly three elements (fill missing ones with None)
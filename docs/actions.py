@@ -1,16 +1,48 @@
 import subprocess
 import os
 import shutil
+import numpy as np
 import pandas as pd
 import subprocess
 import re
 import json
+import fnmatch
+import gzip
+import io
+import time
+import threading
+from fastparquet import ParquetFile
+from tokenizer import strip_ansi
+
+try:
+    import zstandard
+except ImportError:  # zstd support is optional, gzip is always available
+    zstandard = None
 
 paths = {
     'workflow':'./bin/actions_workflow.parquet',
     'jobs':'./bin/actions_jobs.parquet',
+    'job_timings':'./bin/actions_job_timings.parquet',
+    'pruned_runs':'./bin/artifacts.pruned.parquet',
     }
 
+COMPRESSED_SUFFIXES = ('.gz', '.zst')
+# Natural keys of the stored tables, rows sharing a key are the same record and the last written wins
+PRIMARY_KEYS = {
+    'workflow': ['databaseId'],
+    'jobs': ['databaseId', 'jobId'],
+    'job_steps': ['jobId', 'step_number'],
+    'job_timings': ['databaseId', 'jobId'],
+    'status': ['databaseId', 'category', 'name', 'arguments'],
+    'categories': ['databaseId', 'durationType', 'name'],
+    'failures': ['databaseId', 'category', 'name', 'arguments'],
+    }
+# Rows per parquet row group of the stores read back in batches by iter_parquet_batches (see storeExport.STORES)
+ROW_GROUP_ROWS = 100_000
+# Calls and latency of the GitHub CLI commands run by this process, per command ('run list', 'api jobs', ...)
+GH_CALL_STATS = {}
+GH_CALL_STATS_LOCK = threading.Lock()
+
 
 class ArqManipulation:
     """
@@ -34,19 +66,130 @@ class ArqManipulation:
             raise RuntimeError(f"Error reading Parquet file '{parquet_file_name}': {e}")
 
     @staticmethod
-    def save_df_to_parquet(df: pd.DataFrame, parquet_file_name: str):
+    def save_df_to_parquet(df: pd.DataFrame, parquet_file_name: str, row_group_rows: int = None):
         """
         Saves a DataFrame to a Parquet file.
 
         :param df: Dataframe to save.
         :param parquet_file_name: Parqueet saving path.
+        :param row_group_rows: Rows per row group, for the stores read back in batches by iter_parquet_batches.
+            The file is written in a single row group when empty.
         """
         try:
             os.makedirs(os.path.dirname(parquet_file_name), exist_ok=True)
-            df.to_parquet(parquet_file_name)
+            if row_group_rows:
+                df.to_parquet(parquet_file_name, engine='fastparquet', row_group_offsets=row_group_rows)
+            else:
+                df.to_parquet(parquet_file_name)
         except Exception as e:
             raise RuntimeError(f"Error saving DataFrame to Parquet file '{parquet_file_name}': {e}")
 
+    @staticmethod
+    def iter_parquet_batches(parquet_file_name: str, batch_size: int = ROW_GROUP_ROWS, columns: list[str] = None,
+                             filters: list = None):
+        """
+        Reads a Parquet file as a sequence of DataFrames of at most batch_size rows, one row group at a time,
+        so memory is bounded by the row group and batch sizes rather than by the file.
+
+        :param parquet_file_name: Path to the Parquet file.
+        :param batch_size: Rows per yielded DataFrame.
+        :param columns: Columns to read, all when empty. The index is always read.
+        :param filters: fastparquet filters, e.g. [('databaseId', 'in', ids)]: row groups whose statistics exclude them are skipped.
+        :return: A generator of DataFrames.
+        """
+        if not os.path.exists(parquet_file_name):
+            return
+
+        try:
+            row_groups = ParquetFile(parquet_file_name).iter_row_groups(columns=columns, filters=filters or None)
+        except Exception as e:
+            raise RuntimeError(f"Error reading Parquet file '{parquet_file_name}': {e}")
+
+        pending = []
+        pending_rows = 0
+        for row_group in row_groups:
+            pending.append(row_group)
+            pending_rows += len(row_group)
+            if pending_rows < batch_size:
+                continue
+
+            buffer = pd.concat(pending) if len(pending) > 1 else pending[0]
+            full_batches = len(buffer) // batch_size * batch_size
+            for start in range(0, full_batches, batch_size):
+                yield buffer.iloc[start:start + batch_size]
+            pending = [buffer.iloc[full_batches:]]
+            pending_rows = len(pending[0])
+
+        if pending_rows:
+            yield pd.concat(pending) if len(pending) > 1 else pending[0]
+
+    @staticmethod
+    def read_parquet_where(parquet_file_name: str, column: str, values, columns: list[str] = None,
+                           batch_size: int = ROW_GROUP_ROWS) -> pd.DataFrame:
+        """
+        Reads the rows of a Parquet file whose column is in values, batch by batch, so only the
+        selected rows are ever held in memory.
+
+        :param parquet_file_name: Path to the Parquet file.
+        :param column: Column to select on, e.g. 'databaseId'.
+        :param values: Accepted values of the column.
+        :param columns: Columns to read, all when empty.
+        :return: DataFrame with the selected rows.
+        """
+        values = list(values)
+        if not values:
+            return pd.DataFrame()
+        read_columns = None if columns is None else list(dict.fromkeys(list(columns) + [column]))
+        selected = [batch[batch[column].isin(values).to_numpy()]
+                    for batch in ArqManipulation.iter_parquet_batches(parquet_file_name, batch_size, read_columns, [(column, 'in', values)])]
+        selected = [batch for batch in selected if not batch.empty]
+        if not selected:
+            return pd.DataFrame()
+
+        df = pd.concat(selected) if len(selected) > 1 else selected[0]
+        return df if columns is None else df[list(columns)]
+
+    @staticmethod
+    def strip_compression_suffix(path: str) -> str:
+        """
+        Removes a known compression suffix ('.gz', '.zst') from a path.
+
+        :param path: File path, possibly compressed.
+        :return: Path without the compression suffix.
+        """
+        for suffix in COMPRESSED_SUFFIXES:
+            if path.endswith(suffix):
+                return path[:-len(suffix)]
+        return path
+
+    @staticmethod
+    def open_binary(path: str):
+        """
+        Opens a file for binary reading, transparently decompressing gzip and zstd files.
+
+        :param path: Path to a plain, '.gz' or '.zst' file.
+        :return: A binary file object.
+        """
+        if path.endswith('.gz'):
+            return gzip.open(path, 'rb')
+        if path.endswith('.zst'):
+            if zstandard is None:
+                raise RuntimeError(f"Reading '{path}' requires the 'zstandard' package")
+            return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        return open(path, 'rb')
+
+    @staticmethod
+    def open_text(path: str):
+        """
+        Opens a text file for reading, transparently decompressing gzip and zstd files.
+
+        :param path: Path to a plain, '.gz' or '.zst' file.
+        :return: A text file object.
+        """
+        if path.endswith(COMPRESSED_SUFFIXES):
+            return io.TextIOWrapper(ArqManipulation.open_binary(path))
+        return open(path, 'r')
+
     @staticmethod
     def clean_ansi_escape(base_str: str) -> str:
         """
@@ -55,7 +198,7 @@ class ArqManipulation:
         :param base_str: Unformmated string.
         :return: Cleaned string.
         """
-        return re.sub(r'\x1B\[[0-9;]*[A-Za-z]', '', base_str)
+        return strip_ansi(base_str)
 
     @staticmethod
     def parse_stdout_json(base_str: str) -> dict:
@@ -66,9 +209,8 @@ class ArqManipulation:
         :return: Parsed JSON dictionary.
         """
         try:
-            cleaned = ArqManipulation.clean_ansi_escape(base_str)
-            str_output = ''.join(cleaned.splitlines())
-            return json.loads(str_output)
+            # JSON allows newlines between tokens, so the cleaned output is parsed as is
+            return json.loads(strip_ansi(base_str))
         except json.JSONDecodeError as e:
             raise e
 
@@ -88,49 +230,304 @@ class ArqManipulation:
                 raise KeyError(f"Missing required columns in JSON data: {set(required_columns) - set(df_json.columns)}")
 
             df_json['createdAt'] = pd.to_datetime(df_json['createdAt'])
-            return df_json[required_columns].sort_values(by="createdAt")
+            # Run timings, present when requested
+            timing_columns = [col for col in ('startedAt', 'updatedAt') if col in df_json.columns]
+            for col in timing_columns:
+                df_json[col] = pd.to_datetime(df_json[col])
+            return df_json[required_columns + timing_columns].sort_values(by="createdAt")
         except KeyError as e:
             raise ValueError(f"Error processing JSON to DataFrame: {e}")
         except Exception as e:
             raise RuntimeError(f"Unexpected error in json_to_df: {e}")
 
+class KeyedTable:
+    """
+    A stored table with a declared primary key, updated by upserts (last write wins) instead of full-row drop_duplicates.
+
+    The stored rows are hashed once when loaded and kept as a sorted hash array, so each upsert only hashes
+    its own rows and binary-searches them: its cost depends on the new rows, not on the history.
+    Upserted rows are buffered and merged with the stored ones when the table is read or saved.
+    """
+
+    def __init__(self, parquet_file_name: str, keys: list[str], row_group_rows: int = None):
+        """
+        Initializes the KeyedTable object, reading the stored rows.
+
+        :param parquet_file_name: Path to the Parquet file.
+        :param keys: Primary key columns, see PRIMARY_KEYS. 'name' may be the index of the extractor tables.
+        :param row_group_rows: Rows per row group of the saved file, for the tables streamed back (see save_df_to_parquet).
+        """
+        self.parquet_file_name = parquet_file_name
+        self.keys = keys
+        self.row_group_rows = row_group_rows
+        self.__load__(ArqManipulation.read_parquet_file(parquet_file_name))
+
+    def upsert(self, df: pd.DataFrame):
+        """
+        Inserts new rows and replaces the stored rows with the same key.
+
+        :param df: Rows to write, with the key columns.
+        """
+        if df is None or df.empty:
+            return
+
+        hashes = self.__hash_keys__(df)
+        # Within the batch too, the last row of a key wins
+        last = ~pd.Series(hashes).duplicated(keep='last').to_numpy()
+        df, hashes = df[last], hashes[last]
+
+        if len(self.base_hashes):
+            positions = np.searchsorted(self.base_hashes, hashes).clip(max=len(self.base_hashes) - 1)
+            found = self.base_hashes[positions] == hashes
+            self.base_alive[self.base_order[positions[found]]] = False
+
+        chunk = len(self.chunks)
+        for row, key in enumerate(hashes.tolist()):
+            previous = self.pending.get(key)
+            if previous is not None:
+                self.chunks_alive[previous[0]][previous[1]] = False
+            self.pending[key] = (chunk, row)
+
+        self.chunks.append(df)
+        self.chunks_alive.append(np.ones(len(df), dtype=bool))
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """
+        The table with the upserted rows merged in.
+        """
+        if self.chunks:
+            self.__load__(self.__merge__())
+        return self.base
+
+    def save(self):
+        ArqManipulation.save_df_to_parquet(self.df, self.parquet_file_name, self.row_group_rows)
+
+    def __load__(self, df: pd.DataFrame):
+        if not df.empty:
+            hashes = self.__hash_keys__(df)
+            # Tables written before the keys existed may hold several rows per key, the last one is kept
+            keep = ~pd.Series(hashes).duplicated(keep='last').to_numpy()
+            if not keep.all():
+                df, hashes = df[keep], hashes[keep]
+            self.base_order = np.argsort(hashes, kind='stable')
+            self.base_hashes = hashes[self.base_order]
+        else:
+            self.base_order = np.array([], dtype='int64')
+            self.base_hashes = np.array([], dtype='uint64')
+
+        self.base = df
+        self.base_alive = np.ones(len(df), dtype=bool)
+        self.chunks = []
+        self.chunks_alive = []
+        self.pending = {}
+
+    def __merge__(self) -> pd.DataFrame:
+        frames = [self.base[self.base_alive]] if not self.base.empty else []
+        frames += [chunk[alive] for chunk, alive in zip(self.chunks, self.chunks_alive)]
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return self.base.iloc[0:0]
+        return pd.concat(frames) if len(frames) > 1 else frames[0]
+
+    def __hash_keys__(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Hashes the key of each row, numbers as float64 and everything else as objects, so the same key
+        hashes the same whatever the frame dtypes (int or float ids, categorical or object names).
+        """
+        columns = {}
+        for key in self.keys:
+            if key in df.columns:
+                values = df[key]
+            elif key == 'name':
+                values = pd.Series(df.index, index=df.index)
+            else:
+                # Tables stored before a key column existed (e.g. failure arguments) hash it as missing
+                values = pd.Series(None, index=df.index, dtype=object)
+            if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+                columns[key] = values.astype('float64').to_numpy()
+            else:
+                columns[key] = values.astype(object).where(values.notna(), None).to_numpy()
+
+        return pd.util.hash_pandas_object(pd.DataFrame(columns), index=False).to_numpy()
+
+
+def fold_updates(df: pd.DataFrame, updates: list, columns=('databaseId', 'artifact')) -> pd.DataFrame:
+    """
+    Folds buffered artifact updates into a table keyed by run and artifact, with a single concat:
+    the last update of a (databaseId, artifact) pair replaces its stored rows and its earlier updates.
+
+    :param df: Stored table, with the key columns.
+    :param updates: (keys, rows) pairs, oldest first: the (databaseId, artifact) pairs an update replaces and its new rows.
+    :param columns: Key columns, the keys of the updates are tuples of their values.
+    :return: The updated table.
+    """
+    if not updates:
+        return df
+
+    latest = {}
+    for position, (keys, _) in enumerate(updates):
+        for key in keys:
+            latest[key] = position
+
+    frames = []
+    if not df.empty:
+        frames.append(df[~fold_keys(df, columns).isin(list(latest))])
+    for position, (keys, rows) in enumerate(updates):
+        superseded = [key for key in keys if latest[key] != position]
+        if superseded and not rows.empty:
+            rows = rows[~fold_keys(rows, columns).isin(superseded)]
+        frames.append(rows)
+
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return df.iloc[:0]
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0].reset_index(drop=True)
+
+
+def fold_keys(df: pd.DataFrame, columns) -> pd.MultiIndex:
+    # Run ids are compared as ints and missing artifacts as '', as in the keys of the updates
+    return pd.MultiIndex.from_arrays([df[c].astype('int64') if c == 'databaseId' else df[c].fillna('') for c in columns])
+
+
 class ActionsArtifacts:
     """
     A class to handle downloading, retrieving, and deleting GitHub Actions artifacts.
     """
 
-    def __init__(self, jobIds: list, repository: str):
+    def __init__(self, jobIds: list, repository: str, name_patterns: list[str] = None, download: bool = True):
         """
         Initializes the ActionsArtifacts object.
 
         :param repository: The GitHub repository in the format "owner/repo".
+        :param name_patterns: Glob patterns of the artifact names to download, all artifacts when empty.
+        :param download: Downloads the pending runs right away. Set to False when the runs are fetched one by one (see fetch_run).
         """
         self.repository = repository
         self.folder = 'artifacts/'  # Default storage dir
         self.paths = self.retrieve_downloaded_artifacts() 
         self.jobIds: set = set(jobIds)
-        self.download_artifact()
+        self.name_patterns = name_patterns or []
+        # Runs whose artifacts were deleted by the retention policies are not downloaded again
+        pruned = ArqManipulation.read_parquet_file(paths.get('pruned_runs'))
+        self.pruned_ids = set(pruned['databaseId'].astype('int64')) if not pruned.empty else set()
+        if download:
+            self.download_artifact()
+            # The paths listed before the download miss the new runs
+            self.paths = self.retrieve_downloaded_artifacts()
+
+    def fetch_run(self, database_id: int) -> list[str]:
+        """
+        Downloads the artifacts of a single pending run, keeping only the ones matching the name patterns.
 
-    def download_artifact(self: str):
+        :param database_id: The database ID of the workflow run.
+        :return: Paths of the run's downloaded files.
+        """
+        if self.name_patterns:
+            listed = self.list_artifacts(database_id)
+            names = listed.loc[listed['selected'], 'name'].tolist()
+            if not names:
+                return []
+            self.download_run(database_id, names)
+        else:
+            self.download_run(database_id)
+
+        return self.run_paths(database_id)
+
+    def run_paths(self, database_id: int) -> list[str]:
+        """
+        Lists the downloaded files of a single run.
+
+        :param database_id: The database ID of the workflow run.
+        :return: Paths of the run's files.
+        """
+        run_folder = os.path.join(self.folder, str(database_id))
+        return [os.path.join(path, file) for path, _, files in os.walk(run_folder) for file in files]
+
+    def list_artifacts(self, database_id: int) -> pd.DataFrame:
+        """
+        Lists the artifacts uploaded by a workflow run, without downloading them.
+
+        :param database_id: The database ID of the workflow run.
+        :return: A DataFrame with the artifacts name, size in bytes and whether they are selected by the name patterns.
         """
-        Downloads an artifact from GitHub Actions using the GitHub CLI.
+        columns = ['databaseId', 'name', 'size_in_bytes', 'selected']
+        command = (f'gh api repos/{self.repository}/actions/runs/{database_id}/artifacts --paginate '
+                   "--jq '.artifacts[] | select(.expired | not) | {name, size_in_bytes}'")
+        try:
+            output = run_gh(command).stdout
+        except subprocess.CalledProcessError as e:
+            print(f"Error listing artifacts of run {database_id}: {e}")
+            return pd.DataFrame(columns=columns)
+
+        artifacts = [json.loads(line) for line in ArqManipulation.clean_ansi_escape(output).splitlines() if line.strip()]
+        df = pd.DataFrame(artifacts, columns=['name', 'size_in_bytes'])
+        df.insert(0, 'databaseId', int(database_id))
+        df['selected'] = df['name'].apply(self.__matches_patterns__)
+
+        return df[columns]
+
+    def plan_download(self) -> pd.DataFrame:
+        """
+        Lists the artifacts of every run that has yet to be downloaded, with their byte sizes.
+
+        :return: A DataFrame with one row per artifact, see list_artifacts.
+        """
+        plans = [self.list_artifacts(database_id) for database_id in self.pending_ids()]
+        if not plans:
+            return pd.DataFrame(columns=['databaseId', 'name', 'size_in_bytes', 'selected'])
 
-        :param database_id: The database ID of the artifact to download.
+        return pd.concat(plans, ignore_index=True)
+
+    def download_artifact(self: str):
+        """
+        Downloads the artifacts of the pending runs from GitHub Actions using the GitHub CLI.
+        When name patterns are set, only the matching artifacts are transferred.
         """
         try:
             # Ensure the folder exists before downloading
             os.makedirs(self.folder, exist_ok=True)
-            # Finding the artifacts that have yet to be downloaded
-            downloaded_paths = set(int(p.split('/')[1]) for p in self.paths)
-            to_download = self.jobIds.difference(downloaded_paths)
-
-            for database_id in to_download:
-            # Construct the command to download the artifact
-                command=f'gh run --repo {self.repository} download {database_id} --dir {os.path.join(self.folder, str(database_id))}'
-                subprocess.run(command, shell=True, text=True, check=False, capture_output=True)
+
+            if self.name_patterns:
+                plan = self.plan_download()
+                selected = plan[plan['selected']]
+                print(f"Downloading {len(selected)} of {len(plan)} artifacts "
+                      f"({selected['size_in_bytes'].sum() / (1024 * 1024):.2f} of {plan['size_in_bytes'].sum() / (1024 * 1024):.2f} MB)")
+
+                for database_id, names in selected.groupby('databaseId')['name']:
+                    self.download_run(database_id, names.tolist())
+            else:
+                for database_id in self.pending_ids():
+                    self.download_run(database_id)
         except Exception as e:
             print(f"Unexpected error: {e}")
 
+    def download_run(self, database_id: int, names: list[str] = None):
+        """
+        Downloads the artifacts of a single workflow run.
+
+        :param database_id: The database ID of the workflow run.
+        :param names: Exact artifact names to download, all artifacts when empty.
+        """
+        # Artifact names come from the API and are passed as plain arguments, never through a shell
+        command = ['gh', 'run', '--repo', self.repository, 'download', str(database_id),
+                   '--dir', os.path.join(self.folder, str(database_id))]
+        for name in names or []:
+            command += ['-n', name]
+        run_gh(command, check=False)
+
+    def pending_ids(self) -> set:
+        """
+        Finds the runs that have yet to be downloaded.
+
+        :return: Set of database IDs without a local artifacts folder, nor pruned by the retention policies (see ArtifactRetention).
+        """
+        downloaded_paths = set(int(p.split('/')[1]) for p in self.paths)
+        return self.jobIds.difference(downloaded_paths).difference(self.pruned_ids)
+
+    def __matches_patterns__(self, name: str) -> bool:
+        return not self.name_patterns or any(fnmatch.fnmatch(name, pattern) for pattern in self.name_patterns)
+
     def retrieve_downloaded_artifacts(self) -> list[str]:
         """
         Retrieves all downloaded artifacts file paths.
@@ -174,7 +571,7 @@ class ActionsWorkflow:
         :param query_size: Number of workflows to retrieve.
         """
         self.repository = repository
-        self.json_attributes = '--json name,status,conclusion,createdAt,databaseId,workflowDatabaseId'
+        self.json_attributes = '--json name,status,conclusion,createdAt,startedAt,updatedAt,databaseId,workflowDatabaseId'
         self.query_size = query_size
         self.df = self.__gh_list_query__()
 
@@ -189,17 +586,16 @@ class ActionsWorkflow:
 
             list_command = f'gh run --repo {self.repository} list {self.json_attributes} -L {self.query_size}'
             
-            output_json = subprocess.run(
-                list_command, shell=True, text=True, check=True, capture_output=True
-            ).stdout
+            output_json = run_gh(list_command).stdout
 
             parsed_json = ArqManipulation.parse_stdout_json(output_json)
             df = ArqManipulation.json_to_df(parsed_json)
+            df['repository'] = self.repository
 
-            saved_parquet_df = ArqManipulation.read_parquet_file(paths.get('workflow'))
-            df_cleared = pd.concat([saved_parquet_df, df], axis=0, ignore_index=True).drop_duplicates()
-        
-            ArqManipulation.save_df_to_parquet(df = df_cleared, parquet_file_name=paths.get('workflow'))
+            # Re-run workflows keep their databaseId, their latest status replaces the stored one
+            workflows = KeyedTable(paths.get('workflow'), PRIMARY_KEYS.get('workflow'), ROW_GROUP_ROWS)
+            workflows.upsert(df)
+            workflows.save()
 
             return df.set_index('name')
 
@@ -220,10 +616,55 @@ class ActionsJobs:
         :param workflow: Workflow associated with the jobs.
         """
         self.repository = repository
+        # The jobs table is read once, on the first get_jobs call, and saved once by save_jobs
+        self.jobs = None
+        self.stored_jobs = None
+        self.timings = None
+
+    def get_job_timings(self, database_id: int) -> pd.DataFrame:
+        """
+        Retrieves the created, started and completed timestamps and the runner of each job of a run, and stores them.
+
+        :param database_id: The ID of the workflow run.
+        :return: A DataFrame with databaseId, jobId, job, status, conclusion, createdAt, startedAt, completedAt and runner columns.
+        """
+        columns = ['databaseId', 'jobId', 'job', 'status', 'conclusion', 'createdAt', 'startedAt', 'completedAt', 'runner']
+        command = (f'gh api repos/{self.repository}/actions/runs/{database_id}/jobs --paginate '
+                   "--jq '.jobs[] | {id, run_id, name, status, conclusion, created_at, started_at, completed_at, runner_name}'")
+        try:
+            output = run_gh(command).stdout
+        except subprocess.CalledProcessError as e:
+            print(f"Error retrieving the jobs of run {database_id}: {e}")
+            return pd.DataFrame(columns=columns)
+
+        jobs = [json.loads(line) for line in ArqManipulation.clean_ansi_escape(output).splitlines() if line.strip()]
+        df = pd.DataFrame(jobs, columns=['id', 'run_id', 'name', 'status', 'conclusion', 'created_at', 'started_at',
+                                         'completed_at', 'runner_name'])
+        df.columns = ['jobId', 'databaseId', 'job', 'status', 'conclusion', 'createdAt', 'startedAt', 'completedAt', 'runner']
+        df['databaseId'] = int(database_id)
+        for col in ('createdAt', 'startedAt', 'completedAt'):
+            df[col] = pd.to_datetime(df[col], utc=True)
+
+        if self.timings is None:
+            self.timings = KeyedTable(paths.get('job_timings'), PRIMARY_KEYS.get('job_timings'))
+        self.timings.upsert(df[columns])
+
+        return df[columns]
+
+    def save_jobs(self):
+        """
+        Persists the jobs retrieved by get_jobs, once per batch of runs.
+        """
+        if self.jobs is not None and self.jobs.chunks:
+            self.jobs.save()
+
+    def save_job_timings(self):
+        if self.timings is not None:
+            self.timings.save()
 
     def __retrieve_jobs__(self, database_id: int):
         command = f'gh run --repo {self.repository} view {database_id}'
-        jobs_data = subprocess.run(command, shell=True, text=True, check=True, capture_output=True).stdout
+        jobs_data = run_gh(command).stdout
 
         return jobs_data
 
@@ -235,26 +676,25 @@ class ActionsJobs:
             :return: A Pandas DataFrame containing job details.
             """
             try:
-                saved_parquet_df = ArqManipulation.read_parquet_file(parquet_file_name=paths.get('jobs'))
-                jobs_df = pd.DataFrame()
+                if self.stored_jobs is None:
+                    self.jobs = KeyedTable(paths.get('jobs'), PRIMARY_KEYS.get('jobs'), ROW_GROUP_ROWS)
+                    stored = self.jobs.df
+                    self.stored_jobs = {int(i): rows for i, rows in stored.groupby('databaseId')} if not stored.empty else {}
 
-                if saved_parquet_df.empty:
-                    data = self.__retrieve_jobs__(database_id=database_id)
-                    jobs_df = self.__clean_job_text__(data)
+                if int(database_id) in self.stored_jobs:
+                    return self.stored_jobs[int(database_id)]
 
-                    jobs_df["databaseId"] = int(database_id)
+                data = self.__retrieve_jobs__(database_id=database_id)
+                jobs_df = self.__clean_job_text__(data)
+                # A run whose jobs could not be parsed is not stored, so it is retried on the next call
+                if jobs_df.empty:
+                    return jobs_df
+                jobs_df["databaseId"] = int(database_id)
 
-                    ArqManipulation.save_df_to_parquet(jobs_df, parquet_file_name=paths.get('jobs'))
+                self.jobs.upsert(jobs_df)
+                self.stored_jobs[int(database_id)] = jobs_df
 
-                elif database_id not in saved_parquet_df['databaseId'].values:
-                    data = self.__retrieve_jobs__(database_id=database_id)
-                    data_df = self.__clean_job_text__(data)
-                    data_df["databaseId"] = int(database_id)
-
-                    jobs_df = pd.concat([saved_parquet_df, data_df], axis=0, ignore_index=True).drop_duplicates()
-                    ArqManipulation.save_df_to_parquet(jobs_df, parquet_file_name=paths.get('jobs'))
-
-                return pd.concat([saved_parquet_df, jobs_df])
+                return jobs_df
 
             except subprocess.CalledProcessError as e:
                 print(f"Error executing GitHub CLI command: {e}")
@@ -349,6 +789,40 @@ class ActionsJobs:
             print(f"Error processing job text: {e}")
             return pd.DataFrame()
 
+def run_gh(command: str | list[str], check: bool = True) -> subprocess.CompletedProcess:
+    """
+    Runs a GitHub CLI command, recording its latency in GH_CALL_STATS.
+
+    :param command: The full 'gh ...' command line, or its argument list, which is run without a shell.
+    :param check: Raises CalledProcessError when the command fails.
+    :return: The completed process, with its text stdout and stderr.
+    """
+    start = time.perf_counter()
+    try:
+        return subprocess.run(command, shell=isinstance(command, str), text=True, check=check, capture_output=True)
+    finally:
+        record_gh_call(command, time.perf_counter() - start)
+
+
+def record_gh_call(command: str | list[str], seconds: float):
+    """
+    Adds one call of a GitHub CLI command to GH_CALL_STATS, thread-safe as downloads run in threads.
+    """
+    words = (command.split() if isinstance(command, str) else list(command))[1:]
+    if words and words[0] == 'api':
+        # 'gh api repos/o/r/actions/runs/1/jobs ...' -> 'api jobs'
+        kind = f"api {words[1].rsplit('/', 1)[-1]}" if len(words) > 1 else 'api'
+    else:
+        words = [w for i, w in enumerate(words) if w != '--repo' and (i == 0 or words[i - 1] != '--repo')]
+        kind = ' '.join(words[:2])
+
+    with GH_CALL_STATS_LOCK:
+        stats = GH_CALL_STATS.setdefault(kind, {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+        stats['calls'] += 1
+        stats['seconds'] += seconds
+        stats['max_seconds'] = max(stats['max_seconds'], seconds)
+
+
 def str_time_to_int(time_str: str) -> int:
     """
     Converts a time string to seconds.
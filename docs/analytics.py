@@ -0,0 +1,244 @@
+import numpy as np
+import pandas as pd
+
+from actions import ArqManipulation, paths as actions_paths
+from LogExtractor import paths as log_paths
+
+
+TEST_KEY = ['category', 'name', 'arguments']
+
+
+class TestHistoryAnalytics:
+    """
+    Computes flakiness, pass-rate trends and duration regressions over the stored test history.
+
+    The history is kept as a compact frame (categorical keys, boolean outcomes) sorted by test and
+    creation date, so every metric is a vectorized groupby/rolling operation.
+    """
+
+    def __init__(self, status_df: pd.DataFrame = None, times_df: pd.DataFrame = None, workflow_df: pd.DataFrame = None):
+        """
+        Initializes the TestHistoryAnalytics object, reading the parquet stores for the frames not given.
+
+        :param status_df: Test status table, as produced by PytestArtifactLogExtractor.
+        :param times_df: Duration table, as produced by PytestArtifactLogExtractor.
+        :param workflow_df: Workflow runs table, used to date each run by its databaseId.
+        """
+        if status_df is None:
+            status_df = ArqManipulation.read_parquet_file(log_paths.get('status'))
+        if times_df is None:
+            times_df = ArqManipulation.read_parquet_file(log_paths.get('categories'))
+        if workflow_df is None:
+            workflow_df = ArqManipulation.read_parquet_file(actions_paths.get('workflow'))
+
+        self.run_dates = run_dates_from(workflow_df)
+        self.status = self.__compact_status__(status_df)
+        self.times = self.__compact_times__(times_df)
+
+    def flakiness(self, min_runs: int = 2) -> pd.DataFrame:
+        """
+        Scores each test by how often its outcome flips between consecutive runs.
+
+        :param min_runs: Tests with fewer runs are left out.
+        :return: A DataFrame indexed by test with runs, failures, fail_rate, flips and flakiness (flips / (runs - 1)).
+        """
+        df = self.status
+        if df.empty:
+            return pd.DataFrame(columns=['runs', 'failures', 'fail_rate', 'flips', 'flakiness'])
+
+        # Rows are sorted by test then date, so a flip is an outcome change within the same test
+        test_id = df.groupby(TEST_KEY, observed=True, sort=False).ngroup().to_numpy()
+        passed = df['passed'].to_numpy()
+        flip = np.zeros(len(df), dtype=bool)
+        flip[1:] = (test_id[1:] == test_id[:-1]) & (passed[1:] != passed[:-1])
+
+        scores = pd.DataFrame({'test_id': test_id, 'failed': ~passed, 'flip': flip}).groupby('test_id').agg(
+            runs=('failed', 'size'), failures=('failed', 'sum'), flips=('flip', 'sum'))
+        keys = df[TEST_KEY].groupby(test_id).first()
+
+        scores = keys.join(scores)
+        scores = scores[scores['runs'] >= min_runs]
+        scores['fail_rate'] = (scores['failures'] / scores['runs']).round(4)
+        scores['flakiness'] = (scores['flips'] / (scores['runs'] - 1)).round(4)
+
+        return scores.set_index(TEST_KEY)[['runs', 'failures', 'fail_rate', 'flips', 'flakiness']] \
+            .sort_values(['flakiness', 'fail_rate'], ascending=False)
+
+    def pass_rate_series(self, freq: str = 'D', window: int = 7, by: str = 'category') -> pd.DataFrame:
+        """
+        Computes the pass rate per period and its rolling average.
+
+        :param freq: Period size, as a pandas offset alias ('D', 'W', ...).
+        :param window: Rolling window, in periods.
+        :param by: Column to split the series by ('category' or 'name').
+        :return: A DataFrame indexed by (by, createdAt) with passed, total, pass_rate and rolling_pass_rate.
+        """
+        df = self.status.dropna(subset=['createdAt'])
+        if df.empty:
+            return pd.DataFrame(columns=['passed', 'total', 'pass_rate', 'rolling_pass_rate'])
+
+        series = df.groupby([by, pd.Grouper(key='createdAt', freq=freq)], observed=True)['passed'].agg(['sum', 'size'])
+        series.columns = ['passed', 'total']
+        series['pass_rate'] = (series['passed'] / series['total']).round(4)
+
+        # Rolling sums weight each period by its number of runs
+        rolling = series.groupby(level=0, observed=True)[['passed', 'total']] \
+            .rolling(window, min_periods=1).sum().droplevel(0)
+        series['rolling_pass_rate'] = (rolling['passed'] / rolling['total']).round(4)
+
+        return series
+
+    def duration_regressions(self, period: str = '30D', end: pd.Timestamp = None, metric: str = 'avg',
+                             min_samples: int = 3) -> pd.DataFrame:
+        """
+        Compares the p50/p95 of each test duration in the last period against the period before it.
+
+        :param period: Size of each compared window, as a pandas timedelta string.
+        :param end: End of the current window, defaults to the most recent run.
+        :param metric: Duration column to compare.
+        :param min_samples: Minimum number of samples required in both windows.
+        :return: A DataFrame indexed by (durationType, name) sorted by the p95 drift, slowest first.
+        """
+        df = self.times.dropna(subset=['createdAt', metric])
+        columns = ['p50_previous', 'p50_current', 'p95_previous', 'p95_current', 'p50_drift', 'p95_drift']
+        if df.empty:
+            return pd.DataFrame(columns=columns)
+
+        period = pd.Timedelta(period)
+        end = df['createdAt'].max() if end is None else pd.Timestamp(end)
+        start_current, start_previous = end - period, end - 2 * period
+
+        created = df['createdAt']
+        window = np.select([(created > start_current) & (created <= end), (created > start_previous) & (created <= start_current)],
+                           ['current', 'previous'], default='')
+        df = df.assign(window=window)
+        df = df[df['window'] != '']
+
+        grouped = df.groupby(['durationType', 'name', 'window'], observed=True)[metric]
+        stats = grouped.quantile([0.5, 0.95]).unstack()
+        stats['count'] = grouped.size()
+        stats = stats[stats['count'] >= min_samples].drop(columns='count').unstack('window')
+
+        if stats.empty or 'current' not in stats.columns.get_level_values(1) or 'previous' not in stats.columns.get_level_values(1):
+            return pd.DataFrame(columns=columns)
+
+        result = pd.DataFrame({
+            'p50_previous': stats[(0.5, 'previous')],
+            'p50_current': stats[(0.5, 'current')],
+            'p95_previous': stats[(0.95, 'previous')],
+            'p95_current': stats[(0.95, 'current')],
+        }).dropna()
+        result['p50_drift'] = (result['p50_current'] / result['p50_previous'] - 1).replace([np.inf, -np.inf], np.nan).round(4)
+        result['p95_drift'] = (result['p95_current'] / result['p95_previous'] - 1).replace([np.inf, -np.inf], np.nan).round(4)
+
+        return result[columns].sort_values('p95_drift', ascending=False)
+
+    def __compact_status__(self, status_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Reduces the status table to categorical keys, a boolean outcome and the run date, sorted by test and date.
+        """
+        columns = ['databaseId', 'createdAt', 'category', 'name', 'arguments', 'passed']
+        if status_df.empty:
+            return pd.DataFrame(columns=columns)
+
+        df = index_as_name(status_df)
+        compact = pd.DataFrame({
+            'databaseId': df['databaseId'].astype('int64'),
+            'category': df['category'].astype('category'),
+            'name': df['name'].astype('category'),
+            'arguments': df['arguments'].fillna('').astype('category'),
+            'passed': (df['status'] == 'PASSED').to_numpy(),
+        })
+        compact['createdAt'] = compact['databaseId'].map(self.run_dates)
+
+        return compact[columns].sort_values(TEST_KEY + ['createdAt', 'databaseId'], kind='stable', ignore_index=True)
+
+    def __compact_times__(self, times_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Reduces the duration table to categorical keys, float32 seconds and the run date, sorted by test and date.
+        """
+        metrics = ['avg', 'min', 'total']
+        if times_df.empty:
+            return pd.DataFrame(columns=['databaseId', 'createdAt', 'durationType', 'name'] + metrics)
+
+        df = index_as_name(times_df)
+        compact = pd.DataFrame({
+            'databaseId': df['databaseId'].astype('int64'),
+            'durationType': df['durationType'].str.strip().astype('category'),
+            'name': df['name'].astype('category'),
+        })
+        for metric in metrics:
+            compact[metric] = pd.to_numeric(df[metric], errors='coerce').astype('float32') if metric in df else np.nan
+        compact['createdAt'] = compact['databaseId'].map(self.run_dates)
+
+        return compact.sort_values(['durationType', 'name', 'createdAt'], kind='stable', ignore_index=True)
+
+
+def index_as_name(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Moves the test name index of the extractor tables (labeled 'pytest_tests_status', 'pytest_run_times', ...)
+    into a regular 'name' column.
+
+    :param df: A status, duration or failure table.
+    :return: The same table with a default index and a 'name' column.
+    """
+    if 'name' in df.columns:
+        return df.reset_index(drop=True)
+
+    return df.rename_axis('name').reset_index()
+
+
+def run_dates_from(workflow_df: pd.DataFrame) -> pd.Series:
+    """
+    Maps each workflow run to its creation date.
+
+    :param workflow_df: Workflow runs table.
+    :return: A UTC datetime Series indexed by databaseId.
+    """
+    if workflow_df.empty or 'databaseId' not in workflow_df.columns:
+        return pd.Series(dtype='datetime64[ns, UTC]', name='createdAt')
+
+    dates = workflow_df.drop_duplicates('databaseId', keep='last').set_index('databaseId')['createdAt']
+    return pd.to_datetime(dates, utc=True)
+
+
+def run_days(databaseIds: pd.Series, run_dates: pd.Series) -> pd.Series:
+    """
+    Maps runs to the (naive) day they were created, NaT for the runs missing from run_dates.
+
+    :param databaseIds: The runs.
+    :param run_dates: Creation dates, see run_dates_from.
+    :return: A datetime Series aligned with databaseIds.
+    """
+    # Unknown runs map to NaN, to_datetime keeps the column a datetime even when no run is known
+    dates = pd.to_datetime(databaseIds.map(run_dates), utc=True)
+    return dates.dt.tz_localize(None).dt.normalize()
+
+
+class DailyRunStore:
+    """
+    Base of the stores whose rows are keyed by run and carry the 'day' the run was created.
+    """
+
+    def __init__(self):
+        self.run_dates = None
+
+    def __filter__(self, df: pd.DataFrame, databaseIds, start, end) -> pd.DataFrame:
+        """
+        Keeps the rows of the given runs and date range, any of them left to None is not filtered on.
+        """
+        if databaseIds is not None:
+            df = df[df['databaseId'].isin(list(databaseIds))]
+        if start is not None:
+            df = df[df['day'] >= pd.Timestamp(start).normalize()]
+        if end is not None:
+            df = df[df['day'] <= pd.Timestamp(end).normalize()]
+        return df
+
+    def __run_dates__(self) -> pd.Series:
+        """
+        Dates each run through the workflow table, read once per store.
+        """
+        if self.run_dates is None:
+            self.run_dates = run_dates_from(ArqManipulation.read_parquet_file(actions_paths.get('workflow')))
+        return self.run_dates
@@ -0,0 +1,213 @@
+import os
+import json
+import argparse
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from actions import ArqManipulation, paths as actions_paths
+from failureClusters import FailureClusterStore
+from LogExtractor import paths as log_paths
+from reportAggregates import ReportAggregates
+from reportOutputs import ReportWriter
+from rollups import RollupStore
+from summaries import RunSummaryStore, durations_from_times, merge_duration_summaries
+
+
+class ReportSpec:
+    """
+    Describes a single report of a batch: its filters and where it is written.
+    """
+
+    def __init__(self, output_path: str, repository: str = None, category=None, initial_date=None, final_date=None,
+                 formats=('pdf',)):
+        """
+        Initializes the ReportSpec object.
+
+        :param output_path: Path of the report, without extension ('reports/repo-a' -> 'reports/repo-a.pdf').
+        :param repository: Only runs of this repository ("owner/repo").
+        :param category: A category or list of categories to keep.
+        :param initial_date: First day of the runs, 'dd-mm-YYYY' or any date pandas understands.
+        :param final_date: Last day of the runs, 'dd-mm-YYYY' or any date pandas understands.
+        :param formats: Output formats, see reportOutputs.OUTPUT_FORMATS.
+        """
+        self.output_path = output_path
+        self.repository = repository
+        self.categories = [category] if isinstance(category, str) else category
+        self.initial_date = to_utc_timestamp(initial_date)
+        self.final_date = to_utc_timestamp(final_date)
+        self.formats = list(formats)
+
+    @staticmethod
+    def from_dict(spec: dict):
+        return ReportSpec(**spec)
+
+
+class BatchReportGenerator:
+    """
+    Generates many reports from the stores: the workflow runs are dated once and the pre-aggregated rollups,
+    failure clusters and run summaries are loaded once and shared by every spec. Each spec reads back only
+    the raw rows it still needs, is aggregated in the parent and its rendering is fanned out over a process pool.
+    """
+
+    def __init__(self, workflow_df=None, rollups: RollupStore = None, clusters: FailureClusterStore = None,
+                 summaries: RunSummaryStore = None, max_workers: int = None, **pdf_options):
+        """
+        Initializes the BatchReportGenerator object, reading the parquet stores for the ones not given.
+
+        :param max_workers: Size of the process pool, defaults to the number of cores.
+        :param pdf_options: Extra PdfMaker options shared by every report (table_mode, ...).
+        """
+        workflow_df = ArqManipulation.read_parquet_file(actions_paths.get('workflow')) if workflow_df is None else workflow_df
+        self.rollups = rollups or RollupStore()
+        self.clusters = clusters or FailureClusterStore()
+        self.summaries = summaries or RunSummaryStore()
+
+        self.max_workers = max_workers or os.cpu_count()
+        self.pdf_options = pdf_options
+        self.runs = self.__runs__(workflow_df)
+
+    def run(self, specs: list) -> dict:
+        """
+        Builds every report.
+
+        :param specs: A list of ReportSpec (or dicts with the ReportSpec arguments).
+        :return: A dict of output_path to the written files, or to the error raised while rendering it.
+        """
+        specs = [spec if isinstance(spec, ReportSpec) else ReportSpec.from_dict(spec) for spec in specs]
+        results = {}
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {}
+            for spec in specs:
+                aggregates = self.aggregate(spec)
+                futures[pool.submit(render_report, aggregates, spec.output_path, spec.formats, self.pdf_options)] = spec
+
+            for future in as_completed(futures):
+                spec = futures[future]
+                try:
+                    results[spec.output_path] = future.result()
+                except Exception as e:
+                    print(f"Error generating report '{spec.output_path}': {e}")
+                    results[spec.output_path] = e
+
+        return results
+
+    def aggregate(self, spec: ReportSpec) -> ReportAggregates:
+        """
+        Aggregates the runs of a spec, as main.py does for a single report.
+
+        The counts and clusters come from the shared stores. Durations come from the run summaries,
+        and the runs without one fall back to their raw status and duration rows.
+
+        :param spec: The report filters.
+        :return: The ReportAggregates of the spec.
+        """
+        run_ids = self.select(spec)
+        covered_ids = self.summaries.covered_ids(run_ids)
+        uncovered_ids = run_ids - covered_ids
+
+        failures_df = self.__by_category__(ArqManipulation.read_parquet_where(log_paths.get('failures'), 'databaseId', run_ids), spec)
+        status_df = self.__by_category__(ArqManipulation.read_parquet_where(log_paths.get('status'), 'databaseId', uncovered_ids), spec)
+        categories_df = ArqManipulation.read_parquet_where(log_paths.get('categories'), 'databaseId', uncovered_ids)
+
+        duration_summary = merge_duration_summaries(self.summaries.duration_summary(databaseIds=covered_ids),
+                                                    durations_from_times(status_df, categories_df))
+        if spec.categories is not None:
+            duration_summary = duration_summary[duration_summary.index.isin(spec.categories)]
+
+        return ReportAggregates(status_df, categories_df, failures_df,
+                                status_counts=self.__by_category__(self.rollups.status_counts(databaseIds=run_ids), spec),
+                                error_counts=self.__by_category__(self.rollups.error_counts(databaseIds=run_ids), spec),
+                                cluster_counts=self.clusters.clusters(databaseIds=run_ids, categories=spec.categories),
+                                duration_summary=duration_summary if not duration_summary.empty else None)
+
+    def select(self, spec: ReportSpec) -> set:
+        """
+        Selects the runs of the spec's repository and date range.
+
+        :param spec: The report filters.
+        :return: The set of databaseIds of the spec.
+        """
+        runs = self.runs
+        if spec.repository is not None:
+            runs = runs[runs['repository'] == spec.repository]
+        if spec.initial_date is not None:
+            runs = runs[runs['createdAt'] >= spec.initial_date]
+        if spec.final_date is not None:
+            runs = runs[runs['createdAt'] <= spec.final_date]
+
+        return set(runs.index)
+
+    def __by_category__(self, df: pd.DataFrame, spec: ReportSpec) -> pd.DataFrame:
+        if df.empty or spec.categories is None:
+            return df
+        return df[df['category'].isin(spec.categories).to_numpy()]
+
+    def __runs__(self, workflow_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Indexes the workflow runs by databaseId with their date and repository.
+        """
+        if workflow_df.empty:
+            return pd.DataFrame(columns=['createdAt', 'repository'])
+
+        runs = workflow_df.drop_duplicates('databaseId', keep='last').set_index('databaseId')
+        if 'repository' not in runs.columns:
+            runs['repository'] = None
+        runs['createdAt'] = pd.to_datetime(runs['createdAt'], utc=True)
+
+        return runs[['createdAt', 'repository']]
+
+
+def render_report(aggregates: ReportAggregates, output_path: str, formats: list, pdf_options: dict) -> list[str]:
+    """
+    Renders one report, runs inside the pool workers.
+
+    :return: The written file paths.
+    """
+    output_dir, basename = os.path.split(output_path)
+    writer = ReportWriter(aggregates, output_dir=output_dir or '.', basename=basename, **pdf_options)
+    return [path for written in writer.write(formats).values() for path in written]
+
+
+def to_utc_timestamp(value):
+    """
+    Converts a 'dd-mm-YYYY' string (the main.py date format) or any pandas date into a UTC timestamp.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            return pd.to_datetime(value, format="%d-%m-%Y").tz_localize('UTC')
+        except ValueError:
+            pass
+    timestamp = pd.Timestamp(value)
+    return timestamp.tz_localize('UTC') if timestamp.tzinfo is None else timestamp.tz_convert('UTC')
+
+
+def batch_params():
+
+    parser = argparse.ArgumentParser(description='Generates one report per spec of a JSON list, in parallel')
+    parser.add_argument('--specs',
+                        required=True,
+                        help='JSON file with a list of specs: {"output_path", "repository", "category", "initial_date", "final_date", "formats"}')
+    parser.add_argument('--max_workers',
+                        required=False,
+                        type=int,
+                        help='Number of worker processes (default: number of cores)')
+    parser.add_argument('--table_mode',
+                        required=False,
+                        choices=['full', 'scalable'],
+                        default='full')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = batch_params()
+
+    with open(args.specs) as file:
+        specs = json.load(file)
+
+    generator = BatchReportGenerator(max_workers=args.max_workers, table_mode=args.table_mode)
+    for output_path, result in generator.run(specs).items():
+        print(f"{output_path}: {result}")
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+from actions import ArqManipulation, paths as actions_paths
+
+
+class CiMetrics:
+    """
+    Computes queue latency, concurrency over time and runner-minutes from the job timings
+    (created, started and completed timestamps of each job).
+
+    Every metric is a vectorized operation over timestamp arrays, concurrency is a sweep line over the
+    job intervals: one sort of the start and end events and a cumulative sum.
+    """
+
+    def __init__(self, job_timings_df: pd.DataFrame = None, workflow_df: pd.DataFrame = None):
+        """
+        Initializes the CiMetrics object, reading the parquet stores for the frames not given.
+
+        :param job_timings_df: Job timings table, see ActionsJobs.get_job_timings.
+        :param workflow_df: Workflow runs table, used to name the workflow of each job.
+        """
+        if job_timings_df is None:
+            job_timings_df = ArqManipulation.read_parquet_file(actions_paths.get('job_timings'))
+        if workflow_df is None:
+            workflow_df = ArqManipulation.read_parquet_file(actions_paths.get('workflow'))
+
+        self.jobs = self.__prepare__(job_timings_df, workflow_df)
+
+    def queue_latency(self, by: str = 'workflow') -> pd.DataFrame:
+        """
+        Summarizes how long jobs waited for a runner (started - created).
+
+        :param by: 'workflow', 'job' or 'runner'.
+        :return: A DataFrame indexed by the grouping with jobs, mean, p50, p95 and max seconds, longest p95 first.
+        """
+        df = self.jobs.dropna(subset=['queue_seconds'])
+        if df.empty:
+            return pd.DataFrame(columns=['jobs', 'mean', 'p50', 'p95', 'max'])
+
+        grouped = df.groupby(by, observed=True)['queue_seconds']
+        stats = grouped.agg(jobs='size', mean='mean', max='max')
+        percentiles = grouped.quantile([0.5, 0.95]).unstack()
+        stats.insert(2, 'p50', percentiles[0.5])
+        stats.insert(3, 'p95', percentiles[0.95])
+
+        return stats.sort_values('p95', ascending=False).round(2)
+
+    def concurrency(self, state: str = 'running') -> pd.DataFrame:
+        """
+        Counts the jobs running (started -> completed) or queued (created -> started) over time.
+
+        :param state: 'running' or 'queued'.
+        :return: A step function: a DataFrame indexed by timestamp with the 'jobs' count from that instant on.
+        """
+        if state not in ('running', 'queued'):
+            raise ValueError(f"Unknown state '{state}'")
+
+        begin, end = ('startedAt', 'completedAt') if state == 'running' else ('createdAt', 'startedAt')
+        df = self.jobs.dropna(subset=[begin, end])
+        if df.empty:
+            return pd.DataFrame({'jobs': pd.Series(dtype='int64')}, index=pd.DatetimeIndex([], tz='UTC', name='time'))
+
+        starts = df[begin].to_numpy(dtype='datetime64[ns]').view('int64')
+        ends = df[end].to_numpy(dtype='datetime64[ns]').view('int64')
+        times = np.concatenate([starts, ends])
+        deltas = np.concatenate([np.ones(len(starts), dtype='int64'), -np.ones(len(ends), dtype='int64')])
+
+        # Ends sort before starts at the same instant, so back-to-back jobs do not count as overlapping
+        order = np.lexsort((deltas, times))
+        times, counts = times[order], np.cumsum(deltas[order])
+        # One row per instant, with the count after all of its events
+        last = np.r_[times[1:] != times[:-1], True]
+
+        index = pd.DatetimeIndex(pd.to_datetime(times[last], utc=True), name='time')
+        return pd.DataFrame({'jobs': counts[last]}, index=index)
+
+    def peak_concurrency(self, freq: str = 'D', state: str = 'running') -> pd.DataFrame:
+        """
+        Highest and time-weighted average number of concurrent jobs per period.
+
+        :param freq: Period, as a pandas frequency ('h', 'D', 'W'...).
+        :param state: 'running' or 'queued'.
+        :return: A DataFrame indexed by period with peak and average columns.
+        """
+        steps = self.concurrency(state)
+        if steps.empty:
+            return pd.DataFrame(columns=['peak', 'average'])
+
+        # Period starts become steps too, so every period begins with the level carried into it,
+        # and the end of the last period closes the last step
+        boundaries = steps['jobs'].resample(freq, closed='left', label='left').size().index
+        boundaries = boundaries.append(pd.DatetimeIndex([boundaries[-1] + to_offset(freq)]))
+        levels = steps['jobs'].reindex(steps.index.union(boundaries)).ffill().fillna(0)
+
+        # Each level lasts until the next step
+        durations = np.diff(levels.index.asi8)
+        weighted = pd.DataFrame({'weighted': levels.to_numpy()[:-1] * durations, 'duration': durations,
+                                 'jobs': levels.to_numpy()[:-1]}, index=levels.index[:-1])
+        periods = weighted.resample(freq, closed='left', label='left').agg({'weighted': 'sum', 'duration': 'sum', 'jobs': 'max'})
+
+        average = (periods['weighted'] / periods['duration'].replace(0, np.nan)).fillna(periods['jobs'])
+        return pd.DataFrame({'peak': periods['jobs'].astype('int64'), 'average': average.round(2)})
+
+    def runner_minutes(self, by: str = 'workflow', freq: str = None) -> pd.DataFrame:
+        """
+        Sums the minutes jobs held a runner (completed - started).
+
+        :param by: 'workflow', 'job' or 'runner'.
+        :param freq: Also split by period of the job start, as a pandas frequency ('D', 'W'...).
+        :return: A DataFrame with jobs and runner_minutes per group, most consuming first.
+        """
+        df = self.jobs.dropna(subset=['run_seconds'])
+        if df.empty:
+            return pd.DataFrame(columns=['jobs', 'runner_minutes'])
+
+        keys = [by] if freq is None else [by, pd.Grouper(key='startedAt', freq=freq)]
+        minutes = df.groupby(keys, observed=True)['run_seconds'].agg(jobs='size', runner_minutes='sum')
+        minutes['runner_minutes'] = (minutes['runner_minutes'] / 60).round(2)
+
+        return minutes.sort_values('runner_minutes', ascending=False)
+
+    def __prepare__(self, job_timings_df: pd.DataFrame, workflow_df: pd.DataFrame) -> pd.DataFrame:
+        columns = ['databaseId', 'workflow', 'job', 'runner', 'createdAt', 'startedAt', 'completedAt', 'queue_seconds', 'run_seconds']
+        if job_timings_df.empty:
+            return pd.DataFrame(columns=columns)
+
+        df = job_timings_df.copy()
+        for col in ('createdAt', 'startedAt', 'completedAt'):
+            df[col] = pd.to_datetime(df[col], utc=True)
+
+        names = workflow_df.drop_duplicates('databaseId', keep='last').set_index('databaseId')['name'] \
+            if not workflow_df.empty and 'name' in workflow_df.columns else pd.Series(dtype=object)
+        df['workflow'] = df['databaseId'].map(names).fillna('unknown').astype('category')
+        df['job'] = df['job'].astype('category')
+        df['runner'] = df['runner'].fillna('unknown').astype('category')
+
+        df['queue_seconds'] = (df['startedAt'] - df['createdAt']).dt.total_seconds()
+        df['run_seconds'] = (df['completedAt'] - df['startedAt']).dt.total_seconds()
+
+        return df[columns]
@@ -5,29 +5,44 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle, Spacer, ListFlowable, ListItem, Spacer, Image
 from datetime import datetime
 
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
 import plotly.express as px
 import tempfile
 
+from rollups import status_counts_from, error_counts_from
+from analytics import index_as_name
+from reportAggregates import ReportAggregates, status_counts_table
+
+TABLE_MODES = ('full', 'scalable')
+
 class PdfDataPlotter:
-    def __init__(self, status_df, categories_df, failures_df):
+    def __init__(self, status_df, categories_df, failures_df, status_counts=None, error_counts=None):
         self.status_df = status_df
         self.categories_df = categories_df
         self.failures_df = failures_df
 
-        self.category_status_df = self.status_df[['category', 'status']]
+        # Charts read the (category, status) and (category, error) counts, either from the rollup store or grouped once here
+        self.status_counts = status_counts if status_counts is not None else status_counts_from(status_df)
+        self.error_counts = error_counts if error_counts is not None else error_counts_from(failures_df)
 
 
     def error_distribution_pie_chart(self):
-        error_distribution_df = self.status_df
+        return self.__write_png__(self.error_distribution_pie_figure())
+
+    def plot_category_errors_bar(self):
+        return self.__write_png__(self.category_errors_bar_figure())
 
-        # Filter for FAILED status
-        failed_df = error_distribution_df[error_distribution_df['status'] == 'FAILED']
+    def categories_failures_passed_rate(self):
+        return self.__write_png__(self.failures_passed_rate_figure())
+
+    def __write_png__(self, fig):
+        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmpfile:
+            fig.write_image(tmpfile.name, format="png", width=800, height=400)
+            return tmpfile.name
 
-        # Group by category and count the number of FAILED statuses
-        failed_counts = failed_df.groupby('category').size().reset_index(name='count')
+    def error_distribution_pie_figure(self):
+        # Filter for FAILED status and count them by category
+        failed_df = self.status_counts[self.status_counts['status'] == 'FAILED']
+        failed_counts = failed_df.groupby('category', as_index=False)['count'].sum()
 
         # Create the pie chart
         fig = px.pie(
@@ -51,13 +66,11 @@ class PdfDataPlotter:
             textinfo='percent+label'  # Show percentage and label
         )
 
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmpfile:
-            fig.write_image(tmpfile.name, format="png", width=800, height=400)
-            return tmpfile.name
+        return fig
     
-    def plot_category_errors_bar(self):
-        # Calculate the frequency of errors per category
-        error_freq_df = self.failures_df.groupby(['category', 'error']).size().reset_index(name='frequency')
+    def category_errors_bar_figure(self):
+        # Frequency of errors per category
+        error_freq_df = self.error_counts.rename(columns={'count': 'frequency'})
 
         # Create the bar plot
         fig = px.bar(
@@ -80,18 +93,12 @@ class PdfDataPlotter:
             margin=dict(l=20, r=20, t=40, b=20)  
         )
 
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmpfile:
-            fig.write_image(tmpfile.name, format="png", width=800, height=400)
-            return tmpfile.name
+        return fig
 
-    def categories_failures_passed_rate(self):
-        # Group by status and category, then calculate value counts
-        total_category = self.category_status_df.groupby(['status', 'category']).value_counts()
-
-        # Create a DataFrame for FAILED and PASSED counts, filling missing values with 0
-        status_freq_df = pd.DataFrame([total_category.FAILED, total_category.PASSED]).fillna(0).astype(int).T
-        status_freq_df.columns = ['FAILED', 'PASSED']
-        status_freq_df = status_freq_df.reset_index()
+    def failures_passed_rate_figure(self):
+        # Create a DataFrame for FAILED and PASSED counts per category, filling missing values with 0
+        status_freq_df = status_counts_table(self.status_counts)[['FAILED', 'PASSED']]
+        status_freq_df = status_freq_df.rename_axis('category').reset_index()
 
         # Calculate total, passed percentage, and failed percentage
         status_freq_df['TOTAL'] = status_freq_df['PASSED'] + status_freq_df['FAILED']
@@ -107,10 +114,8 @@ class PdfDataPlotter:
         )
 
         # Add real values for display in the plot
-        status_freq_long['Real Value'] = status_freq_long.apply(
-            lambda row: status_freq_df.loc[status_freq_df['category'] == row['category'], row['Status'].replace('_PCT', '')].values[0], 
-            axis=1
-        )
+        real_values = status_freq_df.melt(id_vars=['category'], value_vars=['PASSED', 'FAILED'], value_name='Real Value')
+        status_freq_long['Real Value'] = real_values['Real Value'].values
 
         # Create a stacked bar plot
         fig = px.bar(
@@ -129,18 +134,40 @@ class PdfDataPlotter:
         fig.update_yaxes(title='Porcentagem')
         fig.update_xaxes(title='Categoria')
 
-        # Save the plot to a temporary file
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmpfile:
-            fig.write_image(tmpfile.name, format="png", width=800, height=400)
-            return tmpfile.name
+        return fig
 
 class PdfMaker:
-    def __init__(self, status_df, categories_df, failures_df):
+    def __init__(self, status_df, categories_df, failures_df, status_counts=None, error_counts=None,
+                 table_mode='full', rows_per_page=35, top_n_failures=20, max_failure_rows=1000, aggregates=None):
+        """
+        Initializes the PdfMaker object.
+
+        :param status_counts: Pre-aggregated (category, status) counts, e.g. from RollupStore. Computed from status_df when absent.
+        :param error_counts: Pre-aggregated (category, error) counts, e.g. from RollupStore. Computed from failures_df when absent.
+        :param table_mode: 'full' renders every cell as a wrapped Paragraph in a single table, 'scalable' splits
+                           the rows into page-sized tables of plain strings and groups the failures by error.
+        :param rows_per_page: Rows of each table chunk in scalable mode.
+        :param top_n_failures: Number of (category, error) groups listed in scalable mode.
+        :param max_failure_rows: Cap on the individual failures listed in scalable mode, None lists them all.
+        :param aggregates: A ReportAggregates already computed for these frames, shared with other output formats.
+        """
+        if table_mode not in TABLE_MODES:
+            raise ValueError(f"Unknown table mode '{table_mode}', expected one of {TABLE_MODES}")
+
+        self.table_mode = table_mode
+        self.rows_per_page = rows_per_page
+        self.top_n_failures = top_n_failures
+        self.max_failure_rows = max_failure_rows
         self.status_df = status_df
         self.categories_df = categories_df
         self.failures_df = failures_df
-        self.metrics_df = self.__create_df__()
-        self.plotter = PdfDataPlotter(status_df=status_df, categories_df=categories_df, failures_df=failures_df)
+        self.aggregates = aggregates or ReportAggregates(status_df, categories_df, failures_df,
+                                                         status_counts=status_counts, error_counts=error_counts)
+        self.status_counts = self.aggregates.status_counts
+        self.error_counts = self.aggregates.error_counts
+        self.metrics_df = self.aggregates.metrics_df
+        self.plotter = PdfDataPlotter(status_df=status_df, categories_df=categories_df, failures_df=failures_df,
+                                      status_counts=self.status_counts, error_counts=self.error_counts)
         
         styles = getSampleStyleSheet()
         self.styles = {
@@ -161,38 +188,10 @@ class PdfMaker:
             'margin': 0.1 * A4[0],  # Use A4[0] directly to avoid circular dependency
         }
 
-    def get_time(self, metric):
-        time = pd.Series(dict(map(lambda t, x: (x, self.categories_df.loc[self.categories_df.index == t, metric].sum()), self.status_df.index.unique(), self.status_df.category.unique())))
-    
-        return time
-
-    def __create_df__(self):
-        # Count the total duration of each category
-        error_passed_info = self.status_df.groupby(by=['category','status'])
-        count_df = error_passed_info.size().unstack('status').fillna(0).astype(int)
-        count_df['total'] = count_df.sum(axis=1)
-
-        total_times = self.get_time('total')
-        avg_time_test = self.get_time('avg')
-        min_test_time  = self.get_time('min')
-
-        time_count_df = pd.concat([count_df['PASSED'], 
-                                   count_df['FAILED'], 
-                                   count_df['total'], 
-                                   min_test_time, 
-                                   avg_time_test, 
-                                   total_times], axis=1)
-        
-        time_count_df.columns = ['num_passed', 'num_failed', 'total_runs', 'min_test_time', 'avg_test_time', 'total_duration']
-        time_count_df['avg_test_time'] = (time_count_df['avg_test_time'] / time_count_df['total_runs']).round(2) 
-
-        report_df = pd.DataFrame({'name': self.status_df['category'].unique()}).set_index('name')
-        return  pd.concat([report_df, time_count_df], axis=1).reset_index().drop_duplicates().round(2)
-    
-    def create_pdf(self):
+    def create_pdf(self, output_path="report_v0.pdf"):
 
         # Create PDF with margins
-        doc = SimpleDocTemplate("report_v0.pdf", pagesize=A4,
+        doc = SimpleDocTemplate(output_path, pagesize=A4,
                                 leftMargin=self.dim['margin'], rightMargin=self.dim['margin'], topMargin=0.1*self.dim['height'], bottomMargin=0.1*self.dim['height'])
 
         # Create the story (content) for the PDF
@@ -248,18 +247,8 @@ class PdfMaker:
         story.append(Paragraph("Resumo Geral", self.styles['bold']))
         story.append(Spacer(1, 6))
 
-        fail_success_rate = (self.metrics_df['num_failed'].sum() / self.metrics_df['num_passed'].sum() * 100).round(2)
-
         # Criando a lista de resumo corretamente
-        summary_data = {
-            'Total de Testes:': self.metrics_df['total_runs'].sum(),
-            'Testes Bem-Sucedidos:': self.metrics_df['num_passed'].sum(),
-            'Testes com Falha:': self.metrics_df['num_failed'].sum(),
-            'Taxa de Sucessos/Falha:': f"{fail_success_rate}%",  # Round to 2 decimal places
-            'Tempo Mínimo de Execução:': f"{self.metrics_df['min_test_time'].min():.2f} s",
-            'Tempo Médio de Execução:': f"{self.metrics_df['avg_test_time'].mean():.2f} s",
-            'Duração Total dos Testes:': f"{self.metrics_df['total_duration'].sum():.2f} s"
-        }
+        summary_data = self.aggregates.summary_labels()
 
         # Criando a lista com bullet points
         bullet_points = [
@@ -297,15 +286,21 @@ class PdfMaker:
         df_renamed['Tempo Médio'] = df_renamed['Tempo Médio'].astype(str) + ' sec'
         df_renamed['Duração Total'] = df_renamed['Duração Total'].astype(str) + ' sec'
 
+        # Calculate available width after applying margins
+        available_width = self.dim['width'] - 2 * self.dim['margin']  
+
+        if self.table_mode == 'scalable':
+            col_widths = [available_width * p for p in [0.3, 0.14, 0.14, 0.14, 0.14, 0.14]]
+            story.extend(self.__paged_tables__(df_renamed.columns.tolist(), df_renamed.itertuples(index=False), col_widths))
+            story.append(Spacer(1, 24))
+            return story
+
         # Prepare the detailed data for the table
         detailed_tests_data = [[Paragraph(str(value), self.styles['normal']) for value in df_renamed.columns.tolist()]]  # Add header
         detailed_tests_data.extend(
             [[Paragraph(str(value), self.styles['normal']) for value in row] for row in df_renamed.values.tolist()]
         )
 
-        # Calculate available width after applying margins
-        available_width = self.dim['width'] - 2 * self.dim['margin']  
-
         # Define column proportions
         proportions = [0.3, 0.15, 0.15, 0.15, 0.2, 0.15] 
 
@@ -340,8 +335,8 @@ class PdfMaker:
         story.append(Paragraph("Resumo dos Erros", self.styles['bold']))
         story.append(Spacer(1, 12))
 
-        # Create a copy of the DataFrame and reset the index
-        df_copy = self.failures_df.copy().reset_index()
+        # Create a copy of the DataFrame with the test name as a column
+        df_copy = index_as_name(self.failures_df)[['name', 'status', 'category', 'error', 'error_details', 'databaseId']]
         df_copy.columns = [
             'Nome',
             'Status',
@@ -353,6 +348,11 @@ class PdfMaker:
 
         df_copy = df_copy.drop('Detalhes do erro (100 caracteres)', axis=1)
 
+        if self.table_mode == 'scalable':
+            story.extend(self.__failures_summary_scalable__(df_copy))
+            story.append(Spacer(1, 24))
+            return story
+
         # Prepare the detailed data for the table
         detailed_tests_data = [[Paragraph(str(value), self.styles['normal']) for value in df_copy.columns.tolist()]] 
         detailed_tests_data.extend(
@@ -378,6 +378,83 @@ class PdfMaker:
 
         return story
 
+    def __failures_summary_scalable__(self, df_copy):
+        """
+        Lists the most frequent (category, error) groups with their counts, followed by the individual
+        failures capped at max_failure_rows, all as page-sized plain string tables.
+
+        :param df_copy: Failures with the report column names.
+        :return: A list of elements to be added to the PDF.
+        """
+        story = []
+        available_width = self.dim['width'] - 2 * self.dim['margin']
+
+        top_errors = self.error_counts.sort_values('count', ascending=False, kind='stable').head(self.top_n_failures)
+        story.append(Paragraph(f"Erros mais frequentes (top {len(top_errors)} de {len(self.error_counts)} grupos)", self.styles['normal']))
+        story.append(Spacer(1, 6))
+        story.extend(self.__paged_tables__(['Categoria do Teste', 'Tipo de erro', 'Ocorrências'],
+                                           top_errors[['category', 'error', 'count']].itertuples(index=False),
+                                           [available_width * p for p in [0.45, 0.4, 0.15]]))
+        story.append(Spacer(1, 12))
+
+        # Near-identical messages grouped by their fingerprint
+        clusters = self.aggregates.cluster_counts.head(self.top_n_failures)
+        story.append(Paragraph(f"Mensagens de erro mais frequentes (top {len(clusters)} de {len(self.aggregates.cluster_counts)} assinaturas)", self.styles['normal']))
+        story.append(Spacer(1, 6))
+        story.extend(self.__paged_tables__(['Tipo de erro', 'Mensagem', 'Ocorrências', 'Execuções'],
+                                           clusters[['error', 'pattern', 'count', 'runs']].itertuples(index=False),
+                                           [available_width * p for p in [0.2, 0.56, 0.12, 0.12]]))
+        story.append(Spacer(1, 12))
+
+        listed = df_copy if self.max_failure_rows is None else df_copy.head(self.max_failure_rows)
+        story.extend(self.__paged_tables__(listed.columns.tolist(), listed.itertuples(index=False),
+                                           [available_width * p for p in [0.3, 0.12, 0.25, 0.18, 0.15]]))
+
+        omitted = len(df_copy) - len(listed)
+        if omitted > 0:
+            story.append(Spacer(1, 6))
+            story.append(Paragraph(f"... e mais {omitted} falhas omitidas", self.styles['normal']))
+
+        return story
+
+    def __paged_tables__(self, header, rows, col_widths, font_size=8):
+        """
+        Splits rows into page-sized tables with a repeated header. Only the header is wrapped in Paragraphs,
+        body cells are plain strings truncated to their column width, so layout cost grows linearly with the rows.
+
+        :param header: Column names.
+        :param rows: An iterable of row tuples, consumed lazily.
+        :param col_widths: Width of each column.
+        :param font_size: Font size of the body cells.
+        :return: A list of Table flowables.
+        """
+        header_row = [Paragraph(str(value), self.styles['normal']) for value in header]
+        # Helvetica averages about half the font size per character
+        max_chars = [max(int(width / (font_size * 0.5)) - 1, 4) for width in col_widths]
+        style = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), font_size),
+        ])
+
+        tables = []
+        chunk = []
+        for row in rows:
+            chunk.append([truncate_cell(value, limit) for value, limit in zip(row, max_chars)])
+            if len(chunk) == self.rows_per_page:
+                tables.append(self.__chunk_table__(header_row, chunk, col_widths, style))
+                chunk = []
+        if chunk:
+            tables.append(self.__chunk_table__(header_row, chunk, col_widths, style))
+
+        return tables
+
+    def __chunk_table__(self, header_row, chunk, col_widths, style):
+        table = Table([header_row] + chunk, colWidths=col_widths, repeatRows=1)
+        table.setStyle(style)
+        return table
+
     def create_graphs(self):
         img_width = 500
         img_height = 250
@@ -416,3 +493,12 @@ class PdfMaker:
 
         return story
 
+
+
+def truncate_cell(value, limit):
+    """
+    Converts a cell to a single-line string no longer than limit characters.
+    """
+    text = '' if value is None else str(value).replace('\n', ' ')
+    return text if len(text) <= limit else text[:limit - 3] + '...'
+
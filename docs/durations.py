@@ -0,0 +1,177 @@
+import re
+import numpy as np
+import pandas as pd
+
+from actions import ArqManipulation, ROW_GROUP_ROWS, fold_updates
+
+
+paths = {
+    'test_durations':'./bin/pytest.test_durations.parquet',
+    }
+
+# Test identity, as in the status table (imported by LogExtractor, so analytics is not imported here)
+TEST_KEY = ['category', 'name', 'arguments']
+DURATION_COLUMNS = ['databaseId', 'artifact', 'category', 'name', 'arguments', 'phase', 'seconds']
+PHASES = ['setup', 'call', 'teardown']
+# Low-cardinality columns, stored as dictionary-encoded categoricals
+CATEGORICAL_COLUMNS = ['artifact', 'category', 'phase']
+
+# pytest '--durations=0' header, e.g. '==== slowest durations ====' or '==== slowest 10 durations ===='
+SECTION_PATTERN = re.compile(r'^=+ slowest (?:\d+ )?durations =+\s*$', re.MULTILINE)
+# e.g. '0.51s call     tests/test_api.py::test_get[param-1]'
+LINE_PATTERN = re.compile(r'^\s*(\d+(?:\.\d+)?)s\s+(setup|call|teardown)\s+([^\s:]+)::(\S.*?)\s*$', re.MULTILINE)
+
+
+def parse_pytest_durations(text: str) -> pd.DataFrame:
+    """
+    Extracts the per-test setup/call/teardown timings of the pytest '--durations=0' section of a log.
+
+    Test identities follow the status table: category is the test file, name is the node name before
+    its parameters and arguments keep everything after the opening '['.
+
+    :param text: Cleaned log text.
+    :return: A DataFrame with category, name, arguments, phase and seconds (float32) columns.
+    """
+    section = SECTION_PATTERN.search(text)
+    if section is None:
+        return empty_durations(DURATION_COLUMNS[2:])
+
+    end = text.find('\n=', section.end())
+    matches = LINE_PATTERN.findall(text, section.end(), end if end != -1 else len(text))
+    if not matches:
+        return empty_durations(DURATION_COLUMNS[2:])
+
+    df = pd.DataFrame(matches, columns=['seconds', 'phase', 'category', 'node'])
+    node = df['node'].str.split('[', n=1, expand=True).reindex(columns=[0, 1])
+
+    return pd.DataFrame({
+        'category': df['category'],
+        'name': node[0].str.replace(' ', '', regex=False),
+        'arguments': node[1],
+        'phase': df['phase'],
+        'seconds': df['seconds'].astype('float32'),
+        })
+
+
+def empty_durations(columns=None) -> pd.DataFrame:
+    columns = columns or DURATION_COLUMNS
+    return pd.DataFrame({c: pd.Series(dtype='float32' if c == 'seconds' else object) for c in columns})
+
+
+def quantile_label(q: float) -> str:
+    """
+    Names a quantile column: 0.5 -> 'p50', 0.999 -> 'p99.9'.
+    """
+    # Rounding away the float noise of q * 100 keeps the decimals that matter
+    return f'p{round(q * 100, 6):g}'
+
+
+def duration_percentiles(durations_df: pd.DataFrame, by: str = 'test', phase: str = 'call',
+                         quantiles=(0.5, 0.95, 0.99)) -> pd.DataFrame:
+    """
+    Computes duration percentiles over per-test timings.
+
+    :param durations_df: A per-test timings table (see parse_pytest_durations).
+    :param by: 'test' for one row per (category, name, arguments), 'category' for one row per category.
+    :param phase: 'setup', 'call', 'teardown', or 'total' for the sum of the three phases of each run.
+    :param quantiles: The quantiles to compute, between 0 and 1.
+    :return: A DataFrame indexed by the grouping keys with runs, mean, max and one 'pNN' column per quantile, slowest first.
+    """
+    if by not in ('test', 'category'):
+        raise ValueError(f"Unknown grouping '{by}'")
+    if phase not in PHASES + ['total']:
+        raise ValueError(f"Unknown phase '{phase}'")
+
+    keys = TEST_KEY if by == 'test' else ['category']
+    labels = [quantile_label(q) for q in quantiles]
+    if durations_df.empty:
+        return pd.DataFrame(columns=['runs', 'mean', 'max'] + labels)
+
+    df = durations_df.astype({c: object for c in CATEGORICAL_COLUMNS if c in durations_df.columns})
+    df = df.assign(arguments=df['arguments'].fillna(''))
+    if phase == 'total':
+        df = df.groupby(['databaseId', 'artifact'] + TEST_KEY, dropna=False, sort=False, as_index=False)['seconds'].sum()
+    else:
+        df = df[df['phase'] == phase]
+
+    groups = df.groupby(keys, sort=False)
+    group_id = groups.ngroup().to_numpy()
+    seconds = df['seconds'].to_numpy(dtype='float64')
+
+    # Sorting once by (group, seconds) puts every group's sorted timings side by side,
+    # so each quantile is a linear interpolation at computed positions, for all groups at once
+    order = np.lexsort((seconds, group_id))
+    sorted_seconds = seconds[order]
+    counts = np.bincount(group_id)
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+
+    stats = pd.DataFrame({'runs': counts, 'mean': np.bincount(group_id, weights=seconds) / counts,
+                          'max': sorted_seconds[starts + counts - 1]}, index=groups.size().index)
+    for label, q in zip(labels, quantiles):
+        position = starts + q * (counts - 1)
+        lower = np.floor(position).astype('int64')
+        upper = np.ceil(position).astype('int64')
+        stats[label] = sorted_seconds[lower] + (sorted_seconds[upper] - sorted_seconds[lower]) * (position - lower)
+
+    return stats.sort_values(labels[-1] if labels else 'max', ascending=False, kind='stable')
+
+
+class TestDurationStore:
+    """
+    Stores the exact per-test setup/call/teardown timings of every run, one float32 row per (test, phase).
+
+    Rows are keyed by run and artifact, so re-ingesting an artifact replaces its timings.
+    Updates are buffered and folded into the table once, when it is saved or read.
+    """
+
+    def __init__(self):
+        self.df = ArqManipulation.read_parquet_file(paths.get('test_durations'))
+        if self.df.empty:
+            self.df = empty_durations()
+        self.pending = []
+
+    def update(self, artifact: str, durations_df: pd.DataFrame):
+        """
+        Replaces the timings of a single ingested artifact.
+
+        :param artifact: Artifact name inside its run (see PytestArtifactLogExtractor.artifact_name).
+        :param durations_df: The artifact's own per-test timings, with a databaseId column.
+        """
+        if durations_df.empty:
+            return
+
+        rows = durations_df.assign(artifact=artifact)[DURATION_COLUMNS]
+        keys = [(int(run_id), artifact or '') for run_id in rows['databaseId'].unique()]
+        self.pending.append((keys, rows))
+
+    def save(self):
+        self.__fold__()
+        df = self.df.astype({c: 'category' for c in CATEGORICAL_COLUMNS})
+        df = df.astype({'databaseId': 'int64', 'seconds': 'float32'})
+        ArqManipulation.save_df_to_parquet(df, paths.get('test_durations'), ROW_GROUP_ROWS)
+
+    def durations(self, databaseIds=None) -> pd.DataFrame:
+        """
+        Reads the stored timings, optionally limited to some runs.
+        """
+        self.__fold__()
+        return self.df if databaseIds is None else self.df[self.df['databaseId'].isin(list(databaseIds))]
+
+    def percentiles(self, by: str = 'test', phase: str = 'call', quantiles=(0.5, 0.95, 0.99), databaseIds=None,
+                    category: str = None) -> pd.DataFrame:
+        """
+        Computes duration percentiles per test or per category (see duration_percentiles).
+
+        :param databaseIds: Only timings of these runs.
+        :param category: Only timings of this category.
+        """
+        df = self.durations(databaseIds)
+        if category is not None:
+            df = df[df['category'] == category]
+        return duration_percentiles(df, by=by, phase=phase, quantiles=quantiles)
+
+    def __fold__(self):
+        if self.pending:
+            # The stored categoricals accept neither new values nor the '' of a missing artifact
+            self.df = fold_updates(self.df.astype({c: object for c in CATEGORICAL_COLUMNS}), self.pending)
+        self.pending = []
@@ -0,0 +1,16 @@
+from actions import ArqManipulation
+from LogExtractor import PytestArtifactLogExtractor
+from JUnitExtractor import JUnitArtifactExtractor
+
+
+def artifact_extractor(path: str) -> PytestArtifactLogExtractor:
+    """
+    Picks the extractor of an artifact file by its type: JUnit XML reports ('.xml', possibly compressed)
+    or pytest console logs for anything else.
+
+    :param path: Path to the artifact file.
+    :return: The extractor of the file.
+    """
+    if ArqManipulation.strip_compression_suffix(path).lower().endswith('.xml'):
+        return JUnitArtifactExtractor(path)
+    return PytestArtifactLogExtractor(path)
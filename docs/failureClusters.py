@@ -0,0 +1,97 @@
+import pandas as pd
+
+from actions import ArqManipulation, fold_updates
+from analytics import index_as_name
+from fingerprint import fingerprint_failures
+
+
+paths = {
+    'failure_clusters':'./bin/pytest.failure_clusters.parquet',
+    }
+
+CLUSTER_COLUMNS = ['fingerprint', 'databaseId', 'artifact', 'category', 'error', 'pattern', 'example', 'count']
+
+
+class FailureClusterStore:
+    """
+    Groups failures by message fingerprint at ingest time, next to the failure table.
+
+    Rows are kept per (fingerprint, run, artifact) so re-ingesting an artifact replaces its counts,
+    and clusters() merges them into one row per fingerprint. Updates are buffered and folded in once, when saved or read.
+    """
+
+    def __init__(self):
+        self.df = ArqManipulation.read_parquet_file(paths.get('failure_clusters'))
+        if self.df.empty:
+            self.df = pd.DataFrame(columns=CLUSTER_COLUMNS)
+        self.pending = []
+
+    def update(self, artifact: str, failures_df: pd.DataFrame):
+        """
+        Replaces the clusters of a single ingested artifact.
+
+        :param artifact: Artifact name inside its run (see PytestArtifactLogExtractor.artifact_name).
+        :param failures_df: The artifact's own failure table.
+        """
+        rows = cluster_rows(failures_df)
+        if rows.empty:
+            return
+
+        rows['artifact'] = artifact
+        keys = [(int(run_id), artifact or '') for run_id in rows['databaseId'].unique()]
+        self.pending.append((keys, rows[CLUSTER_COLUMNS]))
+
+    def save(self):
+        self.__fold__()
+        ArqManipulation.save_df_to_parquet(self.df, paths.get('failure_clusters'))
+
+    def clusters(self, databaseIds=None, categories=None) -> pd.DataFrame:
+        """
+        Merges the stored rows into one row per fingerprint.
+
+        :param databaseIds: Only clusters of these runs.
+        :param categories: Only failures of these categories.
+        :return: A DataFrame indexed by fingerprint with error, pattern, example, count, runs, first_run and last_run, most frequent first.
+        """
+        self.__fold__()
+        df = self.df if databaseIds is None else self.df[self.df['databaseId'].isin(list(databaseIds))]
+        if categories is not None:
+            df = df[df['category'].isin(list(categories))]
+        return summarize_clusters(df)
+
+    def __fold__(self):
+        self.df = fold_updates(self.df, self.pending)
+        self.pending = []
+
+
+def cluster_rows(failures_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Counts the failures of a table per (fingerprint, run, category).
+
+    :param failures_df: A failure table.
+    :return: A DataFrame with the CLUSTER_COLUMNS, except 'artifact'.
+    """
+    if failures_df.empty or 'error_details' not in failures_df.columns:
+        return pd.DataFrame(columns=CLUSTER_COLUMNS)
+
+    df = index_as_name(failures_df)
+    signatures = fingerprint_failures(df['error'], df['error_details'])
+    df = df.assign(fingerprint=signatures['fingerprint'], pattern=signatures['pattern'])
+
+    return df.groupby(['fingerprint', 'databaseId', 'category'], as_index=False).agg(
+        error=('error', 'first'), pattern=('pattern', 'first'), example=('error_details', 'first'), count=('name', 'size'))
+
+
+def summarize_clusters(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Merges cluster rows (see cluster_rows) into one row per fingerprint.
+    """
+    columns = ['error', 'pattern', 'example', 'count', 'runs', 'first_run', 'last_run']
+    if df.empty:
+        return pd.DataFrame(columns=columns).rename_axis('fingerprint')
+
+    clusters = df.groupby('fingerprint').agg(
+        error=('error', 'first'), pattern=('pattern', 'first'), example=('example', 'first'), count=('count', 'sum'),
+        runs=('databaseId', 'nunique'), first_run=('databaseId', 'min'), last_run=('databaseId', 'max'))
+
+    return clusters[columns].astype({'count': 'int64'}).sort_values('count', ascending=False, kind='stable')
@@ -0,0 +1,215 @@
+import re
+import numpy as np
+import pandas as pd
+
+from actions import ArqManipulation
+from analytics import index_as_name
+from fingerprint import ensure_fingerprints
+from LogExtractor import paths as log_paths
+
+
+paths = {
+    'failure_docs':'./bin/pytest.failures.index.docs.parquet',
+    'failure_postings':'./bin/pytest.failures.index.postings.parquet',
+    }
+
+DOC_COLUMNS = ['doc', 'databaseId', 'artifact', 'status', 'category', 'name', 'error', 'error_details', 'fingerprint']
+FIELDS = ('name', 'error', 'detail')
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+class FailureIndex:
+    """
+    A persistent inverted index over the failure history: test names, error classes and error-detail tokens
+    point to the failure rows (docs) they appear in.
+
+    Postings are stored sorted by (field, token), so exact and prefix lookups are binary searches and
+    substring lookups only scan the vocabulary of a field, never the failures themselves.
+    Added failures are buffered and merged into the index once, when it is saved or queried.
+    """
+
+    def __init__(self, load: bool = True):
+        """
+        Initializes the FailureIndex object.
+
+        :param load: Reads the persisted index, otherwise starts empty.
+        """
+        docs = ArqManipulation.read_parquet_file(paths.get('failure_docs')) if load else pd.DataFrame()
+        postings = ArqManipulation.read_parquet_file(paths.get('failure_postings')) if load else pd.DataFrame()
+
+        self.docs = docs if not docs.empty else pd.DataFrame(columns=DOC_COLUMNS)
+        self.postings = postings if not postings.empty else pd.DataFrame({'field': [], 'token': [], 'doc': []})
+        self.next_doc = int(self.docs['doc'].max()) + 1 if not self.docs.empty else 0
+        # Added docs and postings, merged with the stored ones once, when the index is saved or queried
+        self.pending_docs = []
+        self.pending_postings = []
+        # The postings are saved sorted, loading only rebuilds the lookups over them
+        self.__build_lookups__()
+
+    @staticmethod
+    def rebuild():
+        """
+        Builds a fresh index from the whole failure store.
+
+        :return: The new FailureIndex, already saved.
+        """
+        index = FailureIndex(load=False)
+        failures_df = ArqManipulation.read_parquet_file(log_paths.get('failures'))
+        if not failures_df.empty:
+            index.add(failures_df)
+        index.save()
+        return index
+
+    def add(self, failures_df: pd.DataFrame, artifact: str = None):
+        """
+        Indexes failures, replacing the ones previously indexed for the same runs and artifact.
+
+        :param failures_df: A failure table, as produced by PytestArtifactLogExtractor.
+        :param artifact: Artifact name inside its run (see PytestArtifactLogExtractor.artifact_name).
+        """
+        new_docs = index_as_name(ensure_fingerprints(failures_df)).dropna(subset=['name'])
+        if new_docs.empty:
+            return
+
+        new_docs = new_docs.assign(doc=np.arange(self.next_doc, self.next_doc + len(new_docs)), artifact=artifact)
+        new_docs = new_docs.reindex(columns=DOC_COLUMNS)
+        self.next_doc += len(new_docs)
+
+        self.pending_docs.append(new_docs)
+        self.pending_postings += [self.__postings_of__(new_docs, field) for field in FIELDS]
+        self.dirty = True
+
+    def save(self):
+        self.__merge__()
+        ArqManipulation.save_df_to_parquet(self.docs, paths.get('failure_docs'))
+        ArqManipulation.save_df_to_parquet(self.postings, paths.get('failure_postings'))
+
+    def query(self, test: str = None, error: str = None, detail: str = None, mode: str = 'prefix',
+              category: str = None, runs=None, fingerprint: str = None) -> pd.DataFrame:
+        """
+        Finds the failures matching every given criterion, e.g. all runs where test X failed with error Y.
+
+        :param test: Test name to look up.
+        :param error: Error class to look up.
+        :param detail: Words of the error details, all of them must match.
+        :param mode: 'exact', 'prefix' or 'substring' matching of the terms.
+        :param category: Only failures of this category.
+        :param runs: Only failures of these databaseIds.
+        :param fingerprint: Only failures of this message cluster.
+        :return: The matching failures, newest runs first.
+        """
+        if mode not in ('exact', 'prefix', 'substring'):
+            raise ValueError(f"Unknown match mode '{mode}'")
+        self.__merge__()
+
+        terms = [('name', test), ('error', error)]
+        terms += [('detail', token) for token in TOKEN_PATTERN.findall(detail.lower())] if detail else []
+
+        matched = None
+        for field, term in terms:
+            if term is None:
+                continue
+            docs = self.__lookup__(field, term if field == 'name' else term.lower(), mode)
+            matched = docs if matched is None else np.intersect1d(matched, docs, assume_unique=True)
+
+        result = self.docs if matched is None else self.docs[self.docs['doc'].isin(matched)]
+        if category is not None:
+            result = result[result['category'] == category]
+        if runs is not None:
+            result = result[result['databaseId'].isin(list(runs))]
+        if fingerprint is not None:
+            result = result[result['fingerprint'] == fingerprint]
+
+        return result.sort_values(['databaseId', 'doc'], ascending=False).drop(columns='doc')
+
+    def __lookup__(self, field: str, term: str, mode: str) -> np.ndarray:
+        """
+        Resolves one term into the sorted unique doc ids containing it.
+        """
+        lo, hi = self.field_ranges.get(field, (0, 0))
+        tokens = self.tokens[lo:hi]
+
+        if mode == 'exact':
+            start, end = np.searchsorted(tokens, term, side='left'), np.searchsorted(tokens, term, side='right')
+            docs = self.doc_ids[lo + start:lo + end]
+        elif mode == 'prefix':
+            # Every token starting with the prefix sorts between the prefix and the prefix followed by the highest code point
+            start, end = np.searchsorted(tokens, [term, term + '\U0010ffff'], side='left')
+            docs = self.doc_ids[lo + start:lo + end]
+        else:
+            vocabulary, first, counts = self.vocabularies[field]
+            hits = np.flatnonzero(pd.Series(vocabulary).str.contains(term, regex=False).to_numpy())
+            docs = np.concatenate([self.doc_ids[lo + first[i]:lo + first[i] + counts[i]] for i in hits]) if len(hits) else np.array([], dtype='int64')
+
+        return np.unique(docs)
+
+    def __postings_of__(self, docs: pd.DataFrame, field: str) -> pd.DataFrame:
+        if field == 'name':
+            tokens = docs['name'].astype(str)
+            return pd.DataFrame({'field': field, 'token': tokens.to_numpy(), 'doc': docs['doc'].to_numpy()})
+
+        column = 'error' if field == 'error' else 'error_details'
+        tokens = docs[column].fillna('').astype(str).str.lower()
+        if field == 'detail':
+            tokens = tokens.str.findall(TOKEN_PATTERN)
+        postings = pd.DataFrame({'token': tokens.to_numpy(), 'doc': docs['doc'].to_numpy()}).explode('token')
+        postings = postings[postings['token'].notna() & (postings['token'] != '')].drop_duplicates()
+        postings.insert(0, 'field', field)
+
+        return postings
+
+    def __merge__(self):
+        """
+        Merges the added docs and postings into the index. Re-ingesting an artifact replaces its docs:
+        the docs of a run and artifact only come from the last time it was added.
+        """
+        if self.pending_docs:
+            new_docs = pd.concat(self.pending_docs, ignore_index=True)
+            key = new_docs['databaseId'].astype('int64').astype(str) + '/' + new_docs['artifact'].fillna('').astype(str)
+            added = pd.Series(np.repeat(np.arange(len(self.pending_docs)), [len(docs) for docs in self.pending_docs]))
+            new_docs = new_docs[(added == added.groupby(key).transform('max')).to_numpy()]
+
+            if not self.docs.empty:
+                stored_key = self.docs['databaseId'].astype('int64').astype(str) + '/' + self.docs['artifact'].fillna('').astype(str)
+                self.docs = self.docs[~stored_key.isin(key.unique()).to_numpy()]
+
+            kept = np.concatenate([self.docs['doc'].to_numpy(dtype='int64'), new_docs['doc'].to_numpy(dtype='int64')])
+            postings = pd.concat([self.postings] + self.pending_postings, ignore_index=True) if not self.postings.empty \
+                else pd.concat(self.pending_postings, ignore_index=True)
+            self.postings = postings[postings['doc'].isin(kept)]
+            self.docs = pd.concat([self.docs, new_docs], ignore_index=True) if not self.docs.empty else new_docs.reset_index(drop=True)
+
+            self.pending_docs = []
+            self.pending_postings = []
+        if self.dirty:
+            self.__prepare__()
+
+    def __prepare__(self):
+        """
+        Sorts the postings by (field, token) and rebuilds the lookups, after docs were merged in.
+        """
+        self.postings = self.postings.sort_values(['field', 'token', 'doc'], ignore_index=True)
+        self.__build_lookups__()
+
+    def __build_lookups__(self):
+        """
+        Builds the per-field ranges and vocabularies used by the lookups over the sorted postings.
+        """
+        self.postings['doc'] = self.postings['doc'].astype('int64')
+        self.tokens = self.postings['token'].to_numpy(dtype=object)
+        self.doc_ids = self.postings['doc'].to_numpy()
+
+        fields = self.postings['field'].to_numpy(dtype=object)
+        self.field_ranges = {}
+        self.vocabularies = {}
+        for field in FIELDS:
+            lo, hi = np.searchsorted(fields, field, side='left'), np.searchsorted(fields, field, side='right')
+            self.field_ranges[field] = (lo, hi)
+
+            # Tokens are already sorted, so each distinct token starts where it differs from the previous one
+            field_tokens = self.tokens[lo:hi]
+            first = np.flatnonzero(np.r_[True, field_tokens[1:] != field_tokens[:-1]]) if hi > lo else np.array([], dtype='int64')
+            counts = np.diff(np.r_[first, hi - lo])
+            self.vocabularies[field] = (field_tokens[first], first, counts)
+
+        self.dirty = False
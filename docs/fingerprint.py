@@ -0,0 +1,76 @@
+import re
+import hashlib
+import pandas as pd
+
+# Applied in order: the specific shapes first, then hex ids and the remaining numbers.
+# Words merely containing a digit (S3Error, python3, test0) are kept, only numbers set apart by a separator are masked (worker-3)
+MASKS = [
+    (re.compile(r'\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b'), '<uuid>'),
+    (re.compile(r'\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?'), '<ts>'),
+    (re.compile(r'\b\d{4}-\d{2}-\d{2}\b|\b\d{2}/\d{2}/\d{4}\b'), '<date>'),
+    (re.compile(r'\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b'), '<time>'),
+    (re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b'), '<ip>'),
+    # Bucket suffixes, whatever their length (bucket-abc123, bucket_7f3e9a21)
+    (re.compile(r'(?<=bucket[-_])(?=[0-9a-f]*\d)[0-9a-f]+\b', re.IGNORECASE), '<id>'),
+    (re.compile(r'\b0x[0-9a-fA-F]+\b|\b[0-9a-fA-F]{12,}\b'), '<hex>'),
+    (re.compile(r'(?<![\w.-])\d+(?:\.\d+)?(?:[mun]?s|[mh]|[kKMG]i?B|B)?(?![\w.-])'), '<num>'),
+    (re.compile(r'\b(?=[0-9a-fA-F]*\d)(?=[0-9a-fA-F]*[a-fA-F])[0-9a-fA-F]{8,}\b'), '<id>'),
+    (re.compile(r'(?<=[-_:/#=@])\d+(?!\w)'), '<num>'),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+def normalize_messages(messages: pd.Series) -> pd.Series:
+    """
+    Masks the variable tokens of failure messages (ids, timestamps, numbers, addresses, bucket names...),
+    so messages that only differ by them become identical.
+
+    :param messages: Raw error details.
+    :return: The normalized messages.
+    """
+    normalized = messages.fillna('').astype(str)
+    for pattern, mask in MASKS:
+        normalized = normalized.str.replace(pattern, mask, regex=True)
+    return normalized.str.strip()
+
+
+def fingerprint_failures(errors: pd.Series, details: pd.Series) -> pd.DataFrame:
+    """
+    Hashes each failure's error class and normalized message into a signature.
+
+    :param errors: Error classes.
+    :param details: Raw error details.
+    :return: A DataFrame with the 'fingerprint' and the normalized 'pattern' of each failure, aligned with the inputs.
+    """
+    patterns = normalize_messages(details)
+    keys = errors.fillna('').astype(str) + '|' + patterns
+    # Hash each distinct signature once
+    unique_keys = keys.drop_duplicates()
+    hashes = pd.Series([hashlib.sha1(key.encode()).hexdigest()[:16] for key in unique_keys], index=unique_keys.to_numpy())
+
+    return pd.DataFrame({'fingerprint': keys.map(hashes).to_numpy(), 'pattern': patterns.to_numpy()}, index=details.index)
+
+
+def ensure_fingerprints(failures_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fills the fingerprint column of failures stored before fingerprinting existed.
+
+    :param failures_df: A failure table.
+    :return: The failure table with a complete 'fingerprint' column.
+    """
+    if failures_df.empty:
+        return failures_df.assign(fingerprint=pd.Series(dtype=object))
+
+    missing = failures_df['fingerprint'].isna() if 'fingerprint' in failures_df.columns else pd.Series(True, index=failures_df.index)
+    if not missing.any():
+        return failures_df
+
+    # Positional masks, the failure tables are indexed by the (repeated) test name
+    mask = missing.to_numpy()
+    computed = fingerprint_failures(failures_df['error'][mask], failures_df['error_details'][mask])
+
+    fingerprints = failures_df['fingerprint'].to_numpy(dtype=object).copy() if 'fingerprint' in failures_df.columns \
+        else pd.Series(None, index=failures_df.index, dtype=object).to_numpy()
+    fingerprints[mask] = computed['fingerprint'].to_numpy()
+
+    return failures_df.assign(fingerprint=fingerprints)
@@ -0,0 +1,149 @@
+import subprocess
+import time
+import pandas as pd
+
+from actions import KeyedTable, PRIMARY_KEYS, record_gh_call
+from tokenizer import iter_clean_lines
+
+
+paths = {
+    'job_steps':'./bin/actions_job_steps.parquet',
+    }
+
+STEP_COLUMNS = ['databaseId', 'jobId', 'job', 'step_number', 'step', 'startedAt', 'completedAt', 'seconds']
+
+
+class StepLogParser:
+    """
+    Splits a streamed job log ('<job>\\t<step>\\t<timestamp> <message>' lines, as printed by `gh run view --log`)
+    into steps, keeping only the first and last timestamps of the current step.
+    """
+
+    def __init__(self):
+        self.steps = []
+        self.current = None
+
+    def feed(self, line: str):
+        parts = line.split('\t', 2)
+        if len(parts) < 3:
+            return
+
+        job, step, rest = parts
+        timestamp = rest.lstrip('﻿').split(' ', 1)[0]
+        if not timestamp[:1].isdigit():
+            return
+
+        if self.current is None or self.current[1] != step:
+            self.__close_step__(next_start=timestamp)
+            self.current = [job, step, timestamp, timestamp]
+        else:
+            self.current[3] = timestamp
+
+    def close(self) -> pd.DataFrame:
+        """
+        Ends the log.
+
+        :return: A DataFrame with job, step_number, step, startedAt, completedAt and seconds columns.
+        """
+        self.__close_step__()
+        df = pd.DataFrame(self.steps, columns=['job', 'step', 'startedAt', 'completedAt'])
+        df.insert(1, 'step_number', range(1, len(df) + 1))
+        df['startedAt'] = pd.to_datetime(df['startedAt'], utc=True, format='ISO8601')
+        df['completedAt'] = pd.to_datetime(df['completedAt'], utc=True, format='ISO8601')
+        df['seconds'] = (df['completedAt'] - df['startedAt']).dt.total_seconds().astype('float32')
+
+        return df
+
+    def __close_step__(self, next_start: str = None):
+        if self.current is None:
+            return
+        # A step lasts until the next one starts, its own last line may be long before
+        job, step, started, last = self.current
+        self.steps.append((job, step, started, next_start or last))
+
+
+class ActionsJobSteps:
+    """
+    Ingests the step-level timings of GitHub Actions jobs from their logs (`gh run view --log --job`),
+    streamed line by line, so a job log is never held in memory.
+    """
+
+    def __init__(self, repository):
+        """
+        Initializes the ActionsJobSteps class.
+
+        :param repository: GitHub repository in the format "owner/repo".
+        """
+        self.repository = repository
+        self.table = KeyedTable(paths.get('job_steps'), PRIMARY_KEYS.get('job_steps'))
+
+    def get_steps(self, database_id: int, job_id: int) -> pd.DataFrame:
+        """
+        Streams the log of a job and parses its steps.
+
+        :param database_id: The ID of the workflow run.
+        :param job_id: The ID of the job.
+        :return: A DataFrame with the STEP_COLUMNS, one row per step.
+        """
+        command = f'gh run --repo {self.repository} view --log --job {job_id}'
+        parser = StepLogParser()
+        start = time.perf_counter()
+        # The log is parsed while it streams, the parsing time is taken out of the call time
+        parse_seconds = 0.0
+        try:
+            with subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL) as process:
+                for line in iter_clean_lines(process.stdout, chunk_size=1 << 16):
+                    fed = time.perf_counter()
+                    parser.feed(line)
+                    parse_seconds += time.perf_counter() - fed
+            if process.returncode != 0:
+                print(f"Error retrieving the log of job {job_id}: exit code {process.returncode}")
+        except Exception as e:
+            print(f"Unexpected error: {e}")
+            return pd.DataFrame(columns=STEP_COLUMNS)
+        finally:
+            record_gh_call(command, time.perf_counter() - start - parse_seconds)
+
+        steps = parser.close()
+        steps.insert(0, 'databaseId', int(database_id))
+        steps.insert(1, 'jobId', int(job_id))
+
+        return steps[STEP_COLUMNS]
+
+    def ingest(self, jobs_df: pd.DataFrame, refresh: bool = False):
+        """
+        Ingests the steps of jobs, skipping the jobs already stored.
+
+        :param jobs_df: Jobs table with databaseId and jobId columns, see ActionsJobs.
+        :param refresh: Ingests the stored jobs again.
+        """
+        if jobs_df.empty:
+            return
+
+        stored = set(self.table.df['jobId'].astype('int64')) if not self.table.df.empty and not refresh else set()
+        for database_id, job_id in jobs_df[['databaseId', 'jobId']].drop_duplicates().itertuples(index=False):
+            if int(job_id) not in stored:
+                self.table.upsert(self.get_steps(database_id, job_id))
+
+    def save(self):
+        self.table.save()
+
+    def slowest_steps(self, top: int = 20, databaseIds=None) -> pd.DataFrame:
+        """
+        Ranks the steps across runs by the total time spent in them.
+
+        :param top: Number of steps returned.
+        :param databaseIds: Only steps of these runs.
+        :return: A DataFrame indexed by (job, step) with runs, mean, p95, max and total seconds, costliest first.
+        """
+        df = self.table.df
+        if databaseIds is not None and not df.empty:
+            df = df[df['databaseId'].isin(list(databaseIds))]
+        if df.empty:
+            return pd.DataFrame(columns=['runs', 'mean', 'p95', 'max', 'total'])
+
+        grouped = df.groupby(['job', 'step'])['seconds']
+        stats = grouped.agg(runs='size', mean='mean', max='max', total='sum')
+        stats.insert(2, 'p95', grouped.quantile(0.95))
+
+        return stats.sort_values('total', ascending=False).head(top).round(2)
@@ -0,0 +1,152 @@
+import os
+import re
+import mmap
+import pandas as pd
+
+from actions import ArqManipulation, COMPRESSED_SUFFIXES, fold_updates
+from tokenizer import strip_ansi_bytes
+
+
+paths = {
+    'log_sections':'./bin/pytest.log_sections.parquet',
+    }
+
+SECTION_COLUMNS = ['path', 'size', 'mtime', 'kind', 'section', 'title', 'start', 'end']
+# '==== short test summary info ====' section headers and '____ test_get[2] ____' traceback block headers,
+# possibly colored, matched on the raw bytes so the offsets are the file's own
+HEADER_PATTERN = re.compile(rb'^(?:\x1b\[[0-9;]*[A-Za-z])*(={3,}|_{3,}) (.+?) [=_]{3,}(?:\x1b\[[0-9;]*[A-Za-z])*\r?$', re.MULTILINE)
+# Traceback blocks of setup/teardown errors are titled 'ERROR at setup of test_conn[a]'
+ERROR_TITLE_PATTERN = re.compile(r'^ERROR at \w+ of ')
+
+
+def index_sections(path: str) -> pd.DataFrame:
+    """
+    Finds the byte offsets of every section and traceback block of a pytest console log.
+    Plain files are scanned through mmap, compressed ones are decompressed and their offsets refer to the decompressed stream.
+
+    :param path: Path to the log file.
+    :return: A DataFrame with the SECTION_COLUMNS, one row per section ('section') or per failing test block ('traceback').
+    """
+    stat = os.stat(path)
+    if stat.st_size == 0:
+        return pd.DataFrame(columns=SECTION_COLUMNS)
+
+    if path.endswith(COMPRESSED_SUFFIXES):
+        with ArqManipulation.open_binary(path) as stream:
+            data = stream.read()
+        headers = [(m.start(), m.group(1)[:1], m.group(2)) for m in HEADER_PATTERN.finditer(data)]
+        size = len(data)
+    else:
+        with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            headers = [(m.start(), m.group(1)[:1], m.group(2)) for m in HEADER_PATTERN.finditer(data)]
+            size = len(data)
+
+    rows = []
+    sections = [h for h in headers if h[1] == b'=']
+    for i, (start, _, title) in enumerate(sections):
+        end = sections[i + 1][0] if i + 1 < len(sections) else size
+        section = clean_title(title)
+        rows.append(('section', section, section, start, end))
+
+        blocks = [h for h in headers if h[1] == b'_' and start < h[0] < end]
+        for j, (block_start, _, block_title) in enumerate(blocks):
+            block_end = blocks[j + 1][0] if j + 1 < len(blocks) else end
+            rows.append(('traceback', section, ERROR_TITLE_PATTERN.sub('', clean_title(block_title)), block_start, block_end))
+
+    df = pd.DataFrame(rows, columns=['kind', 'section', 'title', 'start', 'end'])
+    df.insert(0, 'path', path)
+    df.insert(1, 'size', stat.st_size)
+    df.insert(2, 'mtime', stat.st_mtime)
+
+    return df[SECTION_COLUMNS].astype({'start': 'int64', 'end': 'int64'})
+
+
+def clean_title(title: bytes) -> str:
+    return strip_ansi_bytes(title).decode('utf-8', errors='replace').strip()
+
+
+def read_slice(path: str, start: int, end: int) -> str:
+    """
+    Reads a byte range of a log, seeking straight to it (compressed files are decompressed up to it).
+
+    :return: The cleaned text of the range.
+    """
+    with ArqManipulation.open_binary(path) as file:
+        file.seek(start)
+        data = file.read(end - start)
+
+    return strip_ansi_bytes(data).decode('utf-8', errors='replace')
+
+
+class LogSectionIndex:
+    """
+    A sidecar index of byte offsets into the ingested pytest logs: section headers ('short test summary info',
+    'slowest durations', ...) and the traceback block of each failing test.
+
+    Triage tools seek directly to the slice they need instead of reading and cleaning the whole log.
+    Entries record the file size and mtime, so a log rewritten since (e.g. compressed by the retention) is re-indexed on read.
+    Updates are buffered and folded into the index once, when it is saved or read.
+    """
+
+    def __init__(self):
+        self.df = ArqManipulation.read_parquet_file(paths.get('log_sections'))
+        if self.df.empty:
+            self.df = pd.DataFrame(columns=SECTION_COLUMNS)
+        self.pending = []
+
+    def update(self, sections_df: pd.DataFrame):
+        """
+        Replaces the entries of the logs indexed in sections_df (see index_sections).
+        """
+        if sections_df.empty:
+            return
+
+        self.pending.append(([(path,) for path in sections_df['path'].unique()], sections_df))
+
+    def save(self):
+        self.__fold__()
+        ArqManipulation.save_df_to_parquet(self.df, paths.get('log_sections'))
+
+    def entries(self, path: str) -> pd.DataFrame:
+        """
+        The index entries of a log, indexing it first when it is missing or stale.
+        """
+        self.__fold__()
+        entries = self.df[self.df['path'] == path]
+        stat = os.stat(path)
+        if entries.empty or entries['size'].iloc[0] != stat.st_size or entries['mtime'].iloc[0] != stat.st_mtime:
+            entries = index_sections(path)
+            self.update(entries)
+        return entries
+
+    def section(self, path: str, title: str) -> str:
+        """
+        Reads one section of a log, e.g. 'short test summary info'.
+
+        :param path: Path to the log file.
+        :param title: Section title, or the start of it.
+        :return: The section text, None when the log has no such section.
+        """
+        entries = self.entries(path)
+        matches = entries[(entries['kind'] == 'section') & entries['title'].str.startswith(title)]
+        if matches.empty:
+            return None
+        return read_slice(path, int(matches['start'].iloc[0]), int(matches['end'].iloc[0]))
+
+    def traceback(self, path: str, test: str) -> str:
+        """
+        Reads the traceback block of one failing test.
+
+        :param path: Path to the log file.
+        :param test: Test name with its arguments, as in the block header ('test_get[2]').
+        :return: The traceback text, None when the log has no block for the test.
+        """
+        entries = self.entries(path)
+        matches = entries[(entries['kind'] == 'traceback') & (entries['title'] == test)]
+        if matches.empty:
+            return None
+        return read_slice(path, int(matches['start'].iloc[0]), int(matches['end'].iloc[0]))
+
+    def __fold__(self):
+        self.df = fold_updates(self.df, self.pending, columns=['path'])
+        self.pending = []
@@ -1,9 +1,27 @@
-import LogExtractor as extractor
 import pandas as pd
 import argparse
-from createPdf import PdfMaker
-from actions import ActionsWorkflow, ActionsJobs, ActionsArtifacts
+from reportAggregates import ReportAggregates
+from reportOutputs import ReportWriter, OUTPUT_FORMATS
+from actions import ActionsWorkflow, ActionsJobs, ActionsArtifacts, ArqManipulation, paths as actions_paths
+from retention import ArtifactRetention
+from rollups import RollupStore
+from failureIndex import FailureIndex
+from failureClusters import FailureClusterStore
+from durations import TestDurationStore
+from summaries import RunSummaryStore, durations_from_times, merge_duration_summaries
+from pipeline import IngestPipeline
+from logIndex import LogSectionIndex
+from jobSteps import ActionsJobSteps
+from ciMetrics import CiMetrics
+from runDiff import RunDiff
+from metricsExport import MetricsExporter
+from storeExport import STORES, EXPORT_FORMATS, export_store
+from sqlStore import SqliteResultStore, paths as sql_paths
+from LogExtractor import paths as log_paths, PytestResultStores
 import re
+import sys
+import json
+import time
 
 
 def get_ids_in_date_range(df, initial_date, final_date):
@@ -27,9 +45,193 @@ def regex_type(pattern: str | re.Pattern):
     return closure_check_regex
 
 
-def pdf_params():
+def pdf_params(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
 
     parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='command')
+
+    report_parser = subparsers.add_parser('report', help='Ingest the workflow runs of a date range and generate the reports (default)')
+    add_report_params(report_parser)
+
+    query_parser = subparsers.add_parser('query-failures', help='Search the failure history index')
+    add_query_failures_params(query_parser)
+
+    export_parser = subparsers.add_parser('export', help='Export a result store to CSV or JSON Lines, batch by batch')
+    add_export_params(export_parser)
+
+    sql_parser = subparsers.add_parser('sql', help='Run a SQL query over the SQLite result store')
+    add_sql_params(sql_parser)
+
+    steps_parser = subparsers.add_parser('slowest-steps', help='Rank the CI job steps by the total time spent in them')
+    add_slowest_steps_params(steps_parser)
+
+    diff_parser = subparsers.add_parser('diff', help='Compare two runs or date ranges: newly failing, fixed and slower tests')
+    add_diff_params(diff_parser)
+
+    metrics_parser = subparsers.add_parser('ci-metrics', help='Print the queue latency, concurrency and runner-minutes of the CI jobs')
+    add_ci_metrics_params(metrics_parser)
+
+    log_parser = subparsers.add_parser('show-log', help='Print a section or a failing test traceback of an artifact log')
+    add_show_log_params(log_parser)
+
+    # Plain flags keep working as the 'report' command
+    if not argv or argv[0] not in subparsers.choices:
+        argv = ['report'] + list(argv)
+
+    return parser.parse_args(argv)
+
+
+def add_query_failures_params(parser):
+    parser.add_argument('--test',
+                        required=False,
+                        help='Test name')
+    parser.add_argument('--error',
+                        required=False,
+                        help='Error class, e.g. AssertionError')
+    parser.add_argument('--detail',
+                        required=False,
+                        help='Words of the error details')
+    parser.add_argument('--category',
+                        required=False,
+                        help='Test category')
+    parser.add_argument('--fingerprint',
+                        required=False,
+                        help='Failure message cluster signature')
+    parser.add_argument('--mode',
+                        required=False,
+                        choices=['exact', 'prefix', 'substring'],
+                        default='prefix',
+                        help='How the terms are matched (default: prefix)')
+    parser.add_argument('--limit',
+                        required=False,
+                        type=int,
+                        default=50,
+                        help='Maximum number of failures printed')
+    parser.add_argument('--rebuild',
+                        action='store_true',
+                        help='Rebuild the index from the whole failure store before querying')
+
+
+def add_export_params(parser):
+    parser.add_argument('--table',
+                        required=True,
+                        choices=list(STORES),
+                        help='Result store to export')
+    parser.add_argument('--format',
+                        required=False,
+                        choices=EXPORT_FORMATS,
+                        default='csv',
+                        help='Output format (default: csv)')
+    parser.add_argument('--output',
+                        required=True,
+                        help='Path of the exported file')
+    parser.add_argument('--columns',
+                        required=False,
+                        help='Comma-separated columns to export (default: all)')
+    parser.add_argument('--batch_size',
+                        required=False,
+                        type=int,
+                        default=100_000,
+                        help='Rows read and written at a time')
+
+
+def add_sql_params(parser):
+    parser.add_argument('query',
+                        help='SELECT statement over the workflow, jobs, status, categories, failures and test_durations tables')
+    parser.add_argument('--db',
+                        required=False,
+                        default=sql_paths.get('sqlite'),
+                        help='Path to the SQLite file')
+    parser.add_argument('--limit',
+                        required=False,
+                        type=int,
+                        default=50,
+                        help='Maximum number of rows printed')
+
+
+def add_show_log_params(parser):
+    parser.add_argument('path',
+                        help='Path to the artifact log')
+    parser.add_argument('--section',
+                        required=False,
+                        help="Section title, or the start of it, e.g. 'short test summary'")
+    parser.add_argument('--test',
+                        required=False,
+                        help="Failing test with its arguments, e.g. 'test_get[2]'")
+
+
+def add_slowest_steps_params(parser):
+    parser.add_argument('--top',
+                        required=False,
+                        type=int,
+                        default=20,
+                        help='Number of steps printed')
+
+
+def add_diff_params(parser):
+    parser.add_argument('--repo_path',
+                        required=False,
+                        type=regex_type(r"[A-Z0-9a-z-]+\/[A-Z0-9a-z-]+\/*"),
+                        help='Only compare runs of this repository (default: the repository of the latest run)')
+    parser.add_argument('--workflow',
+                        required=False,
+                        help='Only compare runs of this workflow name (default: the workflow of the latest run)')
+    parser.add_argument('--base_runs',
+                        required=False,
+                        type=int,
+                        nargs='+',
+                        help='databaseIds of the reference runs (default: the run before the latest one of the repository and workflow)')
+    parser.add_argument('--head_runs',
+                        required=False,
+                        type=int,
+                        nargs='+',
+                        help='databaseIds of the compared runs (default: the latest run of the repository and workflow)')
+    parser.add_argument('--base_dates',
+                        required=False,
+                        nargs=2,
+                        type=regex_type(r"[0-9]{2}-[0-9]{2}-[0-9]{4}"),
+                        metavar=('INITIAL_DATE', 'FINAL_DATE'),
+                        help='Reference runs created in this date range, instead of --base_runs')
+    parser.add_argument('--head_dates',
+                        required=False,
+                        nargs=2,
+                        type=regex_type(r"[0-9]{2}-[0-9]{2}-[0-9]{4}"),
+                        metavar=('INITIAL_DATE', 'FINAL_DATE'),
+                        help='Compared runs created in this date range, instead of --head_runs')
+    parser.add_argument('--min_ratio',
+                        required=False,
+                        type=float,
+                        default=1.5,
+                        help='Minimum head / base duration ratio of a duration jump (default: 1.5)')
+    parser.add_argument('--min_seconds',
+                        required=False,
+                        type=float,
+                        default=0.5,
+                        help='Minimum increase in seconds of a duration jump (default: 0.5)')
+    parser.add_argument('--limit',
+                        required=False,
+                        type=int,
+                        default=50,
+                        help='Maximum number of tests printed per list')
+    parser.add_argument('--json',
+                        action='store_true',
+                        help='Print the report as JSON')
+
+
+def add_ci_metrics_params(parser):
+    parser.add_argument('--by',
+                        required=False,
+                        choices=['workflow', 'job', 'runner'],
+                        default='workflow',
+                        help='Grouping of the queue latency and runner-minutes (default: workflow)')
+    parser.add_argument('--freq',
+                        required=False,
+                        default='D',
+                        help="Period of the concurrency and runner-minutes series, as a pandas frequency (default: 'D')")
+
+
+def add_report_params(parser):
     parser.add_argument('--repo_path', 
                         required=True, 
                         type=regex_type(r"[A-Z0-9a-z-]+\/[A-Z0-9a-z-]+\/*"))
@@ -46,15 +248,72 @@ def pdf_params():
                         required=True, 
                         type=regex_type(r"[0-9]{2}-[0-9]{2}-[0-9]{4}"), 
                         help='Date of the last query')
-
-    return parser.parse_args()
+    parser.add_argument('--artifact_pattern',
+                        required=False,
+                        action='append',
+                        help='Glob pattern of the artifact names to download, may be repeated (default: all)')
+    parser.add_argument('--table_mode',
+                        required=False,
+                        choices=['full', 'scalable'],
+                        default='full',
+                        help="'scalable' renders page-sized plain tables and groups failures, for large reports")
+    parser.add_argument('--output_format',
+                        required=False,
+                        action='append',
+                        choices=OUTPUT_FORMATS,
+                        help='Report output format, may be repeated (default: pdf)')
+    parser.add_argument('--output_dir',
+                        required=False,
+                        default='.',
+                        help='Directory of the generated reports')
+    parser.add_argument('--keep_days',
+                        required=False,
+                        type=int,
+                        help='Delete downloaded artifacts older than N days')
+    parser.add_argument('--max_artifacts_mb',
+                        required=False,
+                        type=int,
+                        help='Disk-size cap for the artifacts folder, least recently used runs are evicted')
+    parser.add_argument('--compress_after_days',
+                        required=False,
+                        type=int,
+                        help='Compress raw artifact logs older than N days')
+    parser.add_argument('--persisted_only',
+                        action='store_true',
+                        help='Keep only artifacts whose parsed results are persisted')
+    parser.add_argument('--job_steps',
+                        action='store_true',
+                        help='Also ingest the step timings of the jobs from their logs')
+    parser.add_argument('--job_timings',
+                        action='store_true',
+                        help='Also ingest the queue and run timestamps of the jobs, see the ci-metrics command')
+    parser.add_argument('--download_workers',
+                        required=False,
+                        type=int,
+                        default=4,
+                        help='Concurrent run downloads')
+    parser.add_argument('--parse_workers',
+                        required=False,
+                        type=int,
+                        help='Parser processes (default: number of cores, 0 parses in the main process)')
+    parser.add_argument('--metrics_file',
+                        required=False,
+                        help='Also write the test health and tool performance metrics to this text file')
+    parser.add_argument('--metrics_format',
+                        required=False,
+                        choices=['openmetrics', 'prometheus'],
+                        default='openmetrics',
+                        help="Format of the metrics file, 'prometheus' for the node exporter textfile collector (default: openmetrics)")
+    parser.add_argument('--sqlite',
+                        required=False,
+                        nargs='?',
+                        const=sql_paths.get('sqlite'),
+                        help='Also feed the SQLite result store (optionally at this path) and build the report from it')
 
 
     
 
-if __name__ == '__main__':
-    args = pdf_params()
-
+def run_report(args):
     print('Querying Workflows...')
     workflow = ActionsWorkflow(repository=args.repo_path, query_size=args.query_size)
     workflowIds = get_ids_in_date_range(workflow.df, args.initial_date, args.final_date)
@@ -62,24 +321,228 @@ if __name__ == '__main__':
     print("Retrieving workflow Jobs...")
     jobs = ActionsJobs(args.repo_path)
 
-    all_workflows_jobs = pd.DataFrame()
+    all_workflows_jobs = pd.concat([jobs.get_jobs(id) for id in set(workflowIds)] or [pd.DataFrame()])
+    jobs.save_jobs()
+
+    if args.job_steps:
+        print("Retrieving job steps...")
+        job_steps = ActionsJobSteps(args.repo_path)
+        job_steps.ingest(all_workflows_jobs)
+        job_steps.save()
 
-    for id in set(workflowIds):
-        all_workflows_jobs = pd.concat([all_workflows_jobs, jobs.get_jobs(id)])
+    if args.job_timings:
+        print("Retrieving job timings...")
+        for id in set(workflowIds):
+            jobs.get_job_timings(id)
+        jobs.save_job_timings()
+
+    sql_store = SqliteResultStore(args.sqlite) if args.sqlite else None
+    if sql_store:
+        sql_store.upsert('workflow', workflow.df.reset_index())
+        sql_store.upsert('jobs', all_workflows_jobs)
 
     print("Getting available artifacts...")
-    artifacts = ActionsArtifacts(workflowIds, repository=args.repo_path)
-    all_tests_df = pd.DataFrame()
-    all_times_df = pd.DataFrame()
-    all_failures_df = pd.DataFrame()
-
-    for path in artifacts.paths:
-        artifact = extractor.PytestArtifactLogExtractor(path)
-        pytest_tests_status	, pytest_run_times, pytest_failures_errors = artifact.log_to_df()
-        all_tests_df = pd.concat([all_tests_df, pytest_tests_status]).drop_duplicates()
-        all_times_df = pd.concat([all_times_df, pytest_run_times]).drop_duplicates()
-        all_failures_df = pd.concat([all_failures_df, pytest_failures_errors]).drop_duplicates()
-
-    print("Generating Pdf...")
-    p = PdfMaker(all_tests_df, all_times_df, all_failures_df)
-    p.create_pdf()
\ No newline at end of file
+    artifacts = ActionsArtifacts(workflowIds, repository=args.repo_path, name_patterns=args.artifact_pattern, download=False)
+    stores = PytestResultStores()
+    rollups = RollupStore()
+    failure_index = FailureIndex()
+    clusters = FailureClusterStore()
+    test_durations = TestDurationStore()
+    summaries = RunSummaryStore()
+    log_sections = LogSectionIndex()
+    metrics = MetricsExporter()
+
+    def aggregate(parsed):
+        stores.upsert(parsed.status_df, parsed.categories_df, parsed.failures_df)
+        rollups.update(parsed.name, parsed.status_df, parsed.failures_df)
+        failure_index.add(parsed.failures_df, parsed.name)
+        clusters.update(parsed.name, parsed.failures_df)
+        test_durations.update(parsed.name, parsed.test_durations)
+        summaries.update(parsed.name, parsed.test_durations)
+        log_sections.update(parsed.sections)
+        metrics.update(parsed.name, parsed.status_df, parsed.test_durations)
+        if sql_store:
+            sql_store.upsert_results(parsed.status_df, parsed.categories_df, parsed.failures_df)
+            sql_store.upsert_test_durations(parsed.name, parsed.test_durations)
+
+    # Runs are parsed as soon as they are downloaded, and aggregated as soon as they are parsed
+    pipeline = IngestPipeline(artifacts, download_workers=args.download_workers, parse_workers=args.parse_workers)
+    stats = pipeline.run(aggregate)
+    print(f"Ingested {stats['files_parsed']} files of {len(artifacts.jobIds)} runs in {stats['wall_seconds']:.2f} s "
+          f"(download {stats['download_seconds']:.2f} s, parse {stats['parse_seconds']:.2f} s)")
+
+    stores.save()
+    rollups.save()
+    failure_index.save()
+    clusters.save()
+    test_durations.save()
+    summaries.save()
+    log_sections.save()
+    metrics.save()
+
+    if any(v is not None for v in (args.keep_days, args.max_artifacts_mb, args.compress_after_days)) or args.persisted_only:
+        print("Applying artifacts retention...")
+        retention = ArtifactRetention(folder=artifacts.folder,
+                                      keep_days=args.keep_days,
+                                      persisted_only=args.persisted_only,
+                                      max_bytes=args.max_artifacts_mb * 1024 * 1024 if args.max_artifacts_mb is not None else None,
+                                      compress_after_days=args.compress_after_days)
+        report = retention.apply()
+        print(f"Deleted {len(report['deleted_runs'])} runs, compressed {report['compressed_files']} files, "
+              f"reclaimed {report['reclaimed_bytes'] / (1024 * 1024):.2f} MB")
+
+    print("Generating reports...")
+    report_ids = set(workflowIds)
+    # Times come from the per-run summaries, runs without per-test timings fall back to their duration table
+    covered_ids = summaries.covered_ids(report_ids)
+    uncovered_ids = report_ids - covered_ids
+    if sql_store:
+        all_tests_df, all_times_df, all_failures_df = sql_store.report_frames(report_ids)
+        sql_store.close()
+        if not all_tests_df.empty:
+            all_tests_df = all_tests_df[all_tests_df['databaseId'].isin(list(uncovered_ids))]
+        if not all_times_df.empty:
+            all_times_df = all_times_df[all_times_df['databaseId'].isin(list(uncovered_ids))]
+    else:
+        # Only the runs of the date range are read back from the stores, batch by batch
+        all_failures_df = ArqManipulation.read_parquet_where(log_paths.get('failures'), 'databaseId', report_ids)
+        all_tests_df = ArqManipulation.read_parquet_where(log_paths.get('status'), 'databaseId', uncovered_ids)
+        all_times_df = ArqManipulation.read_parquet_where(log_paths.get('categories'), 'databaseId', uncovered_ids)
+    duration_summary = merge_duration_summaries(summaries.duration_summary(databaseIds=covered_ids),
+                                                durations_from_times(all_tests_df, all_times_df))
+    duration_summary = duration_summary if not duration_summary.empty else None
+    aggregates = ReportAggregates(all_tests_df, all_times_df, all_failures_df,
+                                  status_counts=rollups.status_counts(databaseIds=report_ids),
+                                  error_counts=rollups.error_counts(databaseIds=report_ids),
+                                  cluster_counts=clusters.clusters(databaseIds=report_ids),
+                                  duration_summary=duration_summary)
+    writer = ReportWriter(aggregates, output_dir=args.output_dir, table_mode=args.table_mode)
+    start = time.perf_counter()
+    for fmt, written in writer.write(args.output_format or ['pdf']).items():
+        print(f"{fmt}: {', '.join(written)}")
+
+    if args.metrics_file:
+        metrics.record_pipeline(stats)
+        metrics.record_render(time.perf_counter() - start)
+        metrics.write(args.metrics_file, openmetrics=args.metrics_format == 'openmetrics')
+        print(f"metrics: {args.metrics_file}")
+
+def run_query_failures(args):
+    failure_index = FailureIndex.rebuild() if args.rebuild else FailureIndex()
+    result = failure_index.query(test=args.test, error=args.error, detail=args.detail, mode=args.mode, category=args.category,
+                                  fingerprint=args.fingerprint)
+
+    print(f"{len(result)} failures found")
+    with pd.option_context('display.max_columns', None, 'display.width', None, 'display.max_colwidth', 80):
+        print(result.head(args.limit).to_string(index=False))
+
+
+def run_export(args):
+    columns = [c.strip() for c in args.columns.split(',')] if args.columns else None
+    rows = export_store(args.table, args.output, fmt=args.format, columns=columns, batch_size=args.batch_size)
+    print(f"{rows} rows exported to {args.output}")
+
+
+def run_sql(args):
+    sql_store = SqliteResultStore(args.db)
+    result = sql_store.query(args.query)
+    sql_store.close()
+
+    print(f"{len(result)} rows")
+    with pd.option_context('display.max_columns', None, 'display.width', None, 'display.max_colwidth', 80):
+        print(result.head(args.limit).to_string(index=False))
+
+
+def run_slowest_steps(args):
+    job_steps = ActionsJobSteps(repository=None)
+    with pd.option_context('display.max_columns', None, 'display.width', None):
+        print(job_steps.slowest_steps(top=args.top).to_string())
+
+
+def run_diff(args):
+    workflow_df = ArqManipulation.read_parquet_file(actions_paths.get('workflow'))
+    if not workflow_df.empty:
+        workflow_df = workflow_df.sort_values('createdAt').drop_duplicates('databaseId', keep='last')
+        # Runs are only compared within a repository and workflow, the latest run's ones unless given
+        latest = workflow_df.iloc[-1]
+        if 'repository' in workflow_df.columns:
+            repository = args.repo_path.rstrip('/') if args.repo_path else latest['repository']
+            workflow_df = workflow_df[workflow_df['repository'] == repository]
+        if 'name' in workflow_df.columns:
+            workflow_df = workflow_df[workflow_df['name'] == (args.workflow or latest['name'])]
+    run_ids = workflow_df['databaseId'].tolist() if not workflow_df.empty else []
+
+    def side(runs, dates, default):
+        if runs:
+            return runs
+        if dates:
+            return get_ids_in_date_range(workflow_df, *dates)
+        return default
+
+    base_ids = side(args.base_runs, args.base_dates, run_ids[-2:-1])
+    head_ids = side(args.head_runs, args.head_dates, run_ids[-1:])
+    if not base_ids or not head_ids:
+        print('Nothing to compare: no base or head runs')
+        return
+
+    report = RunDiff(base_ids, head_ids).report(min_ratio=args.min_ratio, min_seconds=args.min_seconds)
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+        return
+
+    print(f"Base runs: {', '.join(map(str, report['base_runs']))}")
+    print(f"Head runs: {', '.join(map(str, report['head_runs']))}")
+    print(', '.join(f"{label}: {count}" for label, count in report['counts'].items()))
+    with pd.option_context('display.max_columns', None, 'display.width', None, 'display.max_colwidth', 80):
+        for title in ('newly_failing', 'fixed', 'duration_jumps'):
+            if report[title]:
+                print(f"\n{title.replace('_', ' ').capitalize()}:")
+                print(pd.DataFrame(report[title]).head(args.limit).to_string(index=False))
+
+
+def run_ci_metrics(args):
+    metrics = CiMetrics()
+    with pd.option_context('display.max_columns', None, 'display.width', None):
+        print('Queue latency (seconds):')
+        print(metrics.queue_latency(by=args.by).to_string())
+        print('\nRunning jobs:')
+        print(metrics.peak_concurrency(freq=args.freq, state='running').to_string())
+        print('\nQueued jobs:')
+        print(metrics.peak_concurrency(freq=args.freq, state='queued').to_string())
+        print('\nRunner minutes:')
+        print(metrics.runner_minutes(by=args.by, freq=args.freq).to_string())
+
+
+def run_show_log(args):
+    log_sections = LogSectionIndex()
+    if args.test:
+        text = log_sections.traceback(args.path, args.test)
+    elif args.section:
+        text = log_sections.section(args.path, args.section)
+    else:
+        entries = log_sections.entries(args.path)
+        text = entries[['kind', 'section', 'title', 'start', 'end']].to_string(index=False)
+    log_sections.save()
+
+    print(text if text is not None else 'Not found in the log')
+
+
+if __name__ == '__main__':
+    args = pdf_params()
+
+    if args.command == 'query-failures':
+        run_query_failures(args)
+    elif args.command == 'export':
+        run_export(args)
+    elif args.command == 'sql':
+        run_sql(args)
+    elif args.command == 'slowest-steps':
+        run_slowest_steps(args)
+    elif args.command == 'diff':
+        run_diff(args)
+    elif args.command == 'ci-metrics':
+        run_ci_metrics(args)
+    elif args.command == 'show-log':
+        run_show_log(args)
+    else:
+        run_report(args)
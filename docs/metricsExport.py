@@ -0,0 +1,224 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+
+from actions import ArqManipulation, GH_CALL_STATS, GH_CALL_STATS_LOCK
+from analytics import index_as_name
+from durations import TEST_KEY
+from summaries import sketch_buckets, sketch_quantiles
+
+
+paths = {
+    'status_totals':'./bin/metrics.status_totals.parquet',
+    'duration_totals':'./bin/metrics.duration_totals.parquet',
+    'ingested':'./bin/metrics.ingested.parquet',
+    }
+
+STATUS_TOTALS_COLUMNS = ['category', 'status', 'count']
+DURATION_TOTALS_COLUMNS = ['category', 'bucket', 'count', 'seconds']
+INGESTED_COLUMNS = ['databaseId', 'artifact']
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def family_lines(name: str, kind: str, help_text: str, unit: str = None, openmetrics: bool = True) -> list[str]:
+    """
+    Formats the TYPE, UNIT and HELP lines of a metric family. The Prometheus text format names counters
+    by their '_total' sample and has no UNIT lines.
+    """
+    if not openmetrics:
+        name = f'{name}_total' if kind == 'counter' else name
+        return [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+
+    lines = [f'# TYPE {name} {kind}']
+    if unit:
+        lines.append(f'# UNIT {name} {unit}')
+    lines.append(f'# HELP {name} {help_text}')
+    return lines
+
+
+def format_sample(name: str, value, labels: dict = None) -> str:
+    """
+    Formats one sample line, e.g. 'ci_tests_total{category="tests/test_api.py",status="PASSED"} 12'.
+    """
+    label_text = ','.join(f'{key}="{escape_label(label)}"' for key, label in (labels or {}).items())
+    value = float(value)
+    number = 'NaN' if np.isnan(value) else repr(int(value)) if value.is_integer() and abs(value) < 2 ** 53 else repr(value)
+    return f"{name}{{{label_text}}} {number}" if label_text else f"{name} {number}"
+
+
+class MetricsExporter:
+    """
+    Exports test health and the tool's own performance as an OpenMetrics text file, for the node exporter
+    textfile collector (or any scraper reading the file).
+
+    Test metrics are cumulative and kept up to date incrementally: each newly ingested artifact adds its
+    (category, status) counts and the quantile sketch buckets of its test durations to small running totals,
+    so the export never rescans the history. An artifact already counted is not counted again, as counters
+    never decrease.
+
+    Tool metrics (gh call latency, download bytes, parse throughput, report render time) describe the last run of the tool.
+    """
+
+    def __init__(self):
+        self.status_totals = ArqManipulation.read_parquet_file(paths.get('status_totals'))
+        self.duration_totals = ArqManipulation.read_parquet_file(paths.get('duration_totals'))
+        ingested = ArqManipulation.read_parquet_file(paths.get('ingested'))
+        if self.status_totals.empty:
+            self.status_totals = pd.DataFrame(columns=STATUS_TOTALS_COLUMNS)
+        if self.duration_totals.empty:
+            self.duration_totals = pd.DataFrame(columns=DURATION_TOTALS_COLUMNS)
+
+        self.ingested = set(ingested[INGESTED_COLUMNS].itertuples(index=False, name=None)) if not ingested.empty else set()
+        self.pipeline_stats = None
+        self.render_seconds = None
+
+    def update(self, artifact: str, status_df: pd.DataFrame, durations_df: pd.DataFrame):
+        """
+        Adds a newly ingested artifact to the totals, once.
+
+        :param artifact: Artifact name inside its run (see PytestArtifactLogExtractor.artifact_name).
+        :param status_df: The artifact's own status table.
+        :param durations_df: The artifact's own per-test timings, with a databaseId column (see extract_test_durations).
+        """
+        if status_df.empty or 'databaseId' not in status_df.columns:
+            return
+
+        key = (int(status_df['databaseId'].iloc[0]), artifact)
+        if key in self.ingested:
+            return
+        self.ingested.add(key)
+
+        counts = status_df.groupby(['category', 'status'], observed=True).size().reset_index(name='count')
+        self.status_totals = self.__add_rows__(self.status_totals, counts, ['category', 'status'], ['count'])
+
+        if not durations_df.empty:
+            # A test lasts its setup, call and teardown
+            tests = index_as_name(durations_df).groupby(TEST_KEY, observed=True, dropna=False)['seconds'].sum().reset_index()
+            tests['seconds'] = tests['seconds'].astype('float64')
+            tests['bucket'] = sketch_buckets(tests['seconds'])
+            buckets = tests.groupby(['category', 'bucket'], observed=True)['seconds'].agg(count='size', seconds='sum').reset_index()
+            self.duration_totals = self.__add_rows__(self.duration_totals, buckets, ['category', 'bucket'], ['count', 'seconds'])
+
+    def record_pipeline(self, stats: dict):
+        """
+        Keeps the stage statistics of the last ingestion, see IngestPipeline.run.
+        """
+        self.pipeline_stats = dict(stats)
+
+    def record_render(self, seconds: float):
+        """
+        Keeps the time spent rendering the last report.
+        """
+        self.render_seconds = seconds
+
+    def save(self):
+        """
+        Persists the running totals and the counted artifacts.
+        """
+        ArqManipulation.save_df_to_parquet(self.status_totals.astype({'count': 'int64'}), paths.get('status_totals'))
+        ArqManipulation.save_df_to_parquet(self.duration_totals.astype({'bucket': 'int32', 'count': 'int64', 'seconds': 'float64'}),
+                                           paths.get('duration_totals'))
+        ingested = pd.DataFrame(sorted(self.ingested), columns=INGESTED_COLUMNS).astype({'databaseId': 'int64'})
+        ArqManipulation.save_df_to_parquet(ingested, paths.get('ingested'))
+
+    def render(self, openmetrics: bool = True) -> str:
+        """
+        Formats every metric in the OpenMetrics text format.
+
+        :param openmetrics: False formats them in the Prometheus text format, as read by the node exporter textfile collector.
+        :return: The exposition text, ending with '# EOF' in OpenMetrics.
+        """
+        lines = family_lines('ci_tests', 'counter', 'Test results ingested, per category and status.', openmetrics=openmetrics)
+        for row in self.status_totals.sort_values(['category', 'status']).itertuples(index=False):
+            lines.append(format_sample('ci_tests_total', row.count, {'category': row.category, 'status': row.status}))
+
+        lines += family_lines('ci_ingested_artifacts', 'counter', 'Artifacts counted in the test metrics.', openmetrics=openmetrics)
+        lines.append(format_sample('ci_ingested_artifacts_total', len(self.ingested)))
+
+        lines += family_lines('ci_test_duration_seconds', 'summary', 'Test durations (setup + call + teardown), per category.',
+                              'seconds', openmetrics)
+        if not self.duration_totals.empty:
+            sketch = self.duration_totals[['category', 'bucket', 'count']]
+            quantiles = sketch_quantiles(sketch, QUANTILES)
+            totals = self.duration_totals.groupby('category', observed=True)[['count', 'seconds']].sum()
+            for category, total in totals.sort_index().iterrows():
+                for q, label in zip(QUANTILES, quantiles.columns):
+                    lines.append(format_sample('ci_test_duration_seconds', quantiles.loc[category, label],
+                                               {'category': category, 'quantile': q}))
+                lines.append(format_sample('ci_test_duration_seconds_sum', total['seconds'], {'category': category}))
+                lines.append(format_sample('ci_test_duration_seconds_count', total['count'], {'category': category}))
+
+        lines += self.__tool_lines__(openmetrics)
+        if openmetrics:
+            lines.append('# EOF')
+
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str, openmetrics: bool = True):
+        """
+        Writes the metrics file, replacing it atomically so a scraper never reads a partial file.
+
+        :param path: Path of the text file, e.g. '/var/lib/node_exporter/textfile_collector/ci_report.prom'.
+        :param openmetrics: False writes the Prometheus text format, see render.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            file.write(self.render(openmetrics))
+        os.replace(temporary, path)
+
+    def __tool_lines__(self, openmetrics: bool) -> list[str]:
+        lines = family_lines('ci_report_gh_call_seconds', 'summary', 'Latency of the GitHub CLI calls of the last run, per command.',
+                             'seconds', openmetrics)
+        with GH_CALL_STATS_LOCK:
+            gh_stats = {command: dict(stats) for command, stats in GH_CALL_STATS.items()}
+        for command, stats in sorted(gh_stats.items()):
+            lines.append(format_sample('ci_report_gh_call_seconds_sum', stats['seconds'], {'command': command}))
+            lines.append(format_sample('ci_report_gh_call_seconds_count', stats['calls'], {'command': command}))
+        lines += family_lines('ci_report_gh_call_max_seconds', 'gauge', 'Slowest GitHub CLI call of the last run, per command.',
+                              'seconds', openmetrics)
+        for command, stats in sorted(gh_stats.items()):
+            lines.append(format_sample('ci_report_gh_call_max_seconds', stats['max_seconds'], {'command': command}))
+
+        stats = self.pipeline_stats
+        if stats is not None:
+            parse_throughput = stats['parsed_bytes'] / stats['parse_seconds'] if stats['parse_seconds'] else 0.0
+            gauges = [
+                ('ci_report_downloaded_runs', 'Runs downloaded by the last run.', None, stats['runs_downloaded']),
+                ('ci_report_download_bytes', 'Artifact bytes downloaded by the last run.', 'bytes', stats['download_bytes']),
+                ('ci_report_download_seconds', 'Time spent downloading, summed over the download threads.', 'seconds',
+                 stats['download_seconds']),
+                ('ci_report_parsed_files', 'Artifact files parsed by the last run.', None, stats['files_parsed']),
+                ('ci_report_parse_errors', 'Artifact files that failed to parse in the last run.', None, stats['parse_errors']),
+                ('ci_report_parsed_bytes', 'Artifact bytes parsed by the last run.', 'bytes', stats['parsed_bytes']),
+                ('ci_report_parse_bytes_per_second', 'Parse throughput of a parser worker.', None, parse_throughput),
+                ('ci_report_ingest_seconds', 'Wall time of the last ingestion.', 'seconds', stats['wall_seconds']),
+            ]
+        else:
+            gauges = []
+        if self.render_seconds is not None:
+            gauges.append(('ci_report_render_seconds', 'Time spent rendering the last report.', 'seconds', self.render_seconds))
+        gauges.append(('ci_report_last_run_timestamp_seconds', 'End of the last run of the tool.', 'seconds', time.time()))
+
+        for name, help_text, unit, value in gauges:
+            lines += family_lines(name, 'gauge', help_text, unit, openmetrics)
+            lines.append(format_sample(name, value))
+
+        return lines
+
+    def __add_rows__(self, totals: pd.DataFrame, rows: pd.DataFrame, keys: list[str], values: list[str]) -> pd.DataFrame:
+        """
+        Adds rows to a running totals table, summing the values of the same keys.
+        """
+        if rows.empty:
+            return totals
+        if totals.empty:
+            return rows[keys + values].reset_index(drop=True)
+
+        merged = pd.concat([totals, rows[keys + values]], ignore_index=True)
+        return merged.groupby(keys, observed=True, as_index=False)[values].sum()
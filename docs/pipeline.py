@@ -0,0 +1,174 @@
+import os
+import pandas as pd
+import time
+import threading
+from collections import deque
+from queue import Queue, Empty, Full
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from actions import ActionsArtifacts
+from extractors import artifact_extractor
+from JUnitExtractor import JUnitArtifactExtractor
+from logIndex import index_sections, SECTION_COLUMNS
+
+
+class ParsedArtifact:
+    """
+    The tables of one parsed artifact file, handed from the parser workers to the aggregator.
+    """
+
+    def __init__(self, path: str, name: str, status_df, categories_df, failures_df, test_durations, sections, seconds: float):
+        self.path = path
+        self.name = name
+        self.status_df = status_df
+        self.categories_df = categories_df
+        self.failures_df = failures_df
+        self.test_durations = test_durations
+        self.sections = sections
+        self.seconds = seconds
+
+
+def parse_artifact(path: str) -> ParsedArtifact:
+    """
+    Parses one artifact file, runs inside the parser workers.
+    """
+    start = time.perf_counter()
+    artifact = artifact_extractor(path)
+    status_df, categories_df, failures_df = artifact.extract_dfs()
+    # Byte offsets of the console log sections, JUnit reports are not indexed
+    sections = pd.DataFrame(columns=SECTION_COLUMNS) if isinstance(artifact, JUnitArtifactExtractor) else index_sections(path)
+
+    return ParsedArtifact(path, artifact.artifact_name(), status_df, categories_df, failures_df,
+                          artifact.extract_test_durations(), sections, time.perf_counter() - start)
+
+
+class IngestPipeline:
+    """
+    Runs the download, parse and aggregate stages concurrently: each run's files are handed to a parser worker
+    as soon as the run is downloaded, and parsed tables reach the aggregator as soon as they are ready.
+
+    Bounded buffers between the stages give backpressure: downloads wait while too many files are queued for
+    parsing, and no more files are submitted while too many parsed results wait for the aggregator.
+    End-to-end time then approaches the slowest stage instead of the sum of all of them.
+    """
+
+    def __init__(self, artifacts: ActionsArtifacts, download_workers: int = 4, parse_workers: int = None,
+                 max_queued_runs: int = 4, max_queued_files: int = None):
+        """
+        Initializes the IngestPipeline object.
+
+        :param artifacts: ActionsArtifacts of the runs to ingest, created with download=False.
+        :param download_workers: Concurrent run downloads (network bound, threads).
+        :param parse_workers: Parser processes (CPU bound), defaults to the number of cores. 0 parses in the aggregator's own process.
+        :param max_queued_runs: Downloaded runs waiting for the parsers before downloads block.
+        :param max_queued_files: Files submitted to the parsers at once, defaults to twice the number of parser workers.
+        """
+        self.artifacts = artifacts
+        self.download_workers = download_workers
+        self.parse_workers = os.cpu_count() if parse_workers is None else parse_workers
+        self.max_queued_files = max_queued_files or 2 * max(self.parse_workers, 1)
+        self.ready = Queue(maxsize=max_queued_runs)
+        self.stats_lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.stats = {'runs_downloaded': 0, 'download_seconds': 0.0, 'download_bytes': 0,
+                      'files_parsed': 0, 'parse_errors': 0, 'parse_seconds': 0.0, 'parsed_bytes': 0, 'wall_seconds': 0.0}
+
+    def run(self, aggregate) -> dict:
+        """
+        Ingests every run of the artifacts: the already downloaded ones and the pending ones.
+
+        :param aggregate: Called with each ParsedArtifact, in the calling thread, as soon as it is parsed.
+        :return: Stage statistics: downloaded runs and bytes, parsed files and bytes, time spent per stage and wall time.
+        """
+        start = time.perf_counter()
+        pending = sorted(self.artifacts.pending_ids())
+        downloaded = sorted(self.artifacts.jobIds.difference(pending))
+        files = deque(path for run_id in downloaded for path in self.artifacts.run_paths(run_id))
+
+        parser = ProcessPoolExecutor(self.parse_workers) if self.parse_workers else None
+        with ThreadPoolExecutor(max(self.download_workers, 1)) as downloader:
+            for run_id in pending:
+                downloader.submit(self.__download__, run_id)
+
+            remaining_runs = len(pending)
+            in_flight = set()
+            try:
+                while files or remaining_runs or in_flight:
+                    remaining_runs -= self.__collect_downloads__(files, block=not files and not in_flight)
+
+                    if parser is None:
+                        if files:
+                            path = files.popleft()
+                            self.__aggregate__(aggregate, lambda: parse_artifact(path))
+                        continue
+
+                    while files and len(in_flight) < self.max_queued_files:
+                        in_flight.add(parser.submit(parse_artifact, files.popleft()))
+
+                    if in_flight:
+                        # Short waits, so finished downloads are picked up while parses run
+                        done, in_flight = wait(in_flight, timeout=0.05, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            self.__aggregate__(aggregate, future.result)
+            finally:
+                # On errors, downloads still queued are dropped and the blocked ones are released
+                self.stopped.set()
+                downloader.shutdown(wait=False, cancel_futures=True)
+                if parser is not None:
+                    parser.shutdown(cancel_futures=True)
+
+        self.stats['wall_seconds'] = time.perf_counter() - start
+        return self.stats
+
+    def __download__(self, run_id: int):
+        """
+        Downloads one run, runs inside the download threads. Blocks while the parsers are behind.
+        """
+        start = time.perf_counter()
+        try:
+            paths = self.artifacts.fetch_run(run_id)
+        except Exception as e:
+            print(f"Error downloading artifacts of run {run_id}: {e}")
+            paths = []
+
+        with self.stats_lock:
+            self.stats['download_seconds'] += time.perf_counter() - start
+            self.stats['download_bytes'] += sum(os.path.getsize(path) for path in paths)
+            self.stats['runs_downloaded'] += 1
+
+        while not self.stopped.is_set():
+            try:
+                self.ready.put(paths, timeout=0.1)
+                break
+            except Full:
+                continue
+
+    def __collect_downloads__(self, files: deque, block: bool) -> int:
+        """
+        Moves the downloaded runs' files into the parse queue, up to its bound.
+
+        :return: The number of runs collected.
+        """
+        collected = 0
+        while len(files) < self.max_queued_files:
+            try:
+                paths = self.ready.get(block=block and collected == 0)
+            except Empty:
+                break
+            files.extend(paths)
+            collected += 1
+
+        return collected
+
+    def __aggregate__(self, aggregate, parse):
+        try:
+            parsed = parse()
+        except Exception as e:
+            print(f"Error parsing artifact: {e}")
+            self.stats['parse_errors'] += 1
+            return
+
+        self.stats['files_parsed'] += 1
+        self.stats['parse_seconds'] += parsed.seconds
+        self.stats['parsed_bytes'] += os.path.getsize(parsed.path)
+        aggregate(parsed)
@@ -0,0 +1,123 @@
+import pandas as pd
+
+from rollups import status_counts_from, error_counts_from
+from failureClusters import cluster_rows, summarize_clusters
+
+
+class ReportAggregates:
+    """
+    Computes the report metrics once, so every output format (PDF, HTML, JSON, CSV) reads the same frames.
+    """
+
+    def __init__(self, status_df, categories_df, failures_df, status_counts=None, error_counts=None, cluster_counts=None,
+                 duration_summary=None):
+        """
+        Initializes the ReportAggregates object.
+
+        :param status_df: Test status table.
+        :param categories_df: Duration table.
+        :param failures_df: Test failures table.
+        :param status_counts: Pre-aggregated (category, status) counts, e.g. from RollupStore. Computed from status_df when absent.
+        :param error_counts: Pre-aggregated (category, error) counts, e.g. from RollupStore. Computed from failures_df when absent.
+        :param cluster_counts: Failure message clusters, e.g. from FailureClusterStore. Computed from failures_df when absent.
+        :param duration_summary: Merged per-category test durations, e.g. from RunSummaryStore. The times then come from it
+            instead of categories_df.
+        """
+        self.status_df = status_df
+        self.categories_df = categories_df
+        self.failures_df = failures_df
+        self.status_counts = status_counts if status_counts is not None else status_counts_from(status_df)
+        self.error_counts = error_counts if error_counts is not None else error_counts_from(failures_df)
+        self.cluster_counts = cluster_counts if cluster_counts is not None else summarize_clusters(cluster_rows(failures_df))
+        self.duration_summary = duration_summary
+        self.metrics_df = self.__create_df__()
+
+    def get_time(self, metric):
+        # Runs without any duration row leave the times unknown
+        if self.status_df.empty or metric not in self.categories_df.columns:
+            return pd.Series(dtype='float64')
+
+        time =pd.Series(dict(map(lambda t, x: (x, self.categories_df.loc[self.categories_df.index == t, metric].sum()), self.status_df.index.unique(), self.status_df.category.unique())))
+
+        return time
+
+    def summary(self) -> dict:
+        """
+        Totals of the whole report.
+
+        :return: A dict of plain numbers, ready to be formatted or serialized.
+        """
+        num_passed = int(self.metrics_df['num_passed'].sum())
+        num_failed = int(self.metrics_df['num_failed'].sum())
+
+        return {
+            'total_tests': int(self.metrics_df['total_runs'].sum()),
+            'num_passed': num_passed,
+            'num_failed': num_failed,
+            'fail_success_rate': round(num_failed / num_passed * 100, 2) if num_passed else None,
+            'min_test_time': float(self.metrics_df['min_test_time'].min()),
+            'avg_test_time': float(self.metrics_df['avg_test_time'].mean()),
+            'total_duration': float(self.metrics_df['total_duration'].sum()),
+        }
+
+    def summary_labels(self) -> dict:
+        """
+        The summary formatted for display, keyed by the report labels.
+
+        :return: A dict of label to formatted value.
+        """
+        summary = self.summary()
+        # Without passed tests the rate is undefined
+        rate = summary['fail_success_rate']
+        return {
+            'Total de Testes:': summary['total_tests'],
+            'Testes Bem-Sucedidos:': summary['num_passed'],
+            'Testes com Falha:': summary['num_failed'],
+            'Taxa de Sucessos/Falha:': f"{rate}%" if rate is not None else 'n/a',  # Round to 2 decimal places
+            'Tempo Mínimo de Execução:': f"{summary['min_test_time']:.2f} s",
+            'Tempo Médio de Execução:': f"{summary['avg_test_time']:.2f} s",
+            'Duração Total dos Testes:': f"{summary['total_duration']:.2f} s"
+        }
+
+    def __create_df__(self):
+        # Count the total duration of each category
+        count_df = status_counts_table(self.status_counts)
+
+        if self.duration_summary is not None:
+            durations = self.duration_summary.reindex(count_df.index)
+            total_times = durations['total']
+            avg_time_test = durations['mean']
+            min_test_time = durations['min']
+        else:
+            total_times = self.get_time('total')
+            avg_time_test = self.get_time('avg')
+            min_test_time  = self.get_time('min')
+
+        time_count_df = pd.concat([count_df['PASSED'],
+                                   count_df['FAILED'],
+                                   count_df['total'],
+                                   min_test_time,
+                                   avg_time_test,
+                                   total_times], axis=1)
+
+        time_count_df.columns = ['num_passed', 'num_failed', 'total_runs', 'min_test_time', 'avg_test_time', 'total_duration']
+        if self.duration_summary is None:
+            time_count_df['avg_test_time'] = time_count_df['avg_test_time'] / time_count_df['total_runs']
+        time_count_df['avg_test_time'] = time_count_df['avg_test_time'].round(2)
+
+        report_df = pd.DataFrame({'name': self.status_counts['category'].unique()}).set_index('name')
+        return  pd.concat([report_df, time_count_df], axis=1).reset_index().drop_duplicates().round(2)
+
+
+def status_counts_table(status_counts):
+    """
+    Pivots (category, status, count) rows into one row per category with PASSED, FAILED and total columns.
+
+    :param status_counts: Pre-aggregated status counts.
+    :return: A DataFrame indexed by category.
+    """
+    count_df = status_counts.pivot_table(index='category', columns='status', values='count', aggfunc='sum', fill_value=0)
+    count_df = count_df.reindex(columns=count_df.columns.union(['PASSED', 'FAILED'], sort=False), fill_value=0).astype(int)
+    count_df.columns.name = None
+    count_df['total'] = count_df.sum(axis=1)
+    return count_df
@@ -0,0 +1,140 @@
+import os
+import json
+import html
+from datetime import datetime
+
+from reportAggregates import ReportAggregates
+
+OUTPUT_FORMATS = ('pdf', 'html', 'json', 'csv')
+
+
+class ReportWriter:
+    """
+    Writes one set of ReportAggregates in several formats. Metrics are aggregated once and shared,
+    so JSON and CSV never touch plotly or reportlab, and only the PDF pays for PNG rasterization.
+    """
+
+    def __init__(self, aggregates: ReportAggregates, output_dir: str = '.', basename: str = 'report_v0', **pdf_options):
+        """
+        Initializes the ReportWriter object.
+
+        :param aggregates: Report metrics, computed once.
+        :param output_dir: Directory of the generated files.
+        :param basename: File name of the outputs, without extension.
+        :param pdf_options: Extra PdfMaker options (table_mode, rows_per_page, ...).
+        """
+        self.aggregates = aggregates
+        self.output_dir = output_dir
+        self.basename = basename
+        self.pdf_options = pdf_options
+
+    def write(self, formats) -> dict:
+        """
+        Writes every requested format.
+
+        :param formats: An iterable with any of OUTPUT_FORMATS.
+        :return: A dict of format to the list of written paths.
+        """
+        unknown = set(formats) - set(OUTPUT_FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown output formats {sorted(unknown)}, expected any of {OUTPUT_FORMATS}")
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        writers = {'pdf': self.write_pdf, 'html': self.write_html, 'json': self.write_json, 'csv': self.write_csv}
+
+        return {fmt: writers[fmt]() for fmt in dict.fromkeys(formats)}
+
+    def write_pdf(self) -> list[str]:
+        # Imported here so the cheap formats never load reportlab
+        from createPdf import PdfMaker
+
+        path = self.__path__('.pdf')
+        agg = self.aggregates
+        PdfMaker(agg.status_df, agg.categories_df, agg.failures_df, aggregates=agg, **self.pdf_options).create_pdf(path)
+        return [path]
+
+    def write_html(self) -> list[str]:
+        """
+        Writes a self-contained HTML dashboard, with the plotly charts rendered as vector graphics in the browser.
+        """
+        from createPdf import PdfDataPlotter
+
+        agg = self.aggregates
+        plotter = PdfDataPlotter(agg.status_df, agg.categories_df, agg.failures_df,
+                                 status_counts=agg.status_counts, error_counts=agg.error_counts)
+        figures = [plotter.category_errors_bar_figure(), plotter.error_distribution_pie_figure(), plotter.failures_passed_rate_figure()]
+        # plotly.js is embedded once, by the first chart
+        charts = [fig.to_html(full_html=False, include_plotlyjs=i == 0) for i, fig in enumerate(figures)]
+
+        summary_items = ''.join(f"<li><b>{html.escape(label)}</b> {html.escape(str(value))}</li>"
+                                for label, value in agg.summary_labels().items())
+        top_errors = agg.error_counts.sort_values('count', ascending=False, kind='stable')
+
+        document = f"""<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<title>Sumário de Resultados dos Testes</title>
+<style>
+body {{ font-family: Helvetica, Arial, sans-serif; margin: 2em auto; max-width: 1000px; }}
+table {{ border-collapse: collapse; margin-bottom: 2em; }}
+th, td {{ border: 1px solid #444; padding: 4px 8px; text-align: center; }}
+</style>
+</head>
+<body>
+<h1>Sumário de Resultados dos Testes</h1>
+<p>Data da Execução: {datetime.now().strftime("%d/%m/%Y %H:%M:%S")}</p>
+<h2>Resumo Geral</h2>
+<ul>{summary_items}</ul>
+<h2>Detalhamento dos Testes</h2>
+{agg.metrics_df.to_html(index=False, na_rep='')}
+<h2>Resumo dos Erros</h2>
+{top_errors.to_html(index=False, na_rep='')}
+<h2>Mensagens de erro mais frequentes</h2>
+{agg.cluster_counts.reset_index().to_html(index=False, na_rep='')}
+<h2>Visualização de dados</h2>
+{''.join(charts)}
+</body>
+</html>
+"""
+        path = self.__path__('.html')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(document)
+        return [path]
+
+    def write_json(self) -> list[str]:
+        """
+        Writes a compact machine-readable summary: totals, per-category metrics and error counts.
+        """
+        agg = self.aggregates
+        payload = {
+            'generatedAt': datetime.now().isoformat(timespec='seconds'),
+            'summary': agg.summary(),
+            'categories': json.loads(self.__category_metrics__().to_json(orient='records')),
+            'errors': json.loads(agg.error_counts.to_json(orient='records')),
+            'clusters': json.loads(agg.cluster_counts.reset_index().to_json(orient='records')),
+        }
+
+        path = self.__path__('.json')
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(payload, file, ensure_ascii=False, separators=(',', ':'))
+        return [path]
+
+    def write_csv(self) -> list[str]:
+        """
+        Writes the per-category metrics, the error counts and the message clusters as CSV files.
+        """
+        metrics_path = self.__path__('.csv')
+        errors_path = self.__path__('.errors.csv')
+        clusters_path = self.__path__('.clusters.csv')
+        self.__category_metrics__().to_csv(metrics_path, index=False)
+        self.aggregates.error_counts.to_csv(errors_path, index=False)
+        self.aggregates.cluster_counts.to_csv(clusters_path)
+        return [metrics_path, errors_path, clusters_path]
+
+    def __category_metrics__(self):
+        # metrics_df keeps the category in the 'index' column left by reset_index
+        return self.aggregates.metrics_df.rename(columns={'index': 'category'})
+
+    def __path__(self, suffix: str) -> str:
+        return os.path.join(self.output_dir, self.basename + suffix)
@@ -0,0 +1,181 @@
+import os
+import gzip
+import shutil
+import time
+import pandas as pd
+
+from actions import ArqManipulation, COMPRESSED_SUFFIXES, zstandard, paths as actions_paths
+from LogExtractor import paths as log_paths
+
+
+class ArtifactRetention:
+    """
+    Applies retention and compaction policies to the downloaded artifacts folder.
+
+    Artifacts are stored as '<folder>/<databaseId>/...', so every policy works on whole run folders,
+    except compression which works on the individual log files. Deleted runs whose results are persisted are
+    recorded in the pruned runs store, so ActionsArtifacts does not download them again.
+    """
+
+    def __init__(self, folder: str = 'artifacts/', keep_days: int = None, persisted_only: bool = False,
+                 max_bytes: int = None, compress_after_days: int = None, codec: str = 'gzip'):
+        """
+        Initializes the ArtifactRetention object.
+
+        :param folder: Artifacts storage dir.
+        :param keep_days: Runs not modified in the last N days are deleted.
+        :param persisted_only: Keeps only runs whose parsed results are present in the status parquet.
+        :param max_bytes: Disk-size cap for the folder, least recently used runs are evicted first.
+        :param compress_after_days: Raw logs older than N days are compressed.
+        :param codec: Compression codec, 'gzip' or 'zstd'.
+        """
+        if codec not in ('gzip', 'zstd'):
+            raise ValueError(f"Unknown compression codec '{codec}'")
+        if codec == 'zstd' and zstandard is None:
+            raise RuntimeError("The 'zstd' codec requires the 'zstandard' package")
+
+        self.folder = folder
+        self.keep_days = keep_days
+        self.persisted_only = persisted_only
+        self.max_bytes = max_bytes
+        self.compress_after_days = compress_after_days
+        self.codec = codec
+        self._persisted_ids = None
+
+    def apply(self) -> dict:
+        """
+        Runs every configured policy: age, persisted results, compression and then the size cap.
+
+        :return: A report with the deleted runs, compressed files and reclaimed bytes.
+        """
+        report = {'deleted_runs': [], 'compressed_files': 0, 'reclaimed_bytes': 0}
+        runs = self.__list_runs__()
+        now = time.time()
+
+        for run_id, run in list(runs.items()):
+            expired = self.keep_days is not None and now - run['mtime'] > self.keep_days * 86400
+            if expired or (self.persisted_only and run_id not in self.__persisted_ids__()):
+                report['reclaimed_bytes'] += self.__delete_run__(run)
+                report['deleted_runs'].append(run_id)
+                runs.pop(run_id)
+
+        if self.compress_after_days is not None:
+            for run in runs.values():
+                for file in run['files']:
+                    if file.endswith(COMPRESSED_SUFFIXES) or now - os.path.getmtime(file) <= self.compress_after_days * 86400:
+                        continue
+                    report['reclaimed_bytes'] += self.__compress_file__(file)
+                    report['compressed_files'] += 1
+            runs = self.__list_runs__()
+
+        if self.max_bytes is not None:
+            total = sum(run['size'] for run in runs.values())
+            # Least recently used first
+            for run_id, run in sorted(runs.items(), key=lambda r: r[1]['atime']):
+                if total <= self.max_bytes:
+                    break
+                reclaimed = self.__delete_run__(run)
+                total -= reclaimed
+                report['reclaimed_bytes'] += reclaimed
+                report['deleted_runs'].append(run_id)
+
+        self.__record_pruned__(report['deleted_runs'])
+        return report
+
+    def __record_pruned__(self, run_ids: list):
+        """
+        Adds the deleted runs whose results are persisted to the pruned runs store. The unparsed ones
+        are left out, they are downloaded again by the next ingest.
+        """
+        deleted = {int(run_id) for run_id in run_ids if str(run_id).isdigit()}
+        if deleted:
+            persisted = ArqManipulation.read_parquet_where(log_paths.get('status'), 'databaseId', deleted, columns=['databaseId'])
+            deleted &= set(persisted['databaseId'].astype('int64')) if not persisted.empty else set()
+        if not deleted:
+            return
+
+        pruned = ArqManipulation.read_parquet_file(actions_paths.get('pruned_runs'))
+        if not pruned.empty:
+            deleted.update(pruned['databaseId'].astype('int64'))
+        ArqManipulation.save_df_to_parquet(pd.DataFrame({'databaseId': sorted(deleted)}, dtype='int64'), actions_paths.get('pruned_runs'))
+
+    def __persisted_ids__(self) -> set:
+        """
+        Reads the databaseIds that already have parsed results stored.
+
+        :return: Set of persisted databaseIds.
+        """
+        if self._persisted_ids is None:
+            status_df = ArqManipulation.read_parquet_file(log_paths.get('status'))
+            self._persisted_ids = set(status_df['databaseId'].astype(str)) if 'databaseId' in status_df else set()
+        return self._persisted_ids
+
+    def __list_runs__(self) -> dict:
+        """
+        Collects the files, size and access/modification times of every run folder.
+
+        :return: A dict keyed by the run folder name (databaseId).
+        """
+        runs = {}
+        if not os.path.isdir(self.folder):
+            return runs
+
+        for run_id in os.listdir(self.folder):
+            run_path = os.path.join(self.folder, run_id)
+            if not os.path.isdir(run_path):
+                continue
+
+            run = {'path': run_path, 'files': [], 'size': 0, 'atime': 0.0, 'mtime': os.path.getmtime(run_path)}
+            for path, _, files in os.walk(run_path):
+                for file in files:
+                    file_path = os.path.join(path, file)
+                    stat = os.stat(file_path)
+                    run['files'].append(file_path)
+                    run['size'] += stat.st_size
+                    run['mtime'] = max(run['mtime'], stat.st_mtime)
+                    # Filesystems mounted with noatime never update atime, so mtime is the lower bound
+                    run['atime'] = max(run['atime'], stat.st_atime, stat.st_mtime)
+            runs[run_id] = run
+
+        return runs
+
+    def __delete_run__(self, run: dict) -> int:
+        """
+        Deletes a run folder recursively.
+
+        :return: Bytes reclaimed.
+        """
+        try:
+            shutil.rmtree(run['path'])
+            return run['size']
+        except Exception as e:
+            print(f"Error while deleting '{run['path']}': {e}")
+            return 0
+
+    def __compress_file__(self, file: str) -> int:
+        """
+        Compresses a raw log in place, keeping its original name plus the codec suffix so
+        PytestArtifactLogExtractor can still read it.
+
+        :return: Bytes reclaimed.
+        """
+        original_size = os.path.getsize(file)
+        target = file + ('.gz' if self.codec == 'gzip' else '.zst')
+
+        try:
+            with open(file, 'rb') as src:
+                if self.codec == 'gzip':
+                    with gzip.open(target, 'wb') as dst:
+                        shutil.copyfileobj(src, dst)
+                else:
+                    with open(target, 'wb') as dst:
+                        zstandard.ZstdCompressor().copy_stream(src, dst)
+            shutil.copystat(file, target)
+            os.remove(file)
+        except Exception as e:
+            print(f"Error while compressing '{file}': {e}")
+            if os.path.exists(target):
+                os.remove(target)
+            return 0
+
+        return original_size - os.path.getsize(target)
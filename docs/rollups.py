@@ -0,0 +1,139 @@
+import pandas as pd
+
+from actions import ArqManipulation, fold_updates
+from analytics import DailyRunStore, index_as_name, run_days
+
+
+paths = {
+    'status_rollup':'./bin/rollup.status.parquet',
+    'errors_rollup':'./bin/rollup.errors.parquet',
+    }
+
+STATUS_COLUMNS = ['day', 'databaseId', 'artifact', 'category', 'status', 'count']
+ERRORS_COLUMNS = ['day', 'databaseId', 'artifact', 'category', 'error', 'count']
+
+
+def status_counts_from(status_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregates a raw status table into (category, status) counts.
+
+    :param status_df: Test status table.
+    :return: A DataFrame with category, status and count columns.
+    """
+    if status_df.empty:
+        return pd.DataFrame(columns=['category', 'status', 'count'])
+    return status_df.groupby(['category', 'status']).size().reset_index(name='count')
+
+
+def error_counts_from(failures_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregates a raw failure table into (category, error) counts.
+
+    :param failures_df: Test failures table.
+    :return: A DataFrame with category, error and count columns.
+    """
+    if failures_df.empty:
+        return pd.DataFrame(columns=['category', 'error', 'count'])
+    return failures_df.groupby(['category', 'error']).size().reset_index(name='count')
+
+
+def append_rows(df: pd.DataFrame, rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    Appends rows to a table, skipping the concat when either side is empty so column dtypes are kept.
+    """
+    if rows.empty:
+        return df
+    if df.empty:
+        return rows.reset_index(drop=True)
+    return pd.concat([df, rows], ignore_index=True)
+
+
+class RollupStore(DailyRunStore):
+    """
+    Keeps per (day, category, status) and per (day, category, error) counts up to date at ingest time,
+    so reports read small pre-aggregated frames instead of the raw status and failure tables.
+
+    Rows are also keyed by run and artifact, so re-ingesting an artifact replaces its counts instead of adding them twice.
+    Updates are buffered and folded into the tables once, when they are saved or read.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.status_df = ArqManipulation.read_parquet_file(paths.get('status_rollup'))
+        self.errors_df = ArqManipulation.read_parquet_file(paths.get('errors_rollup'))
+        if self.status_df.empty:
+            self.status_df = pd.DataFrame(columns=STATUS_COLUMNS)
+        if self.errors_df.empty:
+            self.errors_df = pd.DataFrame(columns=ERRORS_COLUMNS)
+        self.pending_status = []
+        self.pending_errors = []
+
+    def update(self, artifact: str, status_df: pd.DataFrame, failures_df: pd.DataFrame):
+        """
+        Replaces the counts of a single ingested artifact.
+
+        :param artifact: Artifact name inside its run (see PytestArtifactLogExtractor.artifact_name).
+        :param status_df: The artifact's own status table.
+        :param failures_df: The artifact's own failure table.
+        """
+        status_rows = self.__rollup__(status_df, 'status', artifact)
+        error_rows = self.__rollup__(failures_df, 'error', artifact)
+
+        # The artifact's counts of both tables are replaced, even when it has no failures left
+        keys = [(int(run_id), artifact or '') for run_id in set(status_rows['databaseId']).union(error_rows['databaseId'])]
+        self.pending_status.append((keys, status_rows))
+        self.pending_errors.append((keys, error_rows))
+
+    def save(self):
+        """
+        Persists both rollup tables.
+        """
+        self.__fold__()
+        ArqManipulation.save_df_to_parquet(self.status_df, paths.get('status_rollup'))
+        ArqManipulation.save_df_to_parquet(self.errors_df, paths.get('errors_rollup'))
+
+    def status_counts(self, databaseIds=None, start=None, end=None) -> pd.DataFrame:
+        """
+        Reads (category, status) counts, optionally limited to some runs or a day range.
+
+        :return: A DataFrame with category, status and count columns.
+        """
+        self.__fold__()
+        df = self.__filter__(self.status_df, databaseIds, start, end)
+        return df.groupby(['category', 'status'], as_index=False)['count'].sum().astype({'count': 'int64'})
+
+    def error_counts(self, databaseIds=None, start=None, end=None) -> pd.DataFrame:
+        """
+        Reads (category, error) counts, optionally limited to some runs or a day range.
+
+        :return: A DataFrame with category, error and count columns.
+        """
+        self.__fold__()
+        df = self.__filter__(self.errors_df, databaseIds, start, end)
+        return df.groupby(['category', 'error'], as_index=False)['count'].sum().astype({'count': 'int64'})
+
+    def daily_status_counts(self) -> pd.DataFrame:
+        """
+        Reads the (day, category, status) rollup.
+
+        :return: A DataFrame with day, category, status and count columns.
+        """
+        self.__fold__()
+        return self.status_df.groupby(['day', 'category', 'status'], as_index=False)['count'].sum().astype({'count': 'int64'})
+
+    def __fold__(self):
+        self.status_df = fold_updates(self.status_df, self.pending_status)
+        self.errors_df = fold_updates(self.errors_df, self.pending_errors)
+        self.pending_status = []
+        self.pending_errors = []
+
+    def __rollup__(self, df: pd.DataFrame, column: str, artifact: str) -> pd.DataFrame:
+        columns = STATUS_COLUMNS if column == 'status' else ERRORS_COLUMNS
+        if df.empty or column not in df.columns:
+            return pd.DataFrame(columns=columns)
+
+        rows = index_as_name(df).groupby(['databaseId', 'category', column]).size().reset_index(name='count')
+        rows['artifact'] = artifact
+        rows['day'] = run_days(rows['databaseId'], self.__run_dates__())
+
+        return rows[columns]
@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+
+from actions import ArqManipulation
+from analytics import TEST_KEY, index_as_name
+from durations import paths as duration_paths
+from LogExtractor import paths as log_paths
+
+
+FAILING_STATUSES = ('FAILED', 'ERROR')
+# When a test ran several times in the same run (e.g. in many artifacts), its worst outcome is kept
+STATUS_RANKS = {'PASSED': 0, 'FAILED': 2, 'ERROR': 3}
+
+
+def hash_test_keys(df: pd.DataFrame) -> np.ndarray:
+    """
+    Hashes the test identity (category, name, arguments) of each row, whatever the column dtypes.
+
+    :param df: A table with the TEST_KEY columns (the name may be the index).
+    :return: A uint64 array with one hash per row.
+    """
+    df = index_as_name(df)
+    columns = {key: df[key].astype(object).where(df[key].notna(), '').to_numpy() for key in TEST_KEY}
+    return pd.util.hash_pandas_object(pd.DataFrame(columns), index=False).to_numpy()
+
+
+class RunDiff:
+    """
+    Compares the test results of two runs, or two sets of runs (e.g. last night's and tonight's):
+    newly failing tests, fixed tests and tests whose duration jumped.
+
+    Each side is reduced to one row per test, keyed by the hash of its identity, and the sides are matched
+    with a hash lookup of the head keys into the base keys, so a diff is linear in the number of tests.
+    """
+
+    def __init__(self, base_ids, head_ids, status_df: pd.DataFrame = None, durations_df: pd.DataFrame = None):
+        """
+        Initializes the RunDiff object, reading only the rows of the compared runs from the stores for the frames not given.
+
+        :param base_ids: databaseIds of the reference runs.
+        :param head_ids: databaseIds of the compared runs.
+        :param status_df: Test status table, as produced by PytestArtifactLogExtractor.
+        :param durations_df: Per-test timings table, see TestDurationStore.
+        """
+        self.base_ids = {int(i) for i in base_ids}
+        self.head_ids = {int(i) for i in head_ids}
+        run_ids = self.base_ids | self.head_ids
+
+        if status_df is None:
+            status_df = ArqManipulation.read_parquet_where(log_paths.get('status'), 'databaseId', run_ids)
+        if durations_df is None:
+            durations_df = ArqManipulation.read_parquet_where(duration_paths.get('test_durations'), 'databaseId', run_ids)
+
+        self.base_status, self.head_status = (self.__side_status__(status_df, ids) for ids in (self.base_ids, self.head_ids))
+        self.base_durations, self.head_durations = (self.__side_durations__(durations_df, ids)
+                                                    for ids in (self.base_ids, self.head_ids))
+
+    def status_changes(self) -> pd.DataFrame:
+        """
+        Matches the outcome of every head test with its base outcome.
+
+        :return: A DataFrame with the TEST_KEY columns, base_status (None for new tests), head_status and change
+            ('new failure', 'fixed', 'still failing', 'new test' or '').
+        """
+        head, base = self.head_status, self.base_status
+        positions = pd.Index(base['key']).get_indexer(head['key'])
+        found = positions >= 0
+
+        base_status = np.full(len(head), None, dtype=object)
+        base_status[found] = base['status'].to_numpy()[positions[found]]
+        base_failing = np.isin(base_status, FAILING_STATUSES)
+        base_passed = base_status == 'PASSED'
+        head_failing = head['status'].isin(FAILING_STATUSES).to_numpy()
+        head_passed = (head['status'] == 'PASSED').to_numpy()
+
+        change = np.select([head_failing & (base_passed | ~found), head_passed & base_failing, head_failing & base_failing, ~found],
+                           ['new failure', 'fixed', 'still failing', 'new test'], default='')
+
+        result = head[TEST_KEY].copy()
+        result['base_status'] = base_status
+        result['head_status'] = head['status'].to_numpy()
+        result['change'] = change
+        return result.reset_index(drop=True)
+
+    def newly_failing(self) -> pd.DataFrame:
+        """
+        Tests failing in head that passed in base, or that did not exist in base.
+        """
+        changes = self.status_changes()
+        return changes[changes['change'] == 'new failure'].reset_index(drop=True)
+
+    def fixed(self) -> pd.DataFrame:
+        """
+        Tests passing in head that failed in base.
+        """
+        changes = self.status_changes()
+        return changes[changes['change'] == 'fixed'].reset_index(drop=True)
+
+    def removed(self) -> pd.DataFrame:
+        """
+        Tests of base that did not run in head.
+        """
+        missing = ~np.isin(self.base_status['key'].to_numpy(), self.head_status['key'].to_numpy())
+        return self.base_status.loc[missing, TEST_KEY + ['status']].reset_index(drop=True)
+
+    def duration_jumps(self, min_ratio: float = 1.5, min_seconds: float = 0.5) -> pd.DataFrame:
+        """
+        Tests whose duration (setup + call + teardown, median over the runs of each side) jumped.
+
+        :param min_ratio: Minimum head / base duration ratio.
+        :param min_seconds: Minimum increase, in seconds, so fast tests do not show up on noise.
+        :return: A DataFrame with the TEST_KEY columns, base_seconds, head_seconds, delta and ratio, largest increase first.
+        """
+        head, base = self.head_durations, self.base_durations
+        columns = TEST_KEY + ['base_seconds', 'head_seconds', 'delta', 'ratio']
+        positions = pd.Index(base['key']).get_indexer(head['key'])
+        found = positions >= 0
+        if not found.any():
+            return pd.DataFrame(columns=columns)
+
+        result = head.loc[found, TEST_KEY].copy()
+        result['base_seconds'] = base['seconds'].to_numpy()[positions[found]]
+        result['head_seconds'] = head.loc[found, 'seconds'].to_numpy()
+        result['delta'] = result['head_seconds'] - result['base_seconds']
+        result['ratio'] = (result['head_seconds'] / result['base_seconds'].replace(0, np.nan)).replace([np.inf, -np.inf], np.nan)
+
+        jumped = (result['delta'] >= min_seconds) & (result['ratio'].isna() | (result['ratio'] >= min_ratio))
+        return result[jumped].sort_values('delta', ascending=False).round(4).reset_index(drop=True)[columns]
+
+    def report(self, min_ratio: float = 1.5, min_seconds: float = 0.5) -> dict:
+        """
+        The compact regression report of the diff.
+
+        :return: A dict with the compared runs, counts, and the newly failing, fixed and slower tests as lists of records.
+        """
+        changes = self.status_changes()
+        jumps = self.duration_jumps(min_ratio=min_ratio, min_seconds=min_seconds)
+        removed = self.removed()
+
+        def records(df):
+            return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+        return {
+            'base_runs': sorted(self.base_ids),
+            'head_runs': sorted(self.head_ids),
+            'counts': {
+                'base_tests': len(self.base_status),
+                'head_tests': len(self.head_status),
+                'new_tests': int(changes['base_status'].isna().sum()),
+                'removed_tests': len(removed),
+                'newly_failing': int((changes['change'] == 'new failure').sum()),
+                'fixed': int((changes['change'] == 'fixed').sum()),
+                'still_failing': int((changes['change'] == 'still failing').sum()),
+                'duration_jumps': len(jumps),
+            },
+            'newly_failing': records(changes.loc[changes['change'] == 'new failure', TEST_KEY + ['base_status', 'head_status']]),
+            'fixed': records(changes.loc[changes['change'] == 'fixed', TEST_KEY + ['base_status', 'head_status']]),
+            'duration_jumps': records(jumps),
+        }
+
+    def __side_status__(self, status_df: pd.DataFrame, run_ids: set) -> pd.DataFrame:
+        """
+        Reduces the status rows of one side to one row per test: its worst outcome in the latest run it appears in.
+        """
+        columns = ['key'] + TEST_KEY + ['status']
+        if status_df.empty:
+            return pd.DataFrame(columns=columns)
+
+        df = index_as_name(status_df)
+        df = df[df['databaseId'].isin(list(run_ids))]
+        if df.empty:
+            return pd.DataFrame(columns=columns)
+
+        df = pd.DataFrame({
+            'key': hash_test_keys(df),
+            'category': df['category'].to_numpy(),
+            'name': df['name'].to_numpy(),
+            'arguments': df['arguments'].to_numpy(),
+            'status': df['status'].to_numpy(),
+            'databaseId': df['databaseId'].astype('int64').to_numpy(),
+        })
+        df['rank'] = df['status'].map(STATUS_RANKS).fillna(1).to_numpy()
+        df = df.sort_values(['key', 'databaseId', 'rank'], kind='stable').drop_duplicates('key', keep='last')
+
+        return df[columns].reset_index(drop=True)
+
+    def __side_durations__(self, durations_df: pd.DataFrame, run_ids: set) -> pd.DataFrame:
+        """
+        Reduces the timings of one side to one row per test: the median over runs of its summed phases.
+        """
+        columns = ['key'] + TEST_KEY + ['seconds']
+        if durations_df.empty:
+            return pd.DataFrame(columns=columns)
+
+        df = durations_df[durations_df['databaseId'].isin(list(run_ids))]
+        if df.empty:
+            return pd.DataFrame(columns=columns)
+
+        keys = hash_test_keys(df)
+        df = pd.DataFrame({'key': keys, 'databaseId': df['databaseId'].to_numpy(), 'artifact': df['artifact'].astype(object).to_numpy(),
+                           'seconds': df['seconds'].astype('float64').to_numpy()}) \
+            .join(df[TEST_KEY].reset_index(drop=True).astype(object))
+
+        per_run = df.groupby(['key', 'databaseId', 'artifact'], sort=False)['seconds'].sum()
+        medians = per_run.groupby(level='key', sort=False).median()
+        names = df.drop_duplicates('key').set_index('key')[TEST_KEY]
+
+        return names.join(medians).reset_index()[columns]
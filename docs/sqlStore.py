@@ -0,0 +1,202 @@
+import os
+import sqlite3
+import pandas as pd
+
+from actions import PRIMARY_KEYS
+from analytics import index_as_name
+
+
+paths = {
+    'sqlite':'./bin/results.sqlite',
+    }
+
+# Column types and secondary indexes of each table, the primary keys come from PRIMARY_KEYS
+SCHEMAS = {
+    'workflow': {
+        'columns': {'databaseId': 'INTEGER', 'workflowDatabaseId': 'INTEGER', 'name': 'TEXT', 'status': 'TEXT',
+                    'conclusion': 'TEXT', 'createdAt': 'TEXT', 'repository': 'TEXT'},
+        'indexes': [['createdAt'], ['repository', 'createdAt']],
+        },
+    'jobs': {
+        'columns': {'databaseId': 'INTEGER', 'jobId': 'INTEGER', 'test': 'TEXT', 'conclusion': 'TEXT',
+                    'buildTime (sec)': 'INTEGER', 'failedAt': 'TEXT'},
+        'indexes': [['test']],
+        },
+    'status': {
+        'columns': {'databaseId': 'INTEGER', 'category': 'TEXT', 'name': 'TEXT', 'arguments': 'TEXT', 'status': 'TEXT'},
+        'indexes': [['category', 'status'], ['name']],
+        },
+    'categories': {
+        'columns': {'databaseId': 'INTEGER', 'durationType': 'TEXT', 'name': 'TEXT', 'num': 'INTEGER', 'avg': 'REAL',
+                    'min': 'REAL', 'total': 'REAL'},
+        'indexes': [['name']],
+        },
+    'failures': {
+        'columns': {'databaseId': 'INTEGER', 'category': 'TEXT', 'name': 'TEXT', 'arguments': 'TEXT', 'status': 'TEXT',
+                    'error': 'TEXT', 'error_details': 'TEXT', 'fingerprint': 'TEXT'},
+        'indexes': [['category', 'error'], ['name'], ['fingerprint']],
+        },
+    'test_durations': {
+        'columns': {'databaseId': 'INTEGER', 'artifact': 'TEXT', 'category': 'TEXT', 'name': 'TEXT', 'arguments': 'TEXT',
+                    'phase': 'TEXT', 'seconds': 'REAL'},
+        'indexes': [['category', 'phase'], ['name']],
+        },
+    }
+KEYS = dict(PRIMARY_KEYS, test_durations=['databaseId', 'artifact', 'category', 'name', 'arguments', 'phase'])
+# Index labels of the extractor tables, restored when they are read back
+INDEX_LABELS = {'status': 'pytest_tests_status', 'categories': 'pytest_run_times', 'failures': 'pytest_failures_errors'}
+
+
+class SqliteResultStore:
+    """
+    An optional embedded SQLite copy of the workflow, jobs, status, duration and failure tables, fed by the same
+    extractors as the parquet stores, so reports and ad-hoc analysis run as indexed queries with bounded memory.
+
+    Rows are upserted by the PRIMARY_KEYS of each table. SQLite treats NULLs as distinct in keys,
+    so missing key values (e.g. tests without arguments) are stored as '' and read back as None.
+    """
+
+    def __init__(self, db_path: str = paths.get('sqlite')):
+        """
+        Initializes the SqliteResultStore object, creating the database file and its schema if needed.
+
+        :param db_path: Path to the SQLite file.
+        """
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.__create_schema__()
+
+    def close(self):
+        self.connection.close()
+
+    def upsert(self, table: str, df: pd.DataFrame):
+        """
+        Inserts rows into a table, replacing the rows with the same key.
+
+        :param table: One of the SCHEMAS tables.
+        :param df: Rows to write, as produced by the extractors (the test name may be the index).
+        """
+        if df is None or df.empty:
+            return
+
+        columns = list(SCHEMAS[table]['columns'])
+        df = index_as_name(df) if table in INDEX_LABELS else df
+        df = df.reindex(columns=columns)
+
+        if 'createdAt' in df.columns:
+            df['createdAt'] = pd.to_datetime(df['createdAt'], utc=True).dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+        for key in KEYS[table]:
+            df[key] = df[key].astype(object).where(df[key].notna(), '')
+
+        rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+        placeholders = ', '.join('?' * len(columns))
+        with self.connection:
+            self.connection.executemany(
+                f'INSERT OR REPLACE INTO {table} ({quote_columns(columns)}) VALUES ({placeholders})', rows)
+
+    def upsert_results(self, status_df: pd.DataFrame, categories_df: pd.DataFrame, failures_df: pd.DataFrame):
+        """
+        Writes the tables of one artifact, as returned by PytestArtifactLogExtractor.extract_dfs.
+        """
+        self.upsert('status', status_df)
+        self.upsert('categories', categories_df)
+        self.upsert('failures', failures_df)
+
+    def upsert_test_durations(self, artifact: str, durations_df: pd.DataFrame):
+        """
+        Writes the per-test timings of one artifact, as returned by PytestArtifactLogExtractor.extract_test_durations.
+        """
+        if not durations_df.empty:
+            self.upsert('test_durations', durations_df.assign(artifact=artifact))
+
+    def query(self, sql: str, params=()) -> pd.DataFrame:
+        """
+        Runs an ad-hoc SQL query.
+
+        :param sql: A SELECT statement over the SCHEMAS tables.
+        :param params: Query parameters, bound to the '?' placeholders.
+        :return: The result rows.
+        """
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    def iter_query(self, sql: str, params=(), batch_size: int = 100_000):
+        """
+        Runs an ad-hoc SQL query, yielding its rows as DataFrames of at most batch_size rows.
+        """
+        yield from pd.read_sql_query(sql, self.connection, params=params, chunksize=batch_size)
+
+    def run_ids(self, initial_date=None, final_date=None, repository: str = None) -> list[int]:
+        """
+        Finds the runs created in a date range, through the createdAt index.
+
+        :param initial_date: First date, any date pandas understands (UTC).
+        :param final_date: Last date, any date pandas understands (UTC).
+        :param repository: Only runs of this repository ("owner/repo").
+        :return: The databaseIds of the runs.
+        """
+        conditions, params = [], []
+        if repository is not None:
+            conditions.append('repository = ?')
+            params.append(repository)
+        if initial_date is not None:
+            conditions.append('createdAt >= ?')
+            params.append(to_sql_date(initial_date))
+        if final_date is not None:
+            conditions.append('createdAt <= ?')
+            params.append(to_sql_date(final_date))
+
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        return self.query(f'SELECT databaseId FROM workflow{where} ORDER BY createdAt', params)['databaseId'].tolist()
+
+    def report_frames(self, databaseIds) -> tuple:
+        """
+        Reads the status, duration and failure tables of some runs, shaped as the extractor tables
+        so they can be given to ReportAggregates.
+
+        :param databaseIds: The runs of the report.
+        :return: A tuple with the status, duration and failure DataFrames.
+        """
+        with self.connection:
+            self.connection.execute('CREATE TEMP TABLE IF NOT EXISTS report_runs (databaseId INTEGER PRIMARY KEY)')
+            self.connection.execute('DELETE FROM report_runs')
+            self.connection.executemany('INSERT OR IGNORE INTO report_runs VALUES (?)', ((int(i),) for i in databaseIds))
+
+        frames = []
+        for table, columns in (('status', ['name', 'status', 'category', 'arguments', 'databaseId']),
+                               ('categories', ['name', 'num', 'avg', 'min', 'total', 'durationType', 'databaseId']),
+                               ('failures', ['name', 'status', 'category', 'arguments', 'error', 'error_details', 'databaseId', 'fingerprint'])):
+            df = self.query(f'SELECT {quote_columns(columns, "t")} FROM {table} t JOIN report_runs USING (databaseId)')
+            if 'arguments' in df.columns:
+                df['arguments'] = df['arguments'].replace('', None)
+            df = df.set_index('name')
+            df.index.name = INDEX_LABELS[table]
+            frames.append(df)
+
+        return tuple(frames)
+
+    def __create_schema__(self):
+        with self.connection:
+            for table, schema in SCHEMAS.items():
+                columns = ', '.join(f'"{name}" {sql_type}' for name, sql_type in schema['columns'].items())
+                self.connection.execute(
+                    f'CREATE TABLE IF NOT EXISTS {table} ({columns}, PRIMARY KEY ({quote_columns(KEYS[table])}))')
+                for index in schema['indexes']:
+                    self.connection.execute(
+                        f'CREATE INDEX IF NOT EXISTS {table}_{"_".join(index)} ON {table} ({quote_columns(index)})')
+
+
+def quote_columns(columns: list[str], alias: str = None) -> str:
+    prefix = f'{alias}.' if alias else ''
+    return ', '.join(f'{prefix}"{column}"' for column in columns)
+
+
+def to_sql_date(value) -> str:
+    """
+    Formats a date as the stored createdAt values (UTC, ISO 8601), so they compare as strings.
+    """
+    timestamp = pd.Timestamp(value)
+    timestamp = timestamp.tz_localize('UTC') if timestamp.tzinfo is None else timestamp.tz_convert('UTC')
+    return timestamp.strftime('%Y-%m-%dT%H:%M:%SZ')
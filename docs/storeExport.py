@@ -0,0 +1,76 @@
+import os
+
+from actions import ArqManipulation, ROW_GROUP_ROWS, paths as actions_paths
+from analytics import index_as_name
+from durations import paths as durations_paths
+from LogExtractor import paths as log_paths
+
+
+STORES = {
+    'workflow': actions_paths.get('workflow'),
+    'jobs': actions_paths.get('jobs'),
+    'status': log_paths.get('status'),
+    'categories': log_paths.get('categories'),
+    'failures': log_paths.get('failures'),
+    'test_durations': durations_paths.get('test_durations'),
+    }
+EXPORT_FORMATS = ['csv', 'jsonl']
+
+
+def iter_store(table: str, batch_size: int = ROW_GROUP_ROWS, columns: list[str] = None, databaseIds=None):
+    """
+    Reads a result store as record batches, with the test name index (if any) as a regular 'name' column.
+
+    :param table: One of the STORES names.
+    :param batch_size: Rows per batch.
+    :param columns: Columns to keep, all when empty. 'name' selects the test name of the indexed stores.
+    :param databaseIds: Only rows of these runs.
+    :return: A generator of DataFrames of at most batch_size rows.
+    """
+    if table not in STORES:
+        raise ValueError(f"Unknown table '{table}', expected one of {', '.join(STORES)}")
+
+    read_columns = None if columns is None else [c for c in columns if c != 'name']
+    if read_columns is not None and databaseIds is not None and 'databaseId' not in read_columns:
+        read_columns.append('databaseId')
+    filters = [('databaseId', 'in', list(databaseIds))] if databaseIds is not None else None
+
+    for batch in ArqManipulation.iter_parquet_batches(STORES[table], batch_size, read_columns, filters):
+        if databaseIds is not None:
+            batch = batch[batch['databaseId'].isin(filters[0][2]).to_numpy()]
+        if batch.empty:
+            continue
+
+        batch = index_as_name(batch) if batch.index.name is not None else batch.reset_index(drop=True)
+        yield batch if columns is None else batch[[c for c in columns if c in batch.columns]]
+
+
+def export_store(table: str, output_path: str, fmt: str = 'csv', columns: list[str] = None, databaseIds=None,
+                 batch_size: int = ROW_GROUP_ROWS) -> int:
+    """
+    Writes a result store to a CSV or JSON Lines file batch by batch, so memory stays flat whatever the history length.
+
+    :param table: One of the STORES names.
+    :param output_path: Path of the written file.
+    :param fmt: 'csv' or 'jsonl'.
+    :param columns: Columns to export, all when empty.
+    :param databaseIds: Only rows of these runs.
+    :param batch_size: Rows read and written at a time.
+    :return: The number of exported rows.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'")
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    rows = 0
+    with open(output_path, 'w', newline='') as file:
+        for batch in iter_store(table, batch_size, columns, databaseIds):
+            if fmt == 'csv':
+                batch.to_csv(file, index=False, header=rows == 0)
+            else:
+                # to_json handles numpy and timestamp values, one record per line
+                file.write(batch.to_json(orient='records', lines=True, date_format='iso'))
+            rows += len(batch)
+
+    return rows
+
@@ -0,0 +1,223 @@
+import numpy as np
+import pandas as pd
+
+from actions import ArqManipulation, fold_updates
+from analytics import DailyRunStore, index_as_name, run_days
+from durations import TEST_KEY, quantile_label
+
+
+paths = {
+    'run_summaries':'./bin/summary.runs.parquet',
+    'duration_sketches':'./bin/summary.sketches.parquet',
+    }
+
+SUMMARY_COLUMNS = ['day', 'databaseId', 'artifact', 'category', 'tests', 'total', 'min', 'max']
+SKETCH_COLUMNS = ['day', 'databaseId', 'artifact', 'category', 'bucket', 'count']
+
+# Relative error of the sketch quantiles: every duration falls in a bucket [GAMMA^(i-1), GAMMA^i)
+SKETCH_ACCURACY = 0.01
+GAMMA = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+# Durations below this many seconds share the lowest bucket
+MIN_SECONDS = 1e-4
+MIN_BUCKET = int(np.ceil(np.log(MIN_SECONDS) / np.log(GAMMA)))
+
+
+def sketch_buckets(seconds) -> np.ndarray:
+    """
+    Maps durations to the logarithmic buckets of the quantile sketch.
+
+    :param seconds: An array of durations.
+    :return: The int32 bucket of each duration.
+    """
+    seconds = np.maximum(np.asarray(seconds, dtype='float64'), MIN_SECONDS)
+    return np.ceil(np.log(seconds) / np.log(GAMMA)).astype('int32')
+
+
+def bucket_seconds(buckets) -> np.ndarray:
+    """
+    The representative duration of sketch buckets, within SKETCH_ACCURACY of every duration in them.
+    """
+    return 2 * np.power(GAMMA, np.asarray(buckets, dtype='float64')) / (GAMMA + 1)
+
+
+def sketch_quantiles(sketch_df: pd.DataFrame, quantiles=(0.5, 0.95)) -> pd.DataFrame:
+    """
+    Reads quantiles out of merged sketches.
+
+    :param sketch_df: Sketch rows with category, bucket and count columns, a category may span many runs.
+    :param quantiles: The quantiles to compute, between 0 and 1.
+    :return: A DataFrame indexed by category with one 'pNN' column per quantile (see durations.quantile_label).
+    """
+    labels = [quantile_label(q) for q in quantiles]
+    if sketch_df.empty:
+        return pd.DataFrame(columns=labels)
+
+    merged = sketch_df.groupby(['category', 'bucket'], observed=True, sort=True)['count'].sum().reset_index()
+    cumulative = merged.groupby('category', observed=True)['count'].cumsum().to_numpy()
+    totals = merged.groupby('category', observed=True)['count'].transform('sum').to_numpy()
+
+    result = {}
+    for q, label in zip(quantiles, labels):
+        # First bucket holding the value of rank q * (n - 1), as numpy's 'lower' interpolation
+        reached = merged[cumulative > np.floor(q * (totals - 1))]
+        first = reached.groupby('category', observed=True)['bucket'].first()
+        result[label] = pd.Series(bucket_seconds(first.to_numpy()), index=first.index)
+
+    return pd.DataFrame(result)
+
+
+def durations_from_times(status_df: pd.DataFrame, categories_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Builds the duration summary of runs without per-test timings from their pytest-durations call table,
+    each timed test being assigned the category it has in the status table of its run.
+
+    :param status_df: Test status table of the runs.
+    :param categories_df: Duration table of the runs.
+    :return: A DataFrame indexed by category with tests, total, mean, min and max columns (max is unknown, NaN).
+    """
+    columns = ['tests', 'total', 'mean', 'min', 'max']
+    if status_df.empty or categories_df.empty or 'durationType' not in categories_df.columns:
+        return pd.DataFrame(columns=columns)
+
+    times = index_as_name(categories_df)
+    times = times[times['durationType'].astype(str).str.contains('call')]
+    categories = index_as_name(status_df)[['databaseId', 'name', 'category']].drop_duplicates(['databaseId', 'name'])
+    times = times.merge(categories, on=['databaseId', 'name'], how='inner')
+    if times.empty:
+        return pd.DataFrame(columns=columns)
+
+    for col in ('num', 'total', 'min'):
+        times[col] = pd.to_numeric(times[col], errors='coerce')
+    merged = times.groupby('category').agg(tests=('num', 'sum'), total=('total', 'sum'), min=('min', 'min'))
+    merged['tests'] = merged['tests'].fillna(0).astype('int64')
+    merged['mean'] = merged['total'] / merged['tests'].replace(0, np.nan)
+    merged['max'] = np.nan
+
+    return merged[columns]
+
+
+def merge_duration_summaries(*summaries: pd.DataFrame) -> pd.DataFrame:
+    """
+    Merges duration summaries of disjoint sets of runs (see RunSummaryStore.duration_summary and durations_from_times).
+    Quantiles only come from sketches, categories summarized by other means have none.
+
+    :return: A DataFrame indexed by category with the columns of the first summary.
+    """
+    frames = [summary for summary in summaries if summary is not None and not summary.empty]
+    if not frames:
+        return summaries[0] if summaries else pd.DataFrame(columns=['tests', 'total', 'mean', 'min', 'max'])
+    if len(frames) == 1:
+        return frames[0]
+
+    combined = pd.concat(frames)
+    merged = combined.groupby(level=0).agg(tests=('tests', 'sum'), total=('total', 'sum'), min=('min', 'min'), max=('max', 'max'))
+    merged['mean'] = merged['total'] / merged['tests'].replace(0, np.nan)
+    # Quantiles of a category are only kept when a single summary holds it
+    single = combined.index.value_counts() == 1
+    for column in frames[0].columns.difference(merged.columns):
+        values = combined[column][~combined.index.duplicated(keep=False)]
+        merged[column] = values.reindex(merged.index).where(single.reindex(merged.index, fill_value=False))
+
+    return merged[frames[0].columns]
+
+
+class RunSummaryStore(DailyRunStore):
+    """
+    Keeps a compact summary of the test durations of every ingested artifact, per category: number of tests,
+    total, min and max seconds and a logarithmic-bucket quantile sketch.
+
+    Every part of the summary merges by plain sums, mins and maxes, so statistics over any set of runs or
+    date range are answered from a few rows per run instead of the raw duration rows. The status counts
+    merge the same way from the RollupStore.
+
+    Rows are keyed by run and artifact, so re-ingesting an artifact replaces its summary.
+    Updates are buffered and folded into the tables once, when they are saved or read.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.summary_df = ArqManipulation.read_parquet_file(paths.get('run_summaries'))
+        self.sketch_df = ArqManipulation.read_parquet_file(paths.get('duration_sketches'))
+        if self.summary_df.empty:
+            self.summary_df = pd.DataFrame(columns=SUMMARY_COLUMNS)
+        if self.sketch_df.empty:
+            self.sketch_df = pd.DataFrame(columns=SKETCH_COLUMNS)
+        self.pending_summaries = []
+        self.pending_sketches = []
+
+    def update(self, artifact: str, durations_df: pd.DataFrame):
+        """
+        Replaces the summary of a single ingested artifact.
+
+        :param artifact: Artifact name inside its run (see PytestArtifactLogExtractor.artifact_name).
+        :param durations_df: The artifact's own per-test timings, with a databaseId column (see extract_test_durations).
+        """
+        if durations_df.empty:
+            return
+
+        # A test lasts its setup, call and teardown
+        tests = durations_df.groupby(['databaseId'] + TEST_KEY, observed=True, dropna=False)['seconds'].sum().reset_index()
+        tests['seconds'] = tests['seconds'].astype('float64')
+
+        summary_rows = tests.groupby(['databaseId', 'category'], observed=True)['seconds'] \
+            .agg(tests='size', total='sum', min='min', max='max').reset_index()
+        tests['bucket'] = sketch_buckets(tests['seconds'])
+        sketch_rows = tests.groupby(['databaseId', 'category', 'bucket'], observed=True).size().reset_index(name='count')
+
+        for rows in (summary_rows, sketch_rows):
+            rows['artifact'] = artifact
+            rows['day'] = run_days(rows['databaseId'], self.__run_dates__())
+
+        keys = [(int(run_id), artifact or '') for run_id in summary_rows['databaseId'].unique()]
+        self.pending_summaries.append((keys, summary_rows[SUMMARY_COLUMNS]))
+        self.pending_sketches.append((keys, sketch_rows[SKETCH_COLUMNS]))
+
+    def save(self):
+        """
+        Persists the summaries and their sketches.
+        """
+        self.__fold__()
+        ArqManipulation.save_df_to_parquet(self.summary_df.astype({'tests': 'int64', 'total': 'float64'}),
+                                           paths.get('run_summaries'))
+        ArqManipulation.save_df_to_parquet(self.sketch_df.astype({'bucket': 'int32', 'count': 'int64'}),
+                                           paths.get('duration_sketches'))
+
+    def covered_ids(self, databaseIds) -> set:
+        """
+        The runs among databaseIds that have a summary.
+        """
+        self.__fold__()
+        ids = {int(i) for i in databaseIds}
+        return ids.intersection(self.summary_df['databaseId'].astype('int64')) if not self.summary_df.empty else set()
+
+    def duration_summary(self, databaseIds=None, start=None, end=None, quantiles=(0.5, 0.95)) -> pd.DataFrame:
+        """
+        Merges the summaries of some runs or of a day range.
+
+        :param quantiles: The quantiles read from the merged sketches, within SKETCH_ACCURACY of the exact ones.
+        :return: A DataFrame indexed by category with tests, total, mean, min, max and one 'pNN' column per quantile.
+        """
+        self.__fold__()
+        summary = self.__filter__(self.summary_df, databaseIds, start, end)
+        labels = [quantile_label(q) for q in quantiles]
+        if summary.empty:
+            return pd.DataFrame(columns=['tests', 'total', 'mean', 'min', 'max'] + labels)
+
+        merged = summary.groupby('category', observed=True).agg(tests=('tests', 'sum'), total=('total', 'sum'),
+                                                                min=('min', 'min'), max=('max', 'max'))
+        merged = merged.astype({'tests': 'int64', 'total': 'float64', 'min': 'float64', 'max': 'float64'})
+        merged.insert(2, 'mean', merged['total'] / merged['tests'])
+
+        sketch = self.__filter__(self.sketch_df, databaseIds, start, end)
+        merged = merged.join(sketch_quantiles(sketch, quantiles))
+        # Bucket midpoints may fall slightly outside the exact range
+        for label in labels:
+            merged[label] = merged[label].clip(merged['min'], merged['max'])
+
+        return merged
+
+    def __fold__(self):
+        self.summary_df = fold_updates(self.summary_df, self.pending_summaries)
+        self.sketch_df = fold_updates(self.sketch_df, self.pending_sketches)
+        self.pending_summaries = []
+        self.pending_sketches = []
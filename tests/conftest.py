@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# The modules live flat in docs/ and import each other by name, as when main.py is run from there
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'docs'))
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """
+    Runs every test in its own directory, the stores write to the relative ./bin.
+    """
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def status_rows():
+    """
+    Builds status rows of tests/test_api.py, indexed like the ones the extractors return.
+    """
+    def build(names, statuses, arguments=None, databaseId=1):
+        df = pd.DataFrame({
+            'name': names,
+            'status': statuses,
+            'category': 'tests/test_api.py',
+            'arguments': arguments if arguments is not None else [None] * len(names),
+            'databaseId': databaseId,
+        }).set_index('name')
+        df.index.name = 'pytest_tests_status'
+        return df
+    return build
@@ -0,0 +1,34 @@
+import json
+import os
+import stat
+import sys
+
+from actions import ActionsArtifacts, GH_CALL_STATS
+
+
+# Records its arguments, one JSON list per call
+FAKE_GH = '''#!{python}
+import json, sys
+with open({log!r}, 'a') as file:
+    file.write(json.dumps(sys.argv[1:]) + '\\n')
+'''
+
+
+def test_artifact_names_are_not_run_through_a_shell(workdir, monkeypatch):
+    log = str(workdir / 'gh_calls.jsonl')
+    gh = workdir / 'bin' / 'gh'
+    gh.parent.mkdir()
+    gh.write_text(FAKE_GH.format(python=sys.executable, log=log))
+    gh.chmod(gh.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', f"{gh.parent}{os.pathsep}{os.environ['PATH']}")
+
+    artifacts = ActionsArtifacts([1], repository='o/r', download=False)
+    name = 'test_api "$(touch pwned)"; touch pwned'
+    artifacts.download_run(1, [name, 'test_db.us-east'])
+
+    with open(log) as file:
+        calls = [json.loads(line) for line in file]
+    assert calls == [['run', '--repo', 'o/r', 'download', '1', '--dir', os.path.join('artifacts/', '1'),
+                      '-n', name, '-n', 'test_db.us-east']]
+    assert not (workdir / 'pwned').exists()
+    assert GH_CALL_STATS['run download']['calls'] >= 1
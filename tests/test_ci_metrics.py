@@ -0,0 +1,57 @@
+import pandas as pd
+
+from ciMetrics import CiMetrics
+
+
+def job_timings(*jobs):
+    """
+    Builds a job timings table from (created, started, completed) times of 2025-01-01.
+    """
+    return pd.DataFrame({
+        'databaseId': 1,
+        'job': [f'job-{i}' for i in range(len(jobs))],
+        'runner': 'ubuntu-latest',
+        'createdAt': [f'2025-01-01T{created}Z' for created, _, _ in jobs],
+        'startedAt': [f'2025-01-01T{started}Z' for _, started, _ in jobs],
+        'completedAt': [f'2025-01-01T{completed}Z' for _, _, completed in jobs],
+    })
+
+
+def metrics(*jobs):
+    return CiMetrics(job_timings(*jobs), pd.DataFrame({'databaseId': [1], 'name': ['CI']}))
+
+
+def test_average_concurrency_spans_the_whole_period():
+    ci = metrics(('00:00', '00:00', '01:30'))
+
+    daily = ci.peak_concurrency('D')
+    assert daily['peak'].tolist() == [1]
+    # 1.5 hours of one job over a 24 hours day
+    assert daily['average'].tolist() == [round(1.5 / 24, 2)]
+
+    hourly = ci.peak_concurrency('h')
+    assert hourly['peak'].tolist() == [1, 1]
+    assert hourly['average'].tolist() == [1.0, 0.5]
+
+
+def test_overlapping_and_back_to_back_jobs():
+    ci = metrics(('00:00', '00:00', '00:30'), ('00:00', '00:15', '00:45'), ('00:00', '00:45', '01:00'))
+
+    steps = ci.concurrency()
+    assert steps['jobs'].tolist() == [1, 2, 1, 1, 0]
+
+    hourly = ci.peak_concurrency('h')
+    # The last job ends on the hour, the next hour has no job
+    assert hourly['peak'].tolist() == [2, 0]
+    # 15 + 2 * 15 + 15 + 15 job-minutes over 60 minutes
+    assert hourly['average'].tolist() == [1.25, 0.0]
+
+
+def test_queue_latency_and_runner_minutes():
+    ci = metrics(('00:00', '00:01', '00:31'), ('00:00', '00:03', '00:13'))
+
+    latency = ci.queue_latency()
+    assert latency.loc['CI', ['jobs', 'max']].tolist() == [2, 180.0]
+
+    minutes = ci.runner_minutes()
+    assert minutes.loc['CI', 'runner_minutes'] == 40.0
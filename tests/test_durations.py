@@ -0,0 +1,80 @@
+import os
+
+import pandas as pd
+import pytest
+
+from durations import TestDurationStore as DurationStore, duration_percentiles, parse_pytest_durations
+from LogExtractor import PytestArtifactLogExtractor
+
+
+LOG = '''============================= test session starts ==============================
+[gw0] [ 50%] PASSED tests/test_api.py::test_get[1]
+[gw1] [100%] FAILED tests/test_api.py::TestPost::test_post[a b-2]
+============================= slowest 10 durations ==============================
+1.52s call     tests/test_api.py::TestPost::test_post[a b-2]
+0.11s setup    tests/test_api.py::test_get[1]
+0.50s call     tests/test_api.py::test_get[1]
+2s teardown tests/db/test_conn.py::test_close
+
+(3 durations < 0.005s hidden.  Use -vv to show these durations.)
+=========================== short test summary info ============================
+0.99s call     tests/test_api.py::test_outside_the_section
+FAILED tests/test_api.py::TestPost::test_post[a b-2] - AssertionError: assert 2 == 1
+'''
+
+
+def test_parse_durations_section():
+    df = parse_pytest_durations(LOG)
+
+    assert df['category'].tolist() == ['tests/test_api.py'] * 3 + ['tests/db/test_conn.py']
+    assert df['name'].tolist() == ['TestPost::test_post', 'test_get', 'test_get', 'test_close']
+    assert df['arguments'].tolist() == ['a b-2]', '1]', '1]', None]
+    assert df['phase'].tolist() == ['call', 'setup', 'call', 'teardown']
+    assert df['seconds'].dtype == 'float32'
+    assert df['seconds'].tolist() == pytest.approx([1.52, 0.11, 0.5, 2.0])
+
+
+@pytest.mark.parametrize('text', ['', 'no durations here\n', '===== slowest durations =====\n\n(all hidden)\n'])
+def test_parse_without_timings(text):
+    df = parse_pytest_durations(text)
+    assert df.empty
+    assert df.columns.tolist() == ['category', 'name', 'arguments', 'phase', 'seconds']
+
+
+def test_log_extractor_durations(workdir):
+    path = workdir / 'artifacts' / '123' / 'test_api.us-east.123.log'
+    os.makedirs(path.parent)
+    path.write_text(LOG, encoding='utf-8')
+
+    durations_df = PytestArtifactLogExtractor(str(path)).extract_test_durations()
+    assert set(durations_df['databaseId']) == {123}
+    assert len(durations_df) == 4
+
+
+def durations_of(databaseId, seconds):
+    return pd.DataFrame({'databaseId': databaseId, 'category': 'tests/test_api.py', 'name': 'test_get',
+                         'arguments': None, 'phase': 'call', 'seconds': pd.Series(seconds, dtype='float32')})
+
+
+def test_store_replaces_reingested_artifacts():
+    store = DurationStore()
+    store.update('test_api.us-east', durations_of(1, [1.0]))
+    store.update('test_api.eu-west', durations_of(1, [2.0]))
+    store.save()
+
+    reloaded = DurationStore()
+    reloaded.update('test_api.us-east', durations_of(1, [3.0]))
+    reloaded.update('test_api.us-east', durations_of(1, [4.0]))
+    reloaded.update('test_api.us-east', durations_of(2, [5.0]))
+    reloaded.save()
+
+    df = DurationStore().durations()
+    assert sorted(zip(df['databaseId'], df['artifact'].astype(str), df['seconds'])) == [
+        (1, 'test_api.eu-west', 2.0), (1, 'test_api.us-east', 4.0), (2, 'test_api.us-east', 5.0)]
+
+
+def test_duration_percentiles():
+    df = durations_of(1, [1.0, 2.0, 3.0, 4.0]).assign(artifact='a')
+    stats = duration_percentiles(df, by='category', quantiles=(0.5,))
+
+    assert stats.loc['tests/test_api.py', ['runs', 'mean', 'max', 'p50']].tolist() == [4, 2.5, 4.0, 2.5]
@@ -0,0 +1,84 @@
+import pandas as pd
+
+import main
+from actions import ArqManipulation
+from failureIndex import FailureIndex, paths
+from LogExtractor import paths as log_paths
+
+
+def failures(rows, databaseId=1):
+    """
+    Builds a failure table from (name, error, error_details) rows.
+    """
+    df = pd.DataFrame(rows, columns=['name', 'error', 'error_details'])
+    df = df.assign(status='FAILED', category='tests/test_api.py', arguments=None, databaseId=databaseId).set_index('name')
+    df.index.name = 'pytest_failures_errors'
+    return df
+
+
+FAILURES = [
+    ('test_get', 'AssertionError', 'assert 2 == 1'),
+    ('test_get_all', 'TimeoutError', 'request timed out after 30s'),
+    ('test_post', 'AssertionError', 'status code 500 != 201'),
+    ('test_delete', 'ConnectionError', 'request refused by server'),
+]
+
+
+def names(result):
+    return sorted(result['name'])
+
+
+def test_posting_intersection():
+    index = FailureIndex(load=False)
+    index.add(failures(FAILURES), 'test_api.us-east')
+
+    assert names(index.query(test='test_get')) == ['test_get', 'test_get_all']
+    assert names(index.query(test='test_get', mode='exact')) == ['test_get']
+    # Every criterion must match
+    assert names(index.query(test='test_get', error='AssertionError')) == ['test_get']
+    assert names(index.query(error='assertionerror', detail='500')) == ['test_post']
+    assert names(index.query(detail='request refused')) == ['test_delete']
+    assert names(index.query(detail='request', mode='exact')) == ['test_delete', 'test_get_all']
+    assert names(index.query(test='test_post', error='TimeoutError')) == []
+    assert names(index.query(error='Error', mode='substring')) == ['test_delete', 'test_get', 'test_get_all', 'test_post']
+
+
+def test_readded_artifacts_replace_their_failures():
+    index = FailureIndex(load=False)
+    index.add(failures(FAILURES), 'test_api.us-east')
+    index.add(failures(FAILURES[:1], databaseId=2), 'test_api.us-east')
+    index.save()
+
+    reloaded = FailureIndex()
+    reloaded.add(failures([('test_get', 'KeyError', 'missing id')]), 'test_api.us-east')
+    reloaded.save()
+
+    index = FailureIndex()
+    assert index.query(test='test_get', mode='exact')[['databaseId', 'error']].values.tolist() == [
+        [2, 'AssertionError'], [1, 'KeyError']]
+    assert names(index.query(detail='request')) == []
+
+
+def test_loaded_postings_keep_their_saved_order():
+    index = FailureIndex(load=False)
+    index.add(failures(FAILURES), 'test_api.us-east')
+    index.save()
+
+    postings = ArqManipulation.read_parquet_file(paths.get('failure_postings'))
+    assert postings.equals(postings.sort_values(['field', 'token', 'doc'], ignore_index=True))
+    assert names(FailureIndex().query(test='test_get')) == ['test_get', 'test_get_all']
+
+
+def test_query_failures_command(capsys):
+    ArqManipulation.save_df_to_parquet(failures(FAILURES), log_paths.get('failures'))
+
+    main.run_query_failures(main.pdf_params(['query-failures', '--rebuild', '--test', 'test_get', '--error', 'assertion']))
+    output = capsys.readouterr().out
+    assert '1 failures found' in output
+    assert 'assert 2 == 1' in output
+
+    # The rebuilt index is saved and queried again without --rebuild
+    main.run_query_failures(main.pdf_params(['query-failures', '--detail', 'request', '--limit', '1']))
+    output = capsys.readouterr().out
+    assert '2 failures found' in output
+    assert len([line for line in output.splitlines() if 'tests/test_api.py' in line]) == 1
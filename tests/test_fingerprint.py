@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+from fingerprint import fingerprint_failures, normalize_messages
+
+
+@pytest.mark.parametrize('message, pattern', [
+    ('bucket-abc123 unreachable', 'bucket-<id> unreachable'),
+    ('bucket-7f3e9a21 unreachable', 'bucket-<id> unreachable'),
+    ('bucket_0a1b2c3d4e5f6a7b unreachable', 'bucket_<id> unreachable'),
+    ('my-bucket-222 unreachable', 'my-bucket-<id> unreachable'),
+    ('bucket-logs unreachable', 'bucket-logs unreachable'),
+    ('id 123e4567-e89b-12d3-a456-426614174000 not found', 'id <uuid> not found'),
+    ('failed at 2024-01-01T10:00:00Z', 'failed at <ts>'),
+    ('timed out after 30s on 10.0.0.1:8080', 'timed out after <num> on <ip>'),
+    ('worker-3 crashed at 0x7ffd1234', 'worker-<num> crashed at <hex>'),
+    ('S3Error on python3 in test0', 'S3Error on python3 in test0'),
+])
+def test_normalize_messages(message, pattern):
+    assert normalize_messages(pd.Series([message])).tolist() == [pattern]
+
+
+def test_fingerprints_group_messages_differing_by_ids():
+    errors = pd.Series(['ConnectionError', 'ConnectionError', 'TimeoutError'])
+    details = pd.Series(['bucket-abc123 unreachable', 'bucket-9f8e7d unreachable', 'bucket-abc123 unreachable'])
+
+    fingerprints = fingerprint_failures(errors, details)['fingerprint']
+    assert fingerprints[0] == fingerprints[1]
+    assert fingerprints[0] != fingerprints[2]
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from JUnitExtractor import DURATION_TYPE, JUnitArtifactExtractor
+
+
+REPORT = '''<?xml version="1.0" encoding="utf-8"?>
+<testsuites>
+  <testsuite name="pytest" tests="5" failures="1" errors="1" skipped="1">
+    <testcase classname="tests.test_api" name="test_get[1]" time="0.250" />
+    <testcase classname="tests.test_api.TestPost" name="test_post" time="1.5">
+      <failure type="AssertionError" message="AssertionError: assert 2 == 1">tests/test_api.py:10: AssertionError</failure>
+    </testcase>
+    <testcase classname="tests.test_db" name="test_connect" time="0.05">
+      <error message="ConnectionError: refused">setup failed</error>
+    </testcase>
+    <testcase classname="tests.test_db" name="test_skipped" time="0">
+      <skipped type="pytest.skip" message="not on CI" />
+    </testcase>
+    <testcase classname="tests.test_db" name="test_untimed" />
+  </testsuite>
+</testsuites>
+'''
+
+
+def write_report(workdir, relative_path):
+    path = workdir / relative_path
+    os.makedirs(path.parent, exist_ok=True)
+    path.write_text(REPORT, encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture
+def extractor(workdir):
+    return JUnitArtifactExtractor(write_report(workdir, 'artifacts/333/junit/junit.xml'))
+
+
+def test_testcase_statuses_and_categories(extractor):
+    status_df, _, _ = extractor.extract_dfs()
+
+    assert status_df.index.tolist() == ['test_get', 'TestPost::test_post', 'test_connect', 'test_skipped', 'test_untimed']
+    assert status_df['status'].tolist() == ['PASSED', 'FAILED', 'ERROR', 'SKIPPED', 'PASSED']
+    assert status_df['category'].tolist() == ['tests/test_api.py'] * 2 + ['tests/test_db.py'] * 3
+    assert status_df.loc['test_get', 'arguments'] == '1]'
+
+
+def test_failures_and_errors(extractor):
+    _, _, failures_df = extractor.extract_dfs()
+
+    assert failures_df['status'].tolist() == ['FAILED', 'ERROR']
+    assert failures_df['error'].tolist() == ['AssertionError', 'ConnectionError']
+    assert failures_df['error_details'].tolist() == [' assert 2 == 1', ' refused']
+    assert failures_df['fingerprint'].notna().all()
+
+
+def test_times(extractor):
+    _, categories_df, _ = extractor.extract_dfs()
+
+    # A testcase without a time attribute is not timed
+    assert 'test_untimed' not in categories_df.index
+    assert categories_df.loc['TestPost::test_post', ['num', 'total']].tolist() == [1, 1.5]
+    assert (categories_df['durationType'] == DURATION_TYPE).all()
+
+    durations_df = extractor.extract_test_durations()
+    assert durations_df['seconds'].tolist() == pytest.approx([0.25, 1.5, 0.05, 0.0])
+    assert set(durations_df['phase']) == {'call'}
+
+
+def test_database_id_from_the_run_folder(extractor):
+    status_df, categories_df, failures_df = extractor.extract_dfs()
+
+    for df in (status_df, categories_df, failures_df, extractor.extract_test_durations()):
+        assert set(df['databaseId']) == {333}
+
+
+def test_database_id_from_the_file_name(workdir):
+    extractor = JUnitArtifactExtractor(write_report(workdir, 'artifacts/333/junit/test.region.444.xml'))
+
+    assert set(extractor.extract_dfs()[0]['databaseId']) == {444}
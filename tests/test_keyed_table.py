@@ -0,0 +1,46 @@
+from actions import KeyedTable, PRIMARY_KEYS
+
+
+def test_keyed_table_last_write_wins(status_rows):
+    table = KeyedTable('./bin/status.parquet', PRIMARY_KEYS.get('status'))
+    table.upsert(status_rows(['test_a', 'test_b'], ['FAILED', 'PASSED']))
+    table.upsert(status_rows(['test_a'], ['PASSED']))
+
+    df = table.df
+    assert len(df) == 2
+    assert df.loc['test_a', 'status'] == 'PASSED'
+    assert df.loc['test_b', 'status'] == 'PASSED'
+
+
+def test_keyed_table_last_row_of_a_batch_wins(status_rows):
+    table = KeyedTable('./bin/status.parquet', PRIMARY_KEYS.get('status'))
+    table.upsert(status_rows(['test_a', 'test_a'], ['FAILED', 'PASSED']))
+
+    assert table.df['status'].tolist() == ['PASSED']
+
+
+def test_keyed_table_keys_on_arguments_and_run(status_rows):
+    table = KeyedTable('./bin/status.parquet', PRIMARY_KEYS.get('status'))
+    table.upsert(status_rows(['test_a', 'test_a', 'test_a'], ['PASSED', 'FAILED', 'PASSED'], [None, '1]', '2]']))
+    table.upsert(status_rows(['test_a'], ['PASSED'], ['1]'], databaseId=2))
+    table.upsert(status_rows(['test_a'], ['ERROR'], [None]))
+
+    df = table.df.reset_index()
+    assert len(df) == 4
+    unparametrized = df[(df['databaseId'] == 1) & df['arguments'].isna()]
+    assert unparametrized['status'].tolist() == ['ERROR']
+
+
+def test_keyed_table_upserts_over_saved_rows(status_rows):
+    table = KeyedTable('./bin/status.parquet', PRIMARY_KEYS.get('status'))
+    table.upsert(status_rows(['test_a', 'test_b'], ['FAILED', 'PASSED']))
+    table.save()
+
+    reloaded = KeyedTable('./bin/status.parquet', PRIMARY_KEYS.get('status'))
+    assert len(reloaded.df) == 2
+    reloaded.upsert(status_rows(['test_a', 'test_c'], ['PASSED', 'PASSED']))
+    reloaded.save()
+
+    df = KeyedTable('./bin/status.parquet', PRIMARY_KEYS.get('status')).df
+    assert sorted(df.index) == ['test_a', 'test_b', 'test_c']
+    assert df.loc['test_a', 'status'] == 'PASSED'
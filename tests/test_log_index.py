@@ -0,0 +1,85 @@
+import gzip
+import mmap
+import os
+
+from logIndex import LogSectionIndex, index_sections
+
+
+LOG = ('============================= test session starts ==============================\n'
+       '[gw1] [100%] \x1b[31mFAILED\x1b[0m tests/test_api.py::test_get[2]\n'
+       '\x1b[31m=================================== FAILURES ===================================\x1b[0m\n'
+       '_________________________________ test_get[2] __________________________________\n'
+       '>       assert x == 1\n'
+       'E       AssertionError: assert 2 == 1 ✗\n'
+       '==================================== ERRORS ====================================\n'
+       '________________________ ERROR at setup of test_conn[a] ________________________\n'
+       'E   ConnectionError: refused\n'
+       '=========================== short test summary info ============================\n'
+       'FAILED tests/test_api.py::test_get[2] - AssertionError: assert 2 == 1 ✗\n')
+
+
+def write_log(workdir, name='test_api.us-east.123.log'):
+    path = workdir / name
+    path.write_bytes(LOG.encode())
+    return str(path)
+
+
+def test_offsets_read_back_through_mmap(workdir):
+    path = write_log(workdir)
+    index = LogSectionIndex()
+    index.update(index_sections(path))
+    index.save()
+
+    entries = LogSectionIndex().entries(path)
+    assert entries['title'].tolist() == ['test session starts', 'FAILURES', 'test_get[2]', 'ERRORS', 'test_conn[a]',
+                                         'short test summary info']
+
+    # The source text of each entry, found independently of the index
+    source = LOG.encode()
+    summary_start = source.index(b'=========================== short')
+    block_start = source.index(b'____')
+    expected = {'short test summary info': source[summary_start:],
+                'test_get[2]': source[block_start:source.index(b'=======', block_start)]}
+
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for title, text in expected.items():
+            entry = entries[entries['title'] == title].iloc[0]
+            assert data[entry['start']:entry['end']] == text
+
+
+def test_sections_and_tracebacks_are_cleaned(workdir):
+    path = write_log(workdir)
+    index = LogSectionIndex()
+
+    assert index.section(path, 'short test summary').endswith('assert 2 == 1 ✗\n')
+    traceback = index.traceback(path, 'test_get[2]')
+    assert traceback.startswith('____') and 'AssertionError' in traceback and '\x1b' not in traceback
+    assert index.traceback(path, 'test_conn[a]').strip().endswith('ConnectionError: refused')
+    assert index.section(path, 'warnings summary') is None
+
+
+def test_compressed_logs_use_decompressed_offsets(workdir):
+    path = str(workdir / 'test_api.us-east.123.log.gz')
+    with gzip.open(path, 'wb') as file:
+        file.write(LOG.encode())
+
+    index = LogSectionIndex()
+    assert index.section(path, 'short test summary').startswith('=========================== short')
+
+
+def test_rewritten_logs_are_reindexed(workdir):
+    path = write_log(workdir)
+    index = LogSectionIndex()
+    index.update(index_sections(path))
+    index.update(index_sections(path))
+    index.save()
+    assert len(LogSectionIndex().df) == 6
+
+    with open(path, 'ab') as file:
+        file.write(b'========================== 1 failed in 0.70s ==========================\n')
+    os.utime(path, (0, 0))
+
+    index = LogSectionIndex()
+    assert index.entries(path)['title'].iloc[-1] == '1 failed in 0.70s'
+    index.save()
+    assert len(LogSectionIndex().df) == 7
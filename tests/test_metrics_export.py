@@ -0,0 +1,90 @@
+import pandas as pd
+
+from metricsExport import MetricsExporter, format_sample
+
+
+def ingest(exporter, databaseId=1, artifact='test_api'):
+    status_df = pd.DataFrame({
+        'name': ['test_a', 'test_b', 'test_c'],
+        'status': ['PASSED', 'PASSED', 'FAILED'],
+        'category': ['tests/test_api.py', 'tests/test_api.py', 'tests/test_db.py'],
+        'databaseId': databaseId,
+    }).set_index('name')
+    durations_df = pd.DataFrame({
+        'databaseId': databaseId,
+        'category': ['tests/test_api.py', 'tests/test_api.py', 'tests/test_api.py', 'tests/test_db.py'],
+        'name': ['test_a', 'test_a', 'test_b', 'test_c'],
+        'arguments': None,
+        'phase': ['setup', 'call', 'call', 'call'],
+        'seconds': [0.5, 1.5, 0.25, 4.0],
+    })
+    exporter.update(artifact, status_df, durations_df)
+
+
+def samples(text):
+    return [line for line in text.splitlines() if line and not line.startswith('#')]
+
+
+def test_openmetrics_rendering():
+    exporter = MetricsExporter()
+    ingest(exporter)
+    text = exporter.render()
+    lines = text.splitlines()
+
+    assert text.endswith('# EOF\n')
+    assert '# TYPE ci_tests counter' in lines
+    assert 'ci_tests_total{category="tests/test_api.py",status="PASSED"} 2' in lines
+    assert 'ci_tests_total{category="tests/test_db.py",status="FAILED"} 1' in lines
+    assert '# UNIT ci_test_duration_seconds seconds' in lines
+    # The phases of a test add up, test_a lasts 2 seconds
+    assert 'ci_test_duration_seconds_sum{category="tests/test_api.py"} 2.25' in lines
+    assert 'ci_test_duration_seconds_count{category="tests/test_api.py"} 2' in lines
+    assert any(line.startswith('ci_test_duration_seconds{category="tests/test_db.py",quantile="0.5"} ') for line in lines)
+
+    # Every sample belongs to a declared family
+    families = {line.split()[2] for line in lines if line.startswith('# TYPE')}
+    for sample in samples(text):
+        name = sample.split('{')[0].split(' ')[0]
+        assert any(name == family or name.startswith(family + '_') for family in families), name
+
+
+def test_prometheus_rendering():
+    exporter = MetricsExporter()
+    ingest(exporter)
+    text = exporter.render(openmetrics=False)
+    lines = text.splitlines()
+
+    assert '# EOF' not in text
+    assert '# TYPE ci_tests_total counter' in lines
+    assert not any(line.startswith('# UNIT') for line in lines)
+
+
+def test_artifacts_are_counted_once_and_persisted():
+    exporter = MetricsExporter()
+    ingest(exporter)
+    ingest(exporter)
+    ingest(exporter, databaseId=2)
+    exporter.save()
+
+    reloaded = MetricsExporter()
+    ingest(reloaded, databaseId=2)
+    lines = reloaded.render().splitlines()
+    assert 'ci_tests_total{category="tests/test_api.py",status="PASSED"} 4' in lines
+    assert 'ci_ingested_artifacts_total 2' in lines
+
+
+def test_write_leaves_only_the_metrics_file(workdir):
+    exporter = MetricsExporter()
+    ingest(exporter)
+    path = workdir / 'textfile' / 'ci.prom'
+    exporter.write(str(path), openmetrics=False)
+
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert 'ci_tests_total{category="tests/test_api.py",status="PASSED"} 2' in lines
+    assert [p.name for p in path.parent.iterdir()] == ['ci.prom']
+
+
+def test_format_sample():
+    assert format_sample('m', 3.0) == 'm 3'
+    assert format_sample('m', 0.5, {'command': 'run "view"'}) == 'm{command="run \\"view\\""} 0.5'
+    assert format_sample('m', float('nan')) == 'm NaN'
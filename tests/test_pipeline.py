@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+
+import pytest
+
+from actions import ActionsArtifacts
+from pipeline import IngestPipeline
+
+
+LOG = '''============================= test session starts ==============================
+[gw0] [ 50%] PASSED tests/test_api.py::test_get
+[gw1] [100%] PASSED tests/test_api.py::test_post
+============================== 2 passed in 0.10s ===============================
+'''
+
+
+class LocalArtifacts(ActionsArtifacts):
+    """
+    Serves the runs from local files instead of the gh CLI, an invalid JUnit report for the broken runs.
+    """
+
+    def __init__(self, jobIds, broken=()):
+        super().__init__(jobIds, repository='o/r', download=False)
+        self.broken = set(broken)
+        self.fetched = 0
+        self.lock = threading.Lock()
+
+    def download_run(self, database_id: int, names: list[str] = None):
+        run_folder = os.path.join(self.folder, str(database_id), 'test_api.us-east')
+        os.makedirs(run_folder)
+        if database_id in self.broken:
+            with open(os.path.join(run_folder, 'junit.xml'), 'w') as file:
+                file.write('<testsuite><testcase name="unclosed">')
+        else:
+            with open(os.path.join(run_folder, f'test_api.us-east.{database_id}.log'), 'w') as file:
+                file.write(LOG)
+        with self.lock:
+            self.fetched += 1
+
+
+def run_in_thread(pipeline, aggregate, timeout=30):
+    """
+    Runs the pipeline, failing the test instead of hanging it.
+    """
+    outcome = {}
+
+    def target():
+        try:
+            outcome['stats'] = pipeline.run(aggregate)
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), 'the pipeline hung'
+    return outcome
+
+
+def test_bounded_queues_hold_back_downloads():
+    artifacts = LocalArtifacts(range(1, 21))
+    pipeline = IngestPipeline(artifacts, download_workers=2, parse_workers=0, max_queued_runs=1, max_queued_files=1)
+    fetched_while_blocked = []
+    parsed = []
+
+    def aggregate(artifact):
+        if not parsed:
+            # A slow aggregator: the downloads run ahead until the bounded queues are full
+            time.sleep(0.5)
+            fetched_while_blocked.append(artifacts.fetched)
+        parsed.append(artifact.name)
+
+    outcome = run_in_thread(pipeline, aggregate)
+
+    # The aggregated file, one queued file, one queued run and one run held by each download thread
+    assert fetched_while_blocked[0] <= 5
+    assert len(parsed) == 20
+    assert outcome['stats']['runs_downloaded'] == 20
+    assert outcome['stats']['files_parsed'] == 20
+
+
+@pytest.mark.parametrize('parse_workers', [0, 2])
+def test_parse_errors_are_counted_without_hanging(parse_workers):
+    artifacts = LocalArtifacts(range(1, 7), broken={2, 5})
+    pipeline = IngestPipeline(artifacts, download_workers=2, parse_workers=parse_workers)
+    parsed = []
+
+    outcome = run_in_thread(pipeline, lambda artifact: parsed.append(artifact.path))
+
+    assert outcome['stats']['parse_errors'] == 2
+    assert outcome['stats']['files_parsed'] == 4
+    assert len(parsed) == 4
+
+
+def test_aggregate_errors_stop_the_pipeline():
+    artifacts = LocalArtifacts(range(1, 21))
+    pipeline = IngestPipeline(artifacts, download_workers=2, parse_workers=2, max_queued_runs=1, max_queued_files=2)
+
+    def aggregate(artifact):
+        raise RuntimeError('store unavailable')
+
+    outcome = run_in_thread(pipeline, aggregate)
+
+    assert str(outcome['error']) == 'store unavailable'
+    # Blocked downloads were released and the queued ones dropped
+    assert artifacts.fetched < 20
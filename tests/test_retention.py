@@ -0,0 +1,95 @@
+import gzip
+import os
+import time
+
+import pandas as pd
+
+from actions import ArqManipulation, paths as actions_paths
+from LogExtractor import paths as log_paths
+from retention import ArtifactRetention
+
+DAY = 86400
+
+
+def make_run(folder, run_id, age_days=0, size=100):
+    path = os.path.join(folder, str(run_id), 'test_api.us-east')
+    os.makedirs(path)
+    log = os.path.join(path, 'test.log')
+    with open(log, 'wb') as file:
+        file.write(b'x' * size)
+    stamp = time.time() - age_days * DAY
+    for target in (log, path, os.path.dirname(path)):
+        os.utime(target, (stamp, stamp))
+    return log
+
+
+def persist(*run_ids):
+    status_df = pd.DataFrame({'name': [f'test_{run_id}' for run_id in run_ids], 'status': 'PASSED',
+                              'category': 'tests/test_api.py', 'databaseId': list(run_ids)}).set_index('name')
+    ArqManipulation.save_df_to_parquet(status_df, log_paths.get('status'))
+
+
+def pruned_ids():
+    pruned = ArqManipulation.read_parquet_file(actions_paths.get('pruned_runs'))
+    return set(pruned['databaseId']) if not pruned.empty else set()
+
+
+def test_keep_days_records_only_persisted_runs(workdir):
+    folder = str(workdir / 'artifacts')
+    make_run(folder, 1, age_days=10)
+    make_run(folder, 2, age_days=10)
+    make_run(folder, 3, age_days=1)
+    persist(1, 3)
+
+    report = ArtifactRetention(folder=folder, keep_days=5).apply()
+
+    assert sorted(report['deleted_runs']) == ['1', '2']
+    assert report['reclaimed_bytes'] == 200
+    assert os.listdir(folder) == ['3']
+    # Run 2 was never parsed, the next ingest downloads it again
+    assert pruned_ids() == {1}
+
+
+def test_persisted_only_does_not_record_unparsed_runs(workdir):
+    folder = str(workdir / 'artifacts')
+    make_run(folder, 1)
+    make_run(folder, 2)
+    persist(1)
+
+    report = ArtifactRetention(folder=folder, persisted_only=True).apply()
+
+    assert report['deleted_runs'] == ['2']
+    assert os.listdir(folder) == ['1']
+    assert pruned_ids() == set()
+
+
+def test_size_cap_evicts_least_recently_used(workdir):
+    folder = str(workdir / 'artifacts')
+    make_run(folder, 1, age_days=3)
+    make_run(folder, 2, age_days=2)
+    make_run(folder, 3, age_days=1)
+    persist(1, 2, 3)
+
+    report = ArtifactRetention(folder=folder, max_bytes=150).apply()
+
+    assert report['deleted_runs'] == ['1', '2']
+    assert os.listdir(folder) == ['3']
+    assert pruned_ids() == {1, 2}
+
+    # A zero cap empties the folder, the pruned runs accumulate
+    ArtifactRetention(folder=folder, max_bytes=0).apply()
+    assert os.listdir(folder) == []
+    assert pruned_ids() == {1, 2, 3}
+
+
+def test_compression_keeps_the_log_readable(workdir):
+    folder = str(workdir / 'artifacts')
+    log = make_run(folder, 1, age_days=10, size=10_000)
+
+    report = ArtifactRetention(folder=folder, compress_after_days=5).apply()
+
+    assert report['compressed_files'] == 1
+    assert report['deleted_runs'] == []
+    assert not os.path.exists(log)
+    with gzip.open(log + '.gz', 'rb') as file:
+        assert file.read() == b'x' * 10_000
@@ -0,0 +1,77 @@
+import pandas as pd
+
+from runDiff import RunDiff
+
+
+def status_history(status_rows):
+    base = status_rows(['test_get', 'test_get', 'test_post', 'test_put', 'test_delete', 'test_old'],
+                       ['PASSED', 'FAILED', 'FAILED', 'ERROR', 'PASSED', 'PASSED'],
+                       ['1]', '2]', None, None, None, None], databaseId=1)
+    head = status_rows(['test_get', 'test_get', 'test_get', 'test_post', 'test_put', 'test_delete', 'test_new'],
+                       ['FAILED', 'PASSED', 'FAILED', 'PASSED', 'FAILED', 'PASSED', 'FAILED'],
+                       ['1]', '2]', '3]', None, None, None, None], databaseId=2)
+    return pd.concat([base, head])
+
+
+def changes_of(diff):
+    changes = diff.status_changes()
+    return {(name, arguments): change for name, arguments, change in
+            zip(changes['name'], changes['arguments'].where(changes['arguments'].notna(), None), changes['change'])}
+
+
+def test_status_changes(status_rows):
+    diff = RunDiff([1], [2], status_df=status_history(status_rows), durations_df=pd.DataFrame())
+
+    assert changes_of(diff) == {
+        # The arguments tell the parametrized tests apart
+        ('test_get', '1]'): 'new failure',
+        ('test_get', '2]'): 'fixed',
+        ('test_get', '3]'): 'new failure',
+        ('test_post', None): 'fixed',
+        ('test_put', None): 'still failing',
+        ('test_delete', None): '',
+        ('test_new', None): 'new failure',
+    }
+    assert sorted(diff.newly_failing()['name']) == ['test_get', 'test_get', 'test_new']
+    assert sorted(diff.fixed()['arguments'].tolist(), key=str) == ['2]', None]
+    assert diff.removed()[['name', 'status']].values.tolist() == [['test_old', 'PASSED']]
+
+
+def test_new_passing_tests_and_worst_outcomes(status_rows):
+    status_df = pd.concat([
+        status_rows(['test_a'], ['PASSED'], databaseId=1),
+        # The same test in two artifacts of a run keeps its worst outcome
+        status_rows(['test_a', 'test_a'], ['PASSED', 'ERROR'], databaseId=2),
+        status_rows(['test_b'], ['PASSED'], databaseId=2),
+    ])
+    diff = RunDiff([1], [2], status_df=status_df, durations_df=pd.DataFrame())
+
+    assert changes_of(diff) == {('test_a', None): 'new failure', ('test_b', None): 'new test'}
+    counts = diff.report()['counts']
+    assert counts['new_tests'] == 1
+    assert counts['newly_failing'] == 1
+    assert counts['removed_tests'] == 0
+
+
+def test_duration_jumps(status_rows):
+    durations_df = pd.DataFrame({
+        'databaseId': [1, 1, 2, 2, 1, 2, 2],
+        'artifact': 'test_api.us-east',
+        'category': 'tests/test_api.py',
+        'name': ['test_get', 'test_get', 'test_get', 'test_get', 'test_post', 'test_post', 'test_new'],
+        'arguments': None,
+        'phase': ['setup', 'call', 'setup', 'call', 'call', 'call', 'call'],
+        'seconds': [0.5, 1.0, 0.5, 3.0, 0.1, 0.3, 9.0],
+    })
+    diff = RunDiff([1], [2], status_df=status_history(status_rows), durations_df=durations_df)
+
+    # test_post tripled below min_seconds, test_new has no base to compare with
+    jumps = diff.duration_jumps()
+    assert jumps[['name', 'base_seconds', 'head_seconds', 'delta', 'ratio']].values.tolist() == [
+        ['test_get', 1.5, 3.5, 2.0, 2.3333]]
+
+    report = diff.report()
+    assert report['base_runs'] == [1] and report['head_runs'] == [2]
+    assert report['counts']['duration_jumps'] == 1
+    assert report['counts']['still_failing'] == 1
+    assert {record['name'] for record in report['fixed']} == {'test_get', 'test_post'}
@@ -0,0 +1,26 @@
+from sqlStore import SqliteResultStore
+
+
+def test_sqlite_store_upserts_null_keys(status_rows):
+    store = SqliteResultStore('./bin/results.sqlite')
+    store.upsert('status', status_rows(['test_a', 'test_a'], ['FAILED', 'FAILED'], [None, '1]']))
+    store.upsert('status', status_rows(['test_a', 'test_a'], ['PASSED', 'PASSED'], [None, '1]']))
+
+    rows = store.query('SELECT name, arguments, status FROM status ORDER BY arguments')
+    assert len(rows) == 2
+    assert rows['status'].tolist() == ['PASSED', 'PASSED']
+
+    status_df, _, _ = store.report_frames([1])
+    assert sorted(status_df['arguments'].tolist(), key=str) == ['1]', None]
+    store.close()
+
+
+def test_sqlite_store_keeps_runs_apart(status_rows):
+    store = SqliteResultStore('./bin/results.sqlite')
+    store.upsert('status', status_rows(['test_a'], ['FAILED'], databaseId=1))
+    store.upsert('status', status_rows(['test_a'], ['PASSED'], databaseId=2))
+
+    status_df, _, _ = store.report_frames([2])
+    assert status_df['status'].tolist() == ['PASSED']
+    assert len(store.query('SELECT * FROM status')) == 2
+    store.close()
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from durations import quantile_label
+from summaries import SKETCH_ACCURACY, merge_duration_summaries, sketch_buckets, sketch_quantiles
+
+
+QUANTILES = (0.5, 0.9, 0.95, 0.99, 0.999)
+
+
+def sketch_of(category, seconds):
+    buckets = pd.Series(sketch_buckets(seconds)).value_counts()
+    return pd.DataFrame({'category': category, 'bucket': buckets.index, 'count': buckets.to_numpy()})
+
+
+@pytest.mark.parametrize('seconds', [
+    np.random.default_rng(0).lognormal(mean=-1, sigma=1.5, size=20_000),
+    np.random.default_rng(1).uniform(0.001, 30, size=5_000),
+    np.array([0.25]),
+])
+def test_sketch_quantiles_within_accuracy(seconds):
+    quantiles = sketch_quantiles(sketch_of('tests/test_api.py', seconds), QUANTILES)
+
+    for q in QUANTILES:
+        exact = np.quantile(seconds, q, method='lower')
+        estimate = quantiles.loc['tests/test_api.py', quantile_label(q)]
+        assert abs(estimate - exact) <= SKETCH_ACCURACY * exact
+
+
+def test_sketches_merge_across_runs():
+    rng = np.random.default_rng(2)
+    first, second = rng.exponential(0.5, size=3_000), rng.exponential(2.0, size=1_000)
+    merged = pd.concat([sketch_of('c', first), sketch_of('c', second)])
+
+    quantiles = sketch_quantiles(merged, (0.5, 0.95))
+    for q in (0.5, 0.95):
+        exact = np.quantile(np.concatenate([first, second]), q, method='lower')
+        assert abs(quantiles.loc['c', quantile_label(q)] - exact) <= SKETCH_ACCURACY * exact
+
+
+def test_quantile_labels():
+    assert [quantile_label(q) for q in (0.5, 0.95, 0.99, 0.999)] == ['p50', 'p95', 'p99', 'p99.9']
+
+
+def test_merge_duration_summaries():
+    covered = pd.DataFrame({'tests': [2], 'total': [1.0], 'mean': [0.5], 'min': [0.1], 'max': [0.9], 'p50': [0.1]},
+                           index=['tests/test_api.py'])
+    uncovered = pd.DataFrame({'tests': [2, 1], 'total': [3.0, 0.2], 'mean': [1.5, 0.2], 'min': [0.05, 0.2],
+                              'max': [np.nan, np.nan]}, index=['tests/test_api.py', 'tests/test_db.py'])
+
+    merged = merge_duration_summaries(covered, uncovered)
+    assert merged.loc['tests/test_api.py', ['tests', 'total', 'mean', 'min', 'max']].tolist() == [4, 4.0, 1.0, 0.05, 0.9]
+    # A quantile of part of the runs is not the quantile of all of them
+    assert np.isnan(merged.loc['tests/test_api.py', 'p50'])
+    assert merged.loc['tests/test_db.py', 'total'] == 0.2
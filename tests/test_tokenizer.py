@@ -0,0 +1,49 @@
+import io
+
+import pytest
+
+from tokenizer import LineTokenizer, iter_clean_lines, strip_ansi
+
+
+LOG = ('[gw0] [ 25%] \x1b[32mPASSED\x1b[0m tests/test_api.py::test_get[1]\r\n'
+       '\n'
+       'FAILED tests/test_api.py::test_post - AssertionError: café \x1b[1;31massert 2 == 1\x1b[0m\n'
+       'last line without newline').encode()
+EXPECTED = ['[gw0] [ 25%] PASSED tests/test_api.py::test_get[1]',
+            '',
+            'FAILED tests/test_api.py::test_post - AssertionError: café assert 2 == 1',
+            'last line without newline']
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64, 1 << 20])
+def test_lines_do_not_depend_on_chunk_boundaries(chunk_size):
+    # Small chunks cut lines, escape sequences and multi-byte characters in every possible place
+    assert list(iter_clean_lines(io.BytesIO(LOG), chunk_size)) == EXPECTED
+
+
+def test_escape_sequence_split_between_chunks():
+    tokenizer = LineTokenizer()
+    assert tokenizer.feed(b'status \x1b[3') == []
+    assert tokenizer.feed(b'2mPASSED\x1b[0') == []
+    assert tokenizer.feed(b'm\nnext') == ['status PASSED']
+    assert tokenizer.close() == ['next']
+
+
+def test_long_line_without_newline():
+    tokenizer = LineTokenizer()
+    for _ in range(10_000):
+        assert tokenizer.feed(b'x' * 100) == []
+    assert tokenizer.feed(b'\n') == ['x' * 1_000_000]
+    assert tokenizer.close() == []
+
+
+def test_empty_chunks_and_stream():
+    tokenizer = LineTokenizer()
+    assert tokenizer.feed(b'') == []
+    assert tokenizer.close() == []
+    assert list(iter_clean_lines(io.BytesIO(b''))) == []
+
+
+def test_strip_ansi():
+    assert strip_ansi('\x1b[31mred\x1b[0m plain') == 'red plain'
+    assert strip_ansi('no escapes') == 'no escapes'